@@ -0,0 +1,179 @@
+"""Persisted first-seen table: when each install was first active.
+
+Cohort assignment needs every install's activation (its first ``events`` beacon).
+Rather than recomputing ``min(CreatedAt)`` per install over the whole history on each
+load and each segmented rerun, the first event, first start beacon and activation
+week of every install are kept next to the day files (``activations.parquet``, with a
+JSON manifest of the day files already folded in) and maintained incrementally: a new
+day file only lowers the minima of the installs it contains. A changed or removed day
+file can raise them, so it triggers a rebuild, as does a rebuilt install-id dictionary
+(the manifest records the :func:`install_ids.dictionary_id` the table's ids index).
+Updates hold an exclusive lock (``activations.lock``, see :mod:`file_lock`).
+"""
+
+import json
+from collections.abc import Mapping
+from pathlib import Path
+
+import polars as pl
+from cohort_analysis import week_index
+from config import ACTIVATIONS_FILENAME, DATA_PATH
+from data_loader import list_day_files, scan_day_files
+from file_lock import exclusive_lock
+from install_ids import INSTALL_ID_DTYPE, dictionary_id, refresh_install_ids
+
+# Bump whenever the table's columns change so it is rebuilt.
+ACTIVATIONS_VERSION = 1
+
+_SCHEMA = {
+    "UserID": INSTALL_ID_DTYPE,
+    "activated": pl.Datetime("ns", "UTC"),
+    "first_start": pl.Datetime("ns", "UTC"),
+}
+
+
+def _paths(data_glob: str) -> tuple[Path, Path]:
+    table = Path(data_glob).parent / ACTIVATIONS_FILENAME
+    return table, table.with_suffix(".json")
+
+
+def _lock_path(data_glob: str) -> Path:
+    return (Path(data_glob).parent / ACTIVATIONS_FILENAME).with_suffix(".lock")
+
+
+def _file_key(path: Path) -> dict:
+    stat = path.stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _empty() -> pl.DataFrame:
+    return pl.DataFrame(schema=_SCHEMA)
+
+
+def _read(data_glob: str, install_ids: str | None) -> tuple[pl.DataFrame, dict]:
+    # Manifest before table, the reverse of the write order (see install_ids._read).
+    table, manifest = _paths(data_glob)
+    if not (table.exists() and manifest.exists()):
+        return _empty(), {}
+    try:
+        meta = json.loads(manifest.read_text())
+    except json.JSONDecodeError:
+        return _empty(), {}
+    if (meta.get("version"), meta.get("install_ids")) != (ACTIVATIONS_VERSION, install_ids):
+        return _empty(), {}
+    with table.open("rb") as f:  # pinned to one file, as in install_ids._read
+        return pl.read_parquet(f).select(list(_SCHEMA)), meta.get("files", {})
+
+
+def _write(data_glob: str, table: pl.DataFrame, files: dict, install_ids: str | None) -> None:
+    # Table first, then manifest: a crash in between only means the pending files are
+    # folded in again, which leaves the minima unchanged.
+    table_path, manifest = _paths(data_glob)
+    tmp = table_path.with_name(f"{table_path.name}.tmp")
+    table.select(list(_SCHEMA)).write_parquet(tmp)
+    tmp.replace(table_path)
+    tmp = manifest.with_name(f"{manifest.name}.tmp")
+    meta = {"version": ACTIVATIONS_VERSION, "install_ids": install_ids, "files": files}
+    tmp.write_text(json.dumps(meta, indent=1))
+    tmp.replace(manifest)
+
+
+def refresh_activations(
+    data_glob: str = DATA_PATH,
+    paths: list[str] | None = None,
+    loaded: Mapping[str, tuple[pl.DataFrame, pl.DataFrame]] | None = None,
+) -> pl.DataFrame:
+    """Fold the day files not yet in the first-seen table into it.
+
+    Only new day files are read (just their ``Name``, ``CreatedAt`` and identity
+    columns), and not even those the caller has ``loaded``. If a day file already
+    folded in has changed or disappeared, or the install-id dictionary was rebuilt,
+    the table is rebuilt from ``paths``. Changes are made under the table's lock, to
+    the table as re-read under it.
+
+    Args:
+        data_glob: Glob pattern of the day files; locates the table.
+        paths: The day files to cover; defaults to every file matching ``data_glob``.
+        loaded: Day file name -> its events and start beacons, as from
+            :func:`data_loader.load_events_and_starts`, for files already in memory.
+
+    Returns:
+        pl.DataFrame: One row per install: ``UserID``, ``activated`` (first event,
+        null for installs that only sent start beacons), ``first_start`` and the
+        ``Int32`` ``activated_week``, in ``UserID`` order.
+    """
+    if paths is None:
+        paths = list_day_files(data_glob)
+    refresh_install_ids(data_glob, paths)  # creates the dictionary on a first run
+    install_ids = dictionary_id(data_glob)
+    table, files = _read(data_glob, install_ids)
+    if _changed(data_glob, files) or _pending(files, paths):
+        with exclusive_lock(_lock_path(data_glob)):
+            # Fold into the table as another loader may have left it meanwhile.
+            table, files = _read(data_glob, install_ids)
+            table = _fold(data_glob, table, files, paths, install_ids, loaded or {})
+    return table.with_columns(week_index(pl.col("activated")).alias("activated_week"))
+
+
+def _changed(data_glob: str, files: dict) -> bool:
+    """Whether a day file already folded in has changed or disappeared."""
+    directory = Path(data_glob).parent
+    return any(
+        not (directory / name).exists() or _file_key(directory / name) != key
+        for name, key in files.items()
+    )
+
+
+def _pending(files: dict, paths: list[str]) -> dict[str, Path]:
+    return {path.name: path for path in map(Path, paths) if path.name not in files}
+
+
+def _fold(
+    data_glob: str,
+    table: pl.DataFrame,
+    files: dict,
+    paths: list[str],
+    install_ids: str | None,
+    loaded: Mapping[str, tuple[pl.DataFrame, pl.DataFrame]],
+) -> pl.DataFrame:
+    """Fold the pending day files of ``paths`` into ``table`` and persist it."""
+    if _changed(data_glob, files):
+        table, files = _empty(), {}
+    pending = _pending(files, paths)
+    if not pending:
+        return table
+
+    columns = ["UserID", pl.col("Name").cast(pl.String), "CreatedAt"]
+    beacons = [
+        pl.concat(
+            [
+                events.select(columns),
+                starts.select("UserID", pl.lit("start").alias("Name"), "CreatedAt"),
+            ]
+        ).lazy()
+        for name, (events, starts) in loaded.items()
+        if name in pending
+    ]
+    unread = [str(path) for name, path in pending.items() if name not in loaded]
+    if unread:
+        beacons.append(scan_day_files(unread, data_glob).select(columns))
+
+    created = pl.col("CreatedAt")
+    first_seen = (
+        pl.concat(beacons)
+        .group_by("UserID")
+        .agg(
+            created.filter(pl.col("Name") == "events").min().alias("activated"),
+            created.filter(pl.col("Name") == "start").min().alias("first_start"),
+        )
+        .collect()
+    )
+    table = (
+        pl.concat([table, first_seen.select(list(_SCHEMA))])
+        .group_by("UserID")
+        .agg(pl.col("activated").min(), pl.col("first_start").min())
+        .sort("UserID")
+    )
+    files.update({name: _file_key(path) for name, path in pending.items()})
+    _write(data_glob, table, files, install_ids)
+    return table
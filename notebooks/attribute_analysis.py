@@ -2,13 +2,17 @@
 
 These power the standalone descriptive charts and the sidebar segmentation. All
 functions operate on the events dataframe produced by ``data_loader`` (which carries
-``UserID`` plus the descriptive columns) unless stated otherwise.
+``UserID`` plus the descriptive columns) unless stated otherwise. The weekly metrics
+take the user-week table from :func:`cohort_analysis.compute_user_weeks` instead.
 """
 
 from datetime import timedelta
+from typing import Any, cast, overload
 
 import polars as pl
-from config import BASELINE
+from config import BASELINE, FEATURE_FLAGS
+from frames import Frame
+from instrumentation import instrumented
 
 # Ordered deployment-size buckets (by RunningContainers) for consistent chart ordering.
 CONTAINER_BUCKETS = ["0", "1-5", "6-20", "21-50", "51-200", "200+"]
@@ -24,16 +28,6 @@ def _week_date(col: pl.Expr) -> pl.Expr:
     return pl.lit(BASELINE) + col.cast(pl.Int64) * pl.duration(weeks=1)
 
 
-# Feature-flag columns surfaced in adoption charts and segmentation.
-FEATURE_FLAGS = [
-    "HasActions",
-    "HasHostname",
-    "HasCustomAddress",
-    "HasCustomBase",
-    "HasShell",
-]
-
-
 def container_bucket_expr(col: pl.Expr) -> pl.Expr:
     """Bucket a RunningContainers count into an ordered deployment-size band."""
     return (
@@ -99,7 +93,38 @@ def os_family_expr(col: pl.Expr) -> pl.Expr:
     )
 
 
-def calculate_install_attributes(df: pl.DataFrame) -> pl.DataFrame:
+@overload
+def classify_user_agents(df: pl.DataFrame) -> pl.DataFrame: ...
+@overload
+def classify_user_agents(df: pl.LazyFrame) -> pl.LazyFrame: ...
+def classify_user_agents(df: Frame) -> Frame:
+    """Browser and OS family of each distinct ``Browser`` user-agent in ``df``.
+
+    Installs share a small vocabulary of user-agents, so the substring scans run once
+    per distinct string rather than once per row.
+
+    Args:
+        df: Any frame with a ``Browser`` column (``String`` or ``Categorical``).
+
+    Returns:
+        ``Browser`` (as in ``df``), ``browser_family`` and ``os_family``.
+    """
+    user_agent = pl.col("Browser").cast(pl.String)
+    return df.select(pl.col("Browser").unique()).with_columns(
+        browser_family_expr(user_agent).alias("browser_family"),
+        os_family_expr(user_agent).alias("os_family"),
+    )
+
+
+@overload
+def calculate_install_attributes(
+    df: pl.DataFrame, user_agents: pl.DataFrame | None = None
+) -> pl.DataFrame: ...
+@overload
+def calculate_install_attributes(
+    df: pl.LazyFrame, user_agents: pl.DataFrame | None = None
+) -> pl.LazyFrame: ...
+def calculate_install_attributes(df: Frame, user_agents: pl.DataFrame | None = None) -> Frame:
     """Collapse the events to one row per install with its latest reported attributes.
 
     Used both for the deployment-size / browser distributions and as the lookup table
@@ -108,19 +133,29 @@ def calculate_install_attributes(df: pl.DataFrame) -> pl.DataFrame:
 
     Args:
         df: Events dataframe with ``UserID``, ``CreatedAt``, and descriptive columns.
+        user_agents: Optional classification of every user-agent in ``df`` (see
+            :func:`user_agents.refresh_user_agents`) to join instead of classifying
+            the distinct user-agents of ``df`` here.
 
     Returns:
         pl.DataFrame: One row per ``UserID`` with derived ``container_bucket``,
         ``browser_family``, and ``os_family`` columns.
     """
     latest = df.sort("CreatedAt").group_by("UserID").last()
+    if user_agents is None:
+        families = classify_user_agents(latest)
+    else:
+        # Cast to the events' type: with a Categorical Browser the join is on codes.
+        browser = pl.col("Browser").cast(latest.collect_schema()["Browser"])
+        families = user_agents.with_columns(browser)
+        if isinstance(latest, pl.LazyFrame):
+            families = families.lazy()
     return latest.with_columns(
-        container_bucket_expr(pl.col("RunningContainers")).alias("container_bucket"),
-        browser_family_expr(pl.col("Browser")).alias("browser_family"),
-        os_family_expr(pl.col("Browser")).alias("os_family"),
-    )
+        container_bucket_expr(pl.col("RunningContainers")).alias("container_bucket")
+    ).join(cast(Any, families), on="Browser", how="left", nulls_equal=True, maintain_order="left")
 
 
+@instrumented
 def filter_installs(install_attrs: pl.DataFrame, selections: dict) -> pl.Series:
     """Return the UserIDs whose install attributes match every active selection.
 
@@ -141,39 +176,60 @@ def filter_installs(install_attrs: pl.DataFrame, selections: dict) -> pl.Series:
     return matched["UserID"]
 
 
-def calculate_version_adoption(df: pl.DataFrame, top_n: int = 8) -> pl.DataFrame:
+@overload
+def _installs_per_value(weekly: pl.DataFrame, values: str, name: str) -> pl.DataFrame: ...
+@overload
+def _installs_per_value(weekly: pl.LazyFrame, values: str, name: str) -> pl.LazyFrame: ...
+def _installs_per_value(weekly: Frame, values: str, name: str) -> Frame:
+    """Distinct installs per week and value of the user-week list column ``values``."""
+    return (
+        weekly.select("current_week", pl.col(values).alias(name))
+        .explode(name)
+        .group_by(["current_week", name])
+        .agg(pl.len().alias("installs"))
+    )
+
+
+@overload
+def calculate_version_adoption(weekly: pl.DataFrame, top_n: int = 8) -> pl.DataFrame: ...
+@overload
+def calculate_version_adoption(weekly: pl.LazyFrame, top_n: int = 8) -> pl.LazyFrame: ...
+def calculate_version_adoption(weekly: Frame, top_n: int = 8) -> Frame:
     """Weekly share of active installs running each version (top N, rest as 'Other').
 
+    An install counts once per week under every version it reported that week, so the
+    shares of a week with upgrades add up to more than one.
+
     Args:
-        df: Events with ``UserID``, ``current_week``, and ``Version``.
+        weekly: The user-week table (:func:`cohort_analysis.compute_user_weeks`).
         top_n: Number of most-common versions to keep distinct.
 
     Returns:
         pl.DataFrame: ``current_week``, ``version``, ``installs``, ``share``, ``week_date``.
     """
-    weekly = df.group_by(["current_week", "Version"]).agg(
-        pl.col("UserID").n_unique().alias("installs")
-    )
+    per_value = _installs_per_value(weekly, "versions", "Version")
     top = (
-        weekly.group_by("Version")
+        per_value.group_by("Version")
         .agg(pl.col("installs").sum().alias("total"))
         .sort("total", descending=True)
-        .head(top_n)["Version"]
-        .to_list()
+        .head(top_n)
+        .select("Version", pl.lit(True).alias("_top"))
     )
-    weekly = (
-        weekly.with_columns(
-            pl.when(pl.col("Version").is_in(top))
-            .then(pl.col("Version"))
+    per_value = (
+        per_value.join(cast(Any, top), on="Version", how="left")
+        .with_columns(
+            # As a String: a Categorical/String when-then key breaks streaming group-bys.
+            pl.when(pl.col("_top"))
+            .then(pl.col("Version").cast(pl.String))
             .otherwise(pl.lit("Other"))
             .alias("version")
         )
         .group_by(["current_week", "version"])
         .agg(pl.col("installs").sum().alias("installs"))
     )
-    totals = df.group_by("current_week").agg(pl.col("UserID").n_unique().alias("active"))
+    totals = weekly.group_by("current_week").agg(pl.len().alias("active"))
     return (
-        weekly.join(totals, on="current_week")
+        per_value.join(cast(Any, totals), on="current_week")
         .with_columns(
             (pl.col("installs") / pl.col("active")).alias("share"),
             _week_date(pl.col("current_week")).alias("week_date"),
@@ -182,7 +238,11 @@ def calculate_version_adoption(df: pl.DataFrame, top_n: int = 8) -> pl.DataFrame
     )
 
 
-def calculate_new_installs(start_df: pl.DataFrame) -> pl.DataFrame:
+@overload
+def calculate_new_installs(start_df: pl.DataFrame) -> pl.DataFrame: ...
+@overload
+def calculate_new_installs(start_df: pl.LazyFrame) -> pl.LazyFrame: ...
+def calculate_new_installs(start_df: Frame) -> Frame:
     """Weekly new installs and launch volume from the start (app-launch) beacons.
 
     Args:
@@ -204,14 +264,18 @@ def calculate_new_installs(start_df: pl.DataFrame) -> pl.DataFrame:
         pl.len().alias("launches"),
     )
     return (
-        weekly.join(first_week, left_on="week", right_on="first_week", how="left")
+        weekly.join(cast(Any, first_week), left_on="week", right_on="first_week", how="left")
         .with_columns(pl.col("new_installs").fill_null(0))
         .with_columns(_week_date(pl.col("week")).alias("week_date"))
         .sort("week")
     )
 
 
-def calculate_deployment_scale(install_attrs: pl.DataFrame) -> pl.DataFrame:
+@overload
+def calculate_deployment_scale(install_attrs: pl.DataFrame) -> pl.DataFrame: ...
+@overload
+def calculate_deployment_scale(install_attrs: pl.LazyFrame) -> pl.LazyFrame: ...
+def calculate_deployment_scale(install_attrs: Frame) -> Frame:
     """Distribution of installs across deployment-size buckets.
 
     Args:
@@ -221,11 +285,10 @@ def calculate_deployment_scale(install_attrs: pl.DataFrame) -> pl.DataFrame:
         pl.DataFrame: ``container_bucket``, ``installs``, ``share`` (bucket-ordered).
     """
     order = {bucket: i for i, bucket in enumerate([*CONTAINER_BUCKETS, "Unknown"])}
-    total = install_attrs.height
     dist = install_attrs.group_by("container_bucket").agg(pl.len().alias("installs"))
     return (
         dist.with_columns(
-            (pl.col("installs") / total).alias("share"),
+            (pl.col("installs") / pl.col("installs").sum()).alias("share"),
             pl.col("container_bucket").replace_strict(order, default=len(order)).alias("_order"),
         )
         .sort("_order")
@@ -233,21 +296,25 @@ def calculate_deployment_scale(install_attrs: pl.DataFrame) -> pl.DataFrame:
     )
 
 
-def calculate_auth_mix(df: pl.DataFrame) -> pl.DataFrame:
+@overload
+def calculate_auth_mix(weekly: pl.DataFrame) -> pl.DataFrame: ...
+@overload
+def calculate_auth_mix(weekly: pl.LazyFrame) -> pl.LazyFrame: ...
+def calculate_auth_mix(weekly: Frame) -> Frame:
     """Weekly share of active installs by auth provider.
 
+    An install counts once per week under every auth provider it reported that week.
+
     Args:
-        df: Events with ``UserID``, ``current_week``, and ``AuthProvider``.
+        weekly: The user-week table (:func:`cohort_analysis.compute_user_weeks`).
 
     Returns:
         pl.DataFrame: ``current_week``, ``AuthProvider``, ``installs``, ``share``, ``week_date``.
     """
-    weekly = df.group_by(["current_week", "AuthProvider"]).agg(
-        pl.col("UserID").n_unique().alias("installs")
-    )
-    totals = df.group_by("current_week").agg(pl.col("UserID").n_unique().alias("active"))
+    per_value = _installs_per_value(weekly, "auth_providers", "AuthProvider")
+    totals = weekly.group_by("current_week").agg(pl.len().alias("active"))
     return (
-        weekly.join(totals, on="current_week")
+        per_value.join(cast(Any, totals), on="current_week")
         .with_columns(
             (pl.col("installs") / pl.col("active")).alias("share"),
             _week_date(pl.col("current_week")).alias("week_date"),
@@ -256,44 +323,49 @@ def calculate_auth_mix(df: pl.DataFrame) -> pl.DataFrame:
     )
 
 
-def calculate_concurrent_clients(df: pl.DataFrame) -> pl.DataFrame:
+@overload
+def calculate_concurrent_clients(weekly: pl.DataFrame) -> pl.DataFrame: ...
+@overload
+def calculate_concurrent_clients(weekly: pl.LazyFrame) -> pl.LazyFrame: ...
+def calculate_concurrent_clients(weekly: Frame) -> Frame:
     """Weekly average and maximum concurrent browser clients per install.
 
     Each install's weekly peak Clients is taken first, then averaged across installs so
     busy installs don't dominate via beacon count.
 
     Args:
-        df: Events with ``UserID``, ``current_week``, and ``Clients``.
+        weekly: The user-week table (:func:`cohort_analysis.compute_user_weeks`).
 
     Returns:
         pl.DataFrame: ``current_week``, ``avg_clients``, ``max_clients``, ``week_date``.
     """
-    peaks = df.group_by(["UserID", "current_week"]).agg(pl.col("Clients").max().alias("peak"))
     return (
-        peaks.group_by("current_week")
+        weekly.group_by("current_week")
         .agg(
-            pl.col("peak").mean().alias("avg_clients"),
-            pl.col("peak").max().alias("max_clients"),
+            pl.col("peak_clients").mean().alias("avg_clients"),
+            pl.col("peak_clients").max().alias("max_clients"),
         )
         .with_columns(_week_date(pl.col("current_week")).alias("week_date"))
         .sort("current_week")
     )
 
 
-def calculate_feature_adoption(df: pl.DataFrame) -> pl.DataFrame:
+@overload
+def calculate_feature_adoption(weekly: pl.DataFrame) -> pl.DataFrame: ...
+@overload
+def calculate_feature_adoption(weekly: pl.LazyFrame) -> pl.LazyFrame: ...
+def calculate_feature_adoption(weekly: Frame) -> Frame:
     """Weekly share of active installs that have each feature flag enabled.
 
     A null flag (older data that predates the feature) counts as not adopted.
 
     Args:
-        df: Events with ``UserID``, ``current_week``, and the feature-flag columns.
+        weekly: The user-week table (:func:`cohort_analysis.compute_user_weeks`).
 
     Returns:
         pl.DataFrame: ``current_week``, ``feature``, ``installs``, ``adoption``, ``week_date``.
     """
-    per_install = df.group_by(["UserID", "current_week"]).agg(
-        [pl.col(flag).fill_null(False).max().alias(flag) for flag in FEATURE_FLAGS]
-    )
+    per_install = weekly.select(["UserID", "current_week", *FEATURE_FLAGS])
     totals = per_install.group_by("current_week").agg(pl.len().alias("installs"))
     long = per_install.unpivot(
         index=["UserID", "current_week"],
@@ -304,7 +376,7 @@ def calculate_feature_adoption(df: pl.DataFrame) -> pl.DataFrame:
     return (
         long.group_by(["current_week", "feature"])
         .agg(pl.col("enabled").sum().alias("enabled_installs"))
-        .join(totals, on="current_week")
+        .join(cast(Any, totals), on="current_week")
         .with_columns(
             (pl.col("enabled_installs") / pl.col("installs")).alias("adoption"),
             _week_date(pl.col("current_week")).alias("week_date"),
@@ -313,17 +385,24 @@ def calculate_feature_adoption(df: pl.DataFrame) -> pl.DataFrame:
     )
 
 
-def _share_distribution(install_attrs: pl.DataFrame, column: str) -> pl.DataFrame:
-    total = install_attrs.height
+@overload
+def _share_distribution(install_attrs: pl.DataFrame, column: str) -> pl.DataFrame: ...
+@overload
+def _share_distribution(install_attrs: pl.LazyFrame, column: str) -> pl.LazyFrame: ...
+def _share_distribution(install_attrs: Frame, column: str) -> Frame:
     return (
         install_attrs.group_by(column)
         .agg(pl.len().alias("installs"))
-        .with_columns((pl.col("installs") / total).alias("share"))
+        .with_columns((pl.col("installs") / pl.col("installs").sum()).alias("share"))
         .sort("installs", descending=True)
     )
 
 
-def calculate_browser_mix(install_attrs: pl.DataFrame) -> tuple[pl.DataFrame, pl.DataFrame]:
+@overload
+def calculate_browser_mix(install_attrs: pl.DataFrame) -> tuple[pl.DataFrame, pl.DataFrame]: ...
+@overload
+def calculate_browser_mix(install_attrs: pl.LazyFrame) -> tuple[pl.LazyFrame, pl.LazyFrame]: ...
+def calculate_browser_mix(install_attrs: Frame) -> tuple[Frame, Frame]:
     """Distribution of installs by browser family and by OS family.
 
     Args:
@@ -0,0 +1,217 @@
+"""Micro-benchmarks of the loading and analysis pipeline at several data scales.
+
+For each scale a synthetic dataset is generated (see :mod:`synthetic`), then every
+stage the dashboard runs -- the loaders, ``compute_cohort_data``, the user-week table,
+each metric in :data:`metrics.METRICS` and the whole graph in lazy mode -- is timed
+over a few repeats, with the peak resident memory above the pre-call baseline and
+the size of the result. Results are written as JSON so two runs can be compared.
+
+Usage (from ``notebooks/``)::
+
+    python benchmark.py --installs 1000 10000 100000 --out bench.json
+    python benchmark.py --installs 10000 --compare bench.json
+"""
+
+import argparse
+import json
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import asdict, replace
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any, Self
+
+import polars as pl
+from attribute_analysis import calculate_install_attributes
+from cohort_analysis import compute_cohort_data, compute_user_weeks, prepare_retention_matrix
+from data_loader import load_and_process_data, load_events_and_starts, load_start_beacons
+from metrics import METRICS, compute_metrics
+from synthetic import SyntheticConfig, write_dataset
+
+# How often the memory sampler polls the resident set size.
+_SAMPLE_INTERVAL_SECONDS = 0.005
+
+# A stage is reported as a regression when it gets this much slower.
+REGRESSION_RATIO = 1.2
+
+# Differences below this are timer noise, not regressions.
+_NOISE_FLOOR_SECONDS = 0.01
+
+
+def _rss() -> int:
+    """Current resident set size in bytes (Linux), or the peak where unavailable."""
+    try:
+        pages = int(Path("/proc/self/statm").read_text().split()[1])
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return pages * resource.getpagesize()
+
+
+class _PeakMemory:
+    """Samples RSS on a background thread while the ``with`` block runs."""
+
+    def __enter__(self) -> Self:
+        self.baseline = self.peak = _rss()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def _sample(self) -> None:
+        while not self._done.wait(_SAMPLE_INTERVAL_SECONDS):
+            self.peak = max(self.peak, _rss())
+
+    def __exit__(self, *exc: object) -> None:
+        self._done.set()
+        self._thread.join()
+        self.peak = max(self.peak, _rss())
+
+    @property
+    def delta(self) -> int:
+        return self.peak - self.baseline
+
+
+def _result_bytes(result: Any) -> int:
+    if isinstance(result, pl.DataFrame):
+        return result.estimated_size()
+    if isinstance(result, tuple):
+        return sum(_result_bytes(item) for item in result)
+    if isinstance(result, dict):
+        return sum(_result_bytes(item) for item in result.values())
+    return 0
+
+
+def _measure(name: str, func: Callable[[], Any], repeats: int) -> tuple[dict, Any]:
+    times = []
+    peak = 0
+    for _ in range(repeats):
+        with _PeakMemory() as memory:
+            start = time.perf_counter()
+            result = func()
+            times.append(time.perf_counter() - start)
+        peak = max(peak, memory.delta)
+    stats = {
+        "stage": name,
+        "seconds": statistics.median(times),
+        "min_seconds": min(times),
+        "peak_rss_delta_bytes": peak,
+        "result_bytes": _result_bytes(result),
+    }
+    return stats, result
+
+
+def run_scale(config: SyntheticConfig, data_dir: Path, repeats: int) -> list[dict]:
+    """Generate one dataset and benchmark every pipeline stage on it.
+
+    Args:
+        config: Synthetic population to generate.
+        data_dir: Directory to write the day files into.
+        repeats: Timed runs per stage; the median is reported.
+
+    Returns:
+        list[dict]: One record per stage.
+    """
+    write_dataset(data_dir, config)
+    data_glob = str(data_dir / "day-*.parquet")
+    records = []
+
+    def bench(name: str, func: Callable[[], Any]) -> Any:
+        stats, result = _measure(name, func, repeats)
+        records.append(stats)
+        print(
+            f"  {name:<28} {stats['seconds']:8.3f}s  {stats['peak_rss_delta_bytes'] >> 20:6d} MiB"
+        )
+        return result
+
+    events = bench("load_and_process_data", lambda: load_and_process_data(data_glob))
+    starts = bench("load_start_beacons", lambda: load_start_beacons(data_glob))
+    bench("load_events_and_starts", lambda: load_events_and_starts(data_glob))
+    cohort = bench("compute_cohort_data", lambda: compute_cohort_data(events))
+    weekly = bench("compute_user_weeks", lambda: compute_user_weeks(cohort))
+    attrs = bench("calculate_install_attributes", lambda: calculate_install_attributes(events))
+
+    sources = {"events": cohort, "weekly": weekly, "starts": starts, "attrs": attrs}
+    results = {}
+    for metric in METRICS:
+        source = sources[metric.source]
+        results[metric.name] = bench(metric.name, lambda f=metric.func, s=source: f(s))
+    bench("prepare_retention_matrix", lambda: prepare_retention_matrix(results["cohort_counts"]))
+
+    lazy_sources = {name: frame.lazy() for name, frame in sources.items()}
+    bench("metrics (lazy graph)", lambda: compute_metrics(lazy_sources))
+
+    for record in records:
+        record.update(installs=config.installs, days=config.days, rows=events.height)
+    return records
+
+
+def compare(baseline: dict, current: dict, ratio: float = REGRESSION_RATIO) -> list[str]:
+    """List the stages that got slower than ``ratio`` times the baseline.
+
+    Args:
+        baseline: A previous benchmark report.
+        current: The report to check.
+        ratio: Slowdown factor considered a regression.
+
+    Returns:
+        list[str]: One human-readable line per regressed (installs, stage).
+    """
+    before = {(r["installs"], r["stage"]): r["seconds"] for r in baseline["results"]}
+    regressions = []
+    for record in current["results"]:
+        old = before.get((record["installs"], record["stage"]))
+        if old and record["seconds"] > max(old * ratio, old + _NOISE_FLOOR_SECONDS):
+            regressions.append(
+                f"{record['stage']} @ {record['installs']} installs: "
+                f"{old:.3f}s -> {record['seconds']:.3f}s"
+            )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=(__doc__ or "").partition("\n")[0])
+    parser.add_argument("--installs", type=int, nargs="+", default=[1_000, 10_000])
+    parser.add_argument("--days", type=int, default=SyntheticConfig.days)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=SyntheticConfig.seed)
+    parser.add_argument("--out", default="bench.json")
+    parser.add_argument("--compare", help="Previous report to check for regressions")
+    args = parser.parse_args()
+
+    created_at = datetime.now(UTC).isoformat()
+    results, configs = [], []
+    with tempfile.TemporaryDirectory() as tmp:
+        for installs in args.installs:
+            config = replace(SyntheticConfig(), installs=installs, days=args.days, seed=args.seed)
+            print(f"{installs} installs x {args.days} days")
+            results += run_scale(config, Path(tmp) / str(installs), args.repeats)
+            configs.append({**asdict(config), "first_day": str(config.first_day)})
+    report = {
+        "created_at": created_at,
+        "python": platform.python_version(),
+        "polars": pl.__version__,
+        "platform": platform.platform(),
+        "threads": pl.thread_pool_size(),
+        "results": results,
+        "configs": configs,
+    }
+
+    Path(args.out).write_text(json.dumps(report, indent=1))
+    print(f"wrote {args.out}")
+
+    if args.compare:
+        regressions = compare(json.loads(Path(args.compare).read_text()), report)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,73 @@
 """Cohort analysis calculations for retention metrics."""
 
 from datetime import timedelta
+from typing import overload
 
 import polars as pl
-from config import BASELINE, RETENTION_MATRIX_TAIL, RETENTION_MATRIX_WEEKS
+from config import BASELINE, FEATURE_FLAGS, RETENTION_MATRIX_TAIL, RETENTION_MATRIX_WEEKS
+from frames import Frame
+from instrumentation import instrumented
 
+# Per-install columns that are constant within a user-week and carried through as-is.
+_USER_WEEK_CONSTANTS = ["activated_week", "cohort_index", "id_from_ip"]
 
-def compute_cohort_data(df: pl.DataFrame) -> pl.DataFrame:
+# Descriptive columns reduced to the distinct values reported in the week (a list each,
+# so an install that upgraded mid-week counts under both versions, as per-event counts do).
+_USER_WEEK_DISTINCT = {"Version": "versions", "AuthProvider": "auth_providers"}
+
+
+def week_index(col: pl.Expr) -> pl.Expr:
+    """Whole weeks between the timestamp ``col`` and the cohort baseline, as ``Int32``."""
+    return ((col - pl.lit(BASELINE)) / timedelta(weeks=1)).cast(pl.Int32)
+
+
+def day_index(col: pl.Expr) -> pl.Expr:
+    """Whole days between the timestamp ``col`` and the cohort baseline, as ``Int32``."""
+    return ((col - pl.lit(BASELINE)) / timedelta(days=1)).cast(pl.Int32)
+
+
+@overload
+def compute_cohort_data(
+    df: pl.DataFrame, activations: pl.DataFrame | None = None
+) -> pl.DataFrame: ...
+@overload
+def compute_cohort_data(
+    df: pl.LazyFrame, activations: pl.DataFrame | None = None
+) -> pl.LazyFrame: ...
+@instrumented
+def compute_cohort_data(df: Frame, activations: pl.DataFrame | None = None) -> Frame:
     """Compute cohort analysis data.
 
     Args:
         df: Input dataframe with UserID and CreatedAt columns.
+        activations: Optional ``UserID``/``activated`` table (e.g. the persisted
+            :func:`activations.refresh_activations`) to take activation dates, and
+            ``activated_week`` if it has one, from instead of each user's earliest
+            ``CreatedAt`` in ``df``. Users it does not cover get null cohort columns
+            and are left out of the cohort metrics (but not of the activity ones).
 
     Returns:
-        pl.DataFrame: Dataframe with cohort metrics added.
+        Dataframe (eager or lazy, like the input) with cohort metrics added.
     """
     # Add activation date for each user
-    df = df.with_columns(pl.col("CreatedAt").min().over("UserID").alias("activated"))
-
-    # Calculate week numbers from baseline
-    df = df.with_columns(
-        [
-            ((pl.col("activated") - pl.lit(BASELINE)) / timedelta(weeks=1))
-            .cast(pl.Int64)
-            .alias("activated_week"),
-            ((pl.col("CreatedAt") - pl.lit(BASELINE)) / timedelta(weeks=1))
-            .cast(pl.Int64)
-            .alias("current_week"),
-        ]
-    )
+    if activations is None:
+        df = df.with_columns(pl.col("CreatedAt").min().over("UserID").alias("activated"))
+    else:
+        known = [c for c in ("UserID", "activated", "activated_week") if c in activations.columns]
+        table = activations.select(known)
+        if isinstance(df, pl.LazyFrame):
+            df = df.join(table.lazy(), on="UserID", how="left", maintain_order="left")
+        else:
+            df = df.join(table, on="UserID", how="left", maintain_order="left")
+
+    # Calculate week numbers from baseline (the compact loader already adds current_week)
+    columns = df.collect_schema().names()
+    weeks = []
+    if "activated_week" not in columns:
+        weeks.append(week_index(pl.col("activated")).alias("activated_week"))
+    if "current_week" not in columns:
+        weeks.append(week_index(pl.col("CreatedAt")).alias("current_week"))
+    df = df.with_columns(weeks)
 
     # Add cohort index
     df = df.with_columns((pl.col("current_week") - pl.col("activated_week")).alias("cohort_index"))
@@ -36,18 +75,59 @@ def compute_cohort_data(df: pl.DataFrame) -> pl.DataFrame:
     return df
 
 
-def calculate_cohort_retention(df: pl.DataFrame) -> pl.DataFrame:
+@overload
+def compute_user_weeks(df: pl.DataFrame) -> pl.DataFrame: ...
+@overload
+def compute_user_weeks(df: pl.LazyFrame) -> pl.LazyFrame: ...
+@instrumented
+def compute_user_weeks(df: Frame) -> Frame:
+    """Collapse cohort data to one row per (UserID, current_week).
+
+    This is the shared fact table behind the weekly metrics: it is built in one pass
+    over the events and is orders of magnitude smaller, so every metric that only
+    needs per-install-per-week values is given it instead of re-grouping the raw
+    events. Columns missing from the input are simply not carried.
+
+    Args:
+        df: Output of :func:`compute_cohort_data` (or any frame with ``UserID`` and
+            ``current_week``).
+
+    Returns:
+        pl.DataFrame: ``UserID``, ``current_week``, ``event_count``, ``peak_clients``,
+        the OR'd feature flags, the lists of distinct ``versions`` and
+        ``auth_providers`` reported that week, and the cohort columns.
+    """
+    columns = df.collect_schema().names()
+
+    aggs = [pl.len().alias("event_count")]
+    aggs += [pl.col(c).first() for c in _USER_WEEK_CONSTANTS if c in columns]
+    if "Clients" in columns:
+        aggs.append(pl.col("Clients").max().alias("peak_clients"))
+    aggs += [pl.col(f).fill_null(False).max() for f in FEATURE_FLAGS if f in columns]
+    aggs += [
+        pl.col(c).unique().alias(alias) for c, alias in _USER_WEEK_DISTINCT.items() if c in columns
+    ]
+
+    return df.group_by(["UserID", "current_week"]).agg(aggs)
+
+
+@overload
+def calculate_cohort_retention(weekly: pl.DataFrame) -> pl.DataFrame: ...
+@overload
+def calculate_cohort_retention(weekly: pl.LazyFrame) -> pl.LazyFrame: ...
+def calculate_cohort_retention(weekly: Frame) -> Frame:
     """Calculate cohort retention rates.
 
     Args:
-        df: Dataframe with cohort data computed.
+        weekly: The user-week table (:func:`compute_user_weeks`).
 
     Returns:
         pl.DataFrame: Cohort counts with retention rates.
     """
     cohort_counts = (
-        df.group_by(["activated_week", "cohort_index"])
-        .agg(pl.col("UserID").n_unique().alias("users"))
+        weekly.drop_nulls("cohort_index")  # installs without a cohort in this view
+        .group_by(["activated_week", "cohort_index"])
+        .agg(pl.len().alias("users"))
         .sort("activated_week")
     )
 
@@ -75,16 +155,16 @@ def prepare_retention_matrix(cohort_counts: pl.DataFrame) -> pl.DataFrame:
     Returns:
         pl.DataFrame: Pivoted retention matrix.
     """
-    retention = (
-        cohort_counts.pivot(
-            on="cohort_index",
-            index="activated_date",
-            values="retention_rate",
-            aggregate_function="first",
-            sort_columns=True,
-        )
-        .tail(RETENTION_MATRIX_TAIL)
-        .select(["activated_date"] + [str(i) for i in range(RETENTION_MATRIX_WEEKS)])
-    )
+    retention = cohort_counts.pivot(
+        on="cohort_index",
+        index="activated_date",
+        values="retention_rate",
+        aggregate_function="first",
+        sort_columns=True,
+    ).tail(RETENTION_MATRIX_TAIL)
+
+    # Short histories (narrow date ranges, small segments) have fewer cohort weeks.
+    weeks = [str(i) for i in range(RETENTION_MATRIX_WEEKS) if str(i) in retention.columns]
+    retention = retention.select(["activated_date", *weeks])
 
     return retention
@@ -0,0 +1,174 @@
+"""Rewrite closed day files into sorted, month-partitioned parquet for analytical scans.
+
+The Go cleanup job writes one ``day-*.parquet`` per day in arrival order, with
+``start`` and ``events`` rows interleaved and default row groups, so a scan can
+rarely skip anything. This job rewrites every closed day (older than
+``COMPACT_AFTER_DAYS``) into a ``compacted/`` store next to the day files, laid out
+hive-style as ``Name=<events|start>/month=YYYY-MM/``:
+
+- the ``Name`` partition turns the loaders' ``Name == ...`` predicate into skipping
+  whole directories, and ``month`` lets time-range scans skip months;
+- rows are sorted by ``UserID`` then ``CreatedAt``, with the dense ``UserID`` and
+  ``id_from_ip`` already derived, so per-install group-bys read clustered keys and
+  no identity join is needed at load time;
+- row groups are ``COMPACTED_ROW_GROUP_ROWS`` long and the low-cardinality strings
+  (Version, AuthProvider, Browser) are dictionary encoded.
+
+A month is rewritten whenever one of its day files is new, changed or removed, and
+every month when the install-id dictionary the store was built against has been
+rebuilt (the manifest records its :func:`install_ids.dictionary_id`; until then
+readers ignore the store). The manifest lists the partition files of the current
+generation, and :func:`data_loader._scan` reads exactly those, so readers switch
+over atomically. Replaced files are listed as retired and only deleted after
+``COMPACTED_RETENTION_SECONDS``, so scans planned from the previous manifest can
+still finish. The day files themselves are left untouched.
+
+Usage (from ``notebooks/``)::
+
+    python compaction.py
+"""
+
+import argparse
+import json
+import time
+from datetime import UTC, date, datetime, timedelta
+from pathlib import Path
+
+import polars as pl
+import pyarrow.parquet as pq
+from config import (
+    COMPACT_AFTER_DAYS,
+    COMPACTED_DIRNAME,
+    COMPACTED_MANIFEST,
+    COMPACTED_RETENTION_SECONDS,
+    COMPACTED_ROW_GROUP_ROWS,
+    DATA_PATH,
+)
+from data_loader import compacted_manifest, file_day, list_day_files, scan_day_files
+from install_ids import dictionary_id, refresh_install_ids
+
+_DICTIONARY_COLUMNS = ["Version", "AuthProvider", "Browser"]
+
+_SORT_COLUMNS = ["UserID", "CreatedAt"]
+
+
+def _file_key(path: Path) -> dict:
+    stat = path.stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _unchanged(entry: dict | None, path: Path) -> bool:
+    key = _file_key(path)
+    return entry is not None and all(entry[k] == v for k, v in key.items())
+
+
+def _month(day: date) -> str:
+    return f"{day:%Y-%m}"
+
+
+def _write_partition(frame: pl.DataFrame, path: Path) -> None:
+    table = frame.sort(_SORT_COLUMNS).to_arrow()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.tmp")
+    pq.write_table(
+        table,
+        tmp,
+        row_group_size=COMPACTED_ROW_GROUP_ROWS,
+        use_dictionary=_DICTIONARY_COLUMNS,
+        compression="zstd",
+        sorting_columns=pq.SortingColumn.from_ordering(
+            table.schema, [(c, "ascending") for c in _SORT_COLUMNS]
+        ),
+    )
+    tmp.replace(path)
+
+
+def _write_manifest(
+    store: Path, days: dict, files: list[str], retired: dict[str, float], install_ids: str | None
+) -> None:
+    manifest = {
+        "install_ids": install_ids,
+        "days": days,
+        "files": sorted(files),
+        "retired": retired,
+    }
+    tmp = store / f"{COMPACTED_MANIFEST}.tmp"
+    tmp.write_text(json.dumps(manifest, indent=1))
+    tmp.replace(store / COMPACTED_MANIFEST)
+
+
+def _partition_month(relative: str) -> str:
+    return Path(relative).parent.name.removeprefix("month=")
+
+
+def compact(data_glob: str = DATA_PATH, today: date | None = None) -> list[str]:
+    """Bring the compacted store in line with the closed day files.
+
+    Args:
+        data_glob: Glob pattern matching the daily parquet files.
+        today: Current UTC day; days within ``COMPACT_AFTER_DAYS`` of it stay raw.
+
+    Returns:
+        list[str]: The months (``YYYY-MM``) that were rewritten.
+    """
+    today = today or datetime.now(UTC).date()
+    store = Path(data_glob).parent / COMPACTED_DIRNAME
+    manifest = compacted_manifest(data_glob)
+    days, files = dict(manifest["days"]), list(manifest["files"])
+    retired = dict(manifest["retired"])
+
+    closed: dict[str, Path] = {}
+    months: dict[str, str] = {}
+    last_closed = today - timedelta(days=COMPACT_AFTER_DAYS)
+    for path in map(Path, list_day_files(data_glob, end=last_closed)):
+        day = file_day(path)
+        if day is not None:  # a name without a day has no month to go in: it stays raw
+            closed[path.name], months[path.name] = path, _month(day)
+    refresh_install_ids(data_glob, [str(p) for p in closed.values()])
+    install_ids = dictionary_id(data_glob)
+    stale = set()
+    if manifest["install_ids"] != install_ids:
+        # The stored ids index another dictionary: rewrite (or drop) every month.
+        stale = {_partition_month(f) for f in files}
+        days = {}
+    stale |= {
+        months[name] for name, path in closed.items() if not _unchanged(days.get(name), path)
+    } | {entry["month"] for name, entry in days.items() if name not in closed}
+
+    generation = datetime.now(UTC).strftime("%Y%m%dT%H%M%S%f")
+    for month in sorted(stale):
+        in_month = {name: path for name, path in closed.items() if months[name] == month}
+        old = [f for f in files if _partition_month(f) == month]
+        new = []
+        if in_month:
+            rows = scan_day_files([str(p) for p in in_month.values()], data_glob).collect()
+            for (name,), part in rows.drop_nulls("Name").partition_by("Name", as_dict=True).items():
+                relative = f"Name={name}/month={month}/part-{generation}.parquet"
+                _write_partition(part.drop("Name"), store / relative)
+                new.append(relative)
+
+        files = [f for f in files if f not in old] + new
+        retired.update(dict.fromkeys(old, time.time()))
+        days = {name: entry for name, entry in days.items() if entry["month"] != month}
+        days.update({name: {**_file_key(path), "month": month} for name, path in in_month.items()})
+        _write_manifest(store, days, files, retired, install_ids)
+
+    expired = [f for f, at in retired.items() if time.time() - at >= COMPACTED_RETENTION_SECONDS]
+    if expired:
+        retired = {f: at for f, at in retired.items() if f not in expired}
+        _write_manifest(store, days, files, retired, install_ids)
+        for relative in expired:
+            (store / relative).unlink(missing_ok=True)
+    return sorted(stale)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=(__doc__ or "").partition("\n")[0])
+    parser.add_argument("--data", default=DATA_PATH, help="Glob of the day files")
+    args = parser.parse_args()
+    months = compact(args.data)
+    print(f"rewrote {len(months)} months: {', '.join(months) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
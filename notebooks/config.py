@@ -1,5 +1,6 @@
 """Configuration constants for the Dozzle Retention Analysis dashboard."""
 
+import os
 from datetime import UTC, datetime
 
 # Baseline date for cohort analysis
@@ -8,18 +9,117 @@ BASELINE = datetime(year=2020, month=1, day=1).replace(tzinfo=UTC)
 # Data file path pattern
 DATA_PATH = "./data/day-*.parquet"
 
+# Per-day rollups are persisted in this subdirectory next to the day files
+ROLLUP_DIRNAME = "rollups"
+
+# Metric results of the precompute job are written to this subdirectory
+RESULTS_DIRNAME = "results"
+RESULTS_MANIFEST = "manifest.json"
+
+# Memory-mapped Arrow IPC snapshots of the processed frames live in this subdirectory
+SNAPSHOTS_DIRNAME = "snapshots"
+SNAPSHOTS_MANIFEST = "manifest.json"
+# Seconds after the last change before the current frames are written, in the background:
+# a burst of new day files is persisted once, and refreshes never wait on the write.
+SNAPSHOT_PERSIST_DELAY_SECONDS = 10.0
+# Directory of the snapshots instead of the subdirectory above; point it at a tmpfs
+# (e.g. /dev/shm/drain) to keep the shared frames in memory rather than the page cache.
+SNAPSHOTS_DIR = os.environ.get("DRAIN_SNAPSHOTS_DIR")
+
+# Where the dashboard's base frames come from: "local" builds and refreshes them in each
+# process; "shared" maps the snapshots a single loader process publishes
+# (``python live_data.py``), so every replica on the host shares one copy.
+FRAMES_SOURCE = os.environ.get("DRAIN_FRAMES_SOURCE", "local")
+# How long a "shared" worker waits for the loader's first snapshot, and how often it
+# checks for it and for newer ones (releasing its mapping of the one it replaces).
+SHARED_FRAMES_WAIT_SECONDS = 600
+SHARED_FRAMES_POLL_SECONDS = 1.0
+
+# Closed days are rewritten into sorted, month-partitioned parquet in this subdirectory
+COMPACTED_DIRNAME = "compacted"
+COMPACTED_MANIFEST = "manifest.json"
+# Days younger than this are left to the day files (they may still be rewritten)
+COMPACT_AFTER_DAYS = 2
+# Rows per parquet row group in the compacted store
+COMPACTED_ROW_GROUP_ROWS = 128 * 1024
+# Partition files replaced by a recompaction are kept this long, for scans planned
+# from the previous manifest; a later compaction run deletes them.
+COMPACTED_RETENTION_SECONDS = 3600
+
+# Cached size, mtime, CreatedAt bounds and per-beacon row counts of each day file, next to
+# the day files
+DAY_MANIFEST_FILENAME = "day_manifest.json"
+
+# Dictionary of dense install ids, persisted next to the day files
+INSTALL_IDS_FILENAME = "install_ids.parquet"
+
+# First event / first start beacon of every install, persisted next to the day files
+ACTIVATIONS_FILENAME = "activations.parquet"
+
+# Browser/OS family of every user-agent seen so far, persisted next to the day files
+USER_AGENTS_FILENAME = "user_agents.parquet"
+
+# Seconds to wait after the last change to a day file before loading it
+REFRESH_DEBOUNCE_SECONDS = 5.0
+
+# Feature-flag columns surfaced in adoption charts and segmentation.
+FEATURE_FLAGS = [
+    "HasActions",
+    "HasHostname",
+    "HasCustomAddress",
+    "HasCustomBase",
+    "HasShell",
+]
+
 # Dashboard configuration
 PAGE_TITLE = "Dozzle Retention Analysis"
 PAGE_LAYOUT = "wide"
 
+# "eager" computes each metric in turn; "lazy" builds the whole metric graph and runs
+# it with a single collect_all so shared scans and group-bys are computed once.
+METRICS_MODE = os.environ.get("DRAIN_METRICS_MODE", "eager")
+
+# Metrics computed concurrently (eager mode) on one thread pool of this size shared by
+# every session; Polars releases the GIL while it works. 1 computes them in the
+# session's own thread.
+METRIC_WORKERS = int(os.environ.get("DRAIN_METRIC_WORKERS", "4"))
+
+# Per-tab metric results kept across reruns, keyed by snapshot, time range and segment
+TAB_RESULTS_CACHE_ENTRIES = 64
+
+# Show the Performance tab (per-stage timings of each rerun) and log the timings as JSON
+# lines on the "drain.perf" logger. Also enabled per session with the ?perf=1 URL parameter.
+PERF_PANEL = os.environ.get("DRAIN_PERF_PANEL", "0") == "1"
+
+# Load frames with compact column types: dictionary-encoded strings, narrow integers and
+# the Int32 week index computed once at load. "0" keeps the raw parquet column types.
+COMPACT_FRAMES = os.environ.get("DRAIN_COMPACT_FRAMES", "1") == "1"
+
+# Polars engine for collecting scans and metrics: "in-memory", "streaming", or "auto" to
+# stream whenever the estimated in-memory size of the data would not fit comfortably.
+# Any other value is rejected by data_loader.collect_engine.
+COLLECT_ENGINE = os.environ.get("DRAIN_COLLECT_ENGINE", "auto")
+# Rough decompressed-in-memory / on-disk parquet size ratio used by the "auto" choice.
+PARQUET_EXPANSION_FACTOR = 8
+# Fraction of the available memory the in-memory engine may plan to use.
+IN_MEMORY_BUDGET_FRACTION = 0.5
+
 # Visualization settings
 HEATMAP_HEIGHT = 600
 HEATMAP_WIDTH = 900
 HEATMAP_COLOR_SCALE = "Viridis"
 HEATMAP_GAP = 2
+# Time series longer than this many points per series are downsampled (LTTB) for charting
+CHART_POINT_BUDGET = int(os.environ.get("DRAIN_CHART_POINT_BUDGET", "500"))
+# Line charts with at least this many points in total are drawn with WebGL traces
+WEBGL_MIN_POINTS = 1000
+# Built figures kept across reruns and sessions, keyed by chart and input data
+FIGURE_CACHE_ENTRIES = 128
 
 # Analysis parameters
 RECENT_WEEKS_COUNT = 4
+# Trailing windows (in days) of the daily active-installs chart
+ACTIVE_WINDOWS_DAYS = [1, 7, 30, 90]
 RETENTION_MATRIX_TAIL = 10
 RETENTION_MATRIX_WEEKS = 8
 USAGE_DETAILS_TAIL = 20
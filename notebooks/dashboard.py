@@ -1,39 +1,43 @@
 """Streamlit dashboard for Dozzle retention and usage analysis."""
 
+import functools
+from collections.abc import Callable, Mapping
+from datetime import date
+from typing import Any, cast
+
 import polars as pl
 import streamlit as st
-from attribute_analysis import (
-    CONTAINER_BUCKETS,
-    FEATURE_FLAGS,
-    calculate_auth_mix,
-    calculate_browser_mix,
-    calculate_concurrent_clients,
-    calculate_deployment_scale,
-    calculate_feature_adoption,
-    calculate_install_attributes,
-    calculate_new_installs,
-    calculate_version_adoption,
-    filter_installs,
-)
+from attribute_analysis import CONTAINER_BUCKETS, FEATURE_FLAGS
 from cohort_analysis import (
-    calculate_cohort_retention,
     compute_cohort_data,
+    compute_user_weeks,
     prepare_retention_matrix,
 )
-from config import COHORT_DETAILS_HEAD, PAGE_LAYOUT, PAGE_TITLE
-from data_loader import (
-    calculate_identity_quality,
-    load_and_process_data,
-    load_start_beacons,
+from config import (
+    COHORT_DETAILS_HEAD,
+    FRAMES_SOURCE,
+    METRICS_MODE,
+    PAGE_LAYOUT,
+    PAGE_TITLE,
+    PERF_PANEL,
+    TAB_RESULTS_CACHE_ENTRIES,
 )
-from engagement_analysis import (
-    calculate_cohort_engagement_metrics,
-    calculate_engagement_depth,
-    calculate_stickiness_metrics,
-    calculate_user_lifecycle_metrics,
+from data_loader import (
+    collect_engine,
+    file_day,
+    list_day_files,
+    load_events_and_starts,
+    scan_events,
+    scan_start_beacons,
 )
-from usage_analysis import calculate_usage_frequency
+from frames import Engine, Frame
+from instrumentation import StageLog, recording, stage
+from live_data import LiveFrames, SharedFrames, Snapshot
+from metrics import MetricResults, compute_metrics
+from precompute import read_results, results_stamp
+from segment_index import SegmentIndex, build_segment_index, filter_rows
 from visualizations import (
+    display_active_installs_analysis,
     display_auth_mix_analysis,
     display_browser_mix_analysis,
     display_cohort_engagement_analysis,
@@ -63,46 +67,128 @@ DEAD_TELEMETRY_COLUMNS = [
 st.set_page_config(page_title=PAGE_TITLE, layout=PAGE_LAYOUT)
 
 
-@st.cache_resource(ttl=3600)
-def get_events() -> pl.DataFrame:
-    """Load the events beacons once. Cached as a large read-only resource."""
-    return load_and_process_data()
-
-
-@st.cache_resource(ttl=3600)
-def get_cohort_full() -> pl.DataFrame:
-    """Cohort-computed events for the unsegmented (whole-population) view."""
-    return compute_cohort_data(get_events())
-
-
-@st.cache_resource(ttl=3600)
-def get_install_attributes() -> pl.DataFrame:
-    """Per-install latest attributes, used for distributions and segmentation."""
-    return calculate_install_attributes(get_events())
-
-
-@st.cache_resource(ttl=3600)
-def get_starts() -> pl.DataFrame:
-    """Start (app-launch) beacons for new-install analysis."""
-    return load_start_beacons()
+# Metrics each tab shows; a tab computes only these, and only while it is open.
+TAB_METRICS = {
+    "Overview": ["quality", "stickiness", "new_installs"],
+    "Retention": ["cohort_counts", "cohort_engagement"],
+    "Usage & Stickiness": [
+        "usage_frequency",
+        "stickiness",
+        "active_installs",
+        "concurrent_clients",
+        "engagement_depth",
+    ],
+    "Lifecycle": ["lifecycle", "new_installs"],
+    "Deployments": ["deployment_scale", "auth_mix", "browser_mix"],
+    "Versions": ["version_adoption", "feature_adoption"],
+}
+
+
+@st.cache_resource
+def get_live_frames() -> LiveFrames | SharedFrames:
+    """Base frames shared by every session, refreshed in the background as day files land.
+
+    Never expires: a watcher appends each new day file and swaps in a new snapshot. With
+    ``FRAMES_SOURCE = "shared"`` the snapshots published by the host's loader process
+    are mapped instead, so replicas do not each hold a copy.
+    """
+    frames_type = SharedFrames if FRAMES_SOURCE == "shared" else LiveFrames
+    live = frames_type(materialize=collect_engine() != "streaming")
+    live.start()
+    return live
+
+
+@st.cache_resource(max_entries=8)
+def get_collect_engine(start: date | None, end: date | None, generation: int) -> Engine:
+    """The engine for a time range; decided once per snapshot, as it stats every day file."""
+    return collect_engine(start=start, end=end)
+
+
+@st.cache_resource(max_entries=4)
+def get_beacons_between(
+    start: date, end: date, generation: int
+) -> tuple[pl.DataFrame, pl.DataFrame]:
+    """Events and start beacons of a date window; only the day files inside it are read.
+
+    ``generation`` (of the live snapshot) is part of the cache key so a window is
+    reloaded once new data has arrived.
+    """
+    return load_events_and_starts(start=start, end=end)
+
+
+@st.cache_resource(max_entries=1)
+def get_precomputed_results(generation: int, stamp: int, _snapshot: Snapshot) -> dict | None:
+    """Results of ``precompute.py`` if they were computed from this snapshot's day files.
+
+    ``stamp`` (see :func:`precompute.results_stamp`) reloads them once the job reruns.
+    """
+    return read_results(files=_snapshot.files)
+
+
+@st.cache_resource(max_entries=TAB_RESULTS_CACHE_ENTRIES, show_spinner="Computing this tab...")
+def get_tab_metrics(
+    tab: str,
+    generation: int,
+    start: date | None,
+    end: date | None,
+    selections: dict,
+    engine: str,
+    _build_sources: Callable[[], dict],
+) -> dict[str, Any]:
+    """One tab's metrics for one view (snapshot, time range, segment), computed once.
+
+    ``_build_sources`` prepares the metric inputs and is only called on a miss.
+    """
+    names = TAB_METRICS[tab]
+    results = compute_metrics(_build_sources(), cast(Engine, engine), names=names)
+    # Waiting cancels the queued metrics if the rerun is stopped meanwhile.
+    return results.wait() if isinstance(results, MetricResults) else dict(results)
+
+
+@st.cache_resource(max_entries=2)
+def get_segment_index(generation: int, _snapshot: Snapshot) -> SegmentIndex:
+    """Segmentation index of a snapshot's installs, built once per generation."""
+    return build_segment_index(_snapshot.attrs)
+
+
+def _options(index: SegmentIndex, column: str, limit: int | None = None) -> list:
+    values = index.options(column)
+    return values[:limit] if limit else values
+
+
+def build_date_range() -> tuple[date | None, date | None]:
+    """Render the sidebar date-range control; ``(None, None)`` means the full history."""
+    days = sorted(day for day in map(file_day, list_day_files()) if day)
+    if not days:
+        return None, None
+
+    st.sidebar.header("Time range")
+    picked = st.sidebar.date_input(
+        "Days", value=(days[0], days[-1]), min_value=days[0], max_value=days[-1]
+    )
+    if not isinstance(picked, tuple) or len(picked) != 2 or picked == (days[0], days[-1]):
+        return None, None
+    return picked[0], picked[1]
 
 
-def _options(attrs: pl.DataFrame, column: str, limit: int | None = None) -> list:
-    counts = attrs[column].drop_nulls().value_counts(sort=True)[column].to_list()
-    return counts[:limit] if limit else counts
+def _active_installs(attrs: Frame, events: Frame) -> Frame:
+    """Restrict install attributes to the installs that have events in ``events``."""
+    active = events.lazy().select("UserID").unique()
+    joined = attrs.lazy().join(active, on="UserID", how="semi")
+    return joined if isinstance(events, pl.LazyFrame) else joined.collect()
 
 
-def build_segment_selections(attrs: pl.DataFrame) -> dict:
+def build_segment_selections(index: SegmentIndex) -> dict:
     """Render sidebar segmentation controls and return the active selections."""
     st.sidebar.header("Segment installs")
     st.sidebar.caption("Filters re-slice every chart by install attributes.")
 
     selections: dict = {}
-    version = st.sidebar.multiselect("Version", _options(attrs, "Version", limit=30))
+    version = st.sidebar.multiselect("Version", _options(index, "Version", limit=30))
     if version:
         selections["Version"] = version
 
-    auth = st.sidebar.multiselect("Auth provider", _options(attrs, "AuthProvider"))
+    auth = st.sidebar.multiselect("Auth provider", _options(index, "AuthProvider"))
     if auth:
         selections["AuthProvider"] = auth
 
@@ -110,11 +196,11 @@ def build_segment_selections(attrs: pl.DataFrame) -> dict:
     if size:
         selections["container_bucket"] = size
 
-    browser = st.sidebar.multiselect("Browser", _options(attrs, "browser_family"))
+    browser = st.sidebar.multiselect("Browser", _options(index, "browser_family"))
     if browser:
         selections["browser_family"] = browser
 
-    os_family = st.sidebar.multiselect("OS", _options(attrs, "os_family"))
+    os_family = st.sidebar.multiselect("OS", _options(index, "os_family"))
     if os_family:
         selections["os_family"] = os_family
 
@@ -127,70 +213,159 @@ def build_segment_selections(attrs: pl.DataFrame) -> dict:
 
 def main() -> None:
     """Main dashboard function."""
+    if PERF_PANEL or st.query_params.get("perf") == "1":
+        with recording() as log:
+            _render_dashboard(log)
+    else:
+        _render_dashboard(None)
+
+
+def _render_dashboard(perf_log: StageLog | None) -> None:
+    """Render the sidebar and the selected tab; ``perf_log`` adds the Performance tab."""
     st.title("Dozzle Usage & Retention Analysis")
 
+    start, end = build_date_range()
+    windowed = start is not None and end is not None
+
     with st.spinner("Loading and processing data..."):
-        events = get_events()
-        attrs = get_install_attributes()
+        snapshot = get_live_frames().snapshot
+
+    # Streaming: never materialize the events; every metric aggregates from the scan.
+    engine = get_collect_engine(start, end, snapshot.generation)
+    frames = snapshot.frames
+    streaming = engine == "streaming" or frames is None
+    attrs = snapshot.attrs
+    if streaming:
+        events = scan_events(start=start, end=end)
+        starts = scan_start_beacons(start=start, end=end)
+    elif windowed:
+        with st.spinner("Loading the selected time range..."):
+            events, starts = get_beacons_between(start, end, snapshot.generation)
+    else:
+        events, starts = frames.events, frames.starts
 
-    selections = build_segment_selections(attrs)
+    index = get_segment_index(snapshot.generation, snapshot)
+    selections = build_segment_selections(index)
+    mask = None
     if selections:
-        ids = filter_installs(attrs, selections)
-        if ids.len() == 0:
+        mask = index.select(selections)
+        installs = int(mask.sum())
+        if installs == 0:
             st.warning("No installs match the current segment. Adjust the sidebar filters.")
             return
-        id_set = ids.implode()  # implode -> unambiguous membership test (polars #22149)
-        df = compute_cohort_data(events.filter(pl.col("UserID").is_in(id_set)))
-        attrs = attrs.filter(pl.col("UserID").is_in(id_set))
-        starts = get_starts().filter(pl.col("UserID").is_in(id_set))
-        st.sidebar.success(f"Segment: {ids.len():,} installs")
-    else:
-        df = get_cohort_full()
-        starts = get_starts()
+        st.sidebar.success(f"Segment: {installs:,} installs")
+
+    @functools.cache
+    def build_sources() -> dict:
+        """The metric inputs of this view; built only when a tab's results are not cached."""
+        view = (attrs, events, starts)
+        if mask is not None:
+            with stage("segment_rows", events) as s:
+                view = tuple(filter_rows(f, mask) for f in view)
+                s.output = view[1]
+        view_attrs, view_events, view_starts = view
+        if frames is None or selections or streaming or windowed or METRICS_MODE == "lazy":
+            source = view_events.lazy() if METRICS_MODE == "lazy" else view_events
+            # Activations come from the first-seen table (segments keep whole installs).
+            # In a time window only the cohorts that began inside it are kept: earlier
+            # installs are active but not new, and have no cohort columns.
+            activations = snapshot.activations
+            if windowed:
+                activations = activations.filter(pl.col("activated").dt.date() >= start)
+            df = compute_cohort_data(source, activations)
+            weekly = compute_user_weeks(df)
+        else:
+            df, weekly = frames.cohort, frames.user_weeks
+        if windowed:
+            view_attrs = _active_installs(view_attrs, view_events)
+        return {"events": df, "weekly": weekly, "starts": view_starts, "attrs": view_attrs}
+
+    # The whole-history view is served from the precompute job's results when current.
+    precomputed = None
+    if not (selections or windowed):
+        precomputed = get_precomputed_results(snapshot.generation, results_stamp(), snapshot)
+
+    def tab_metrics(tab: str) -> Mapping[str, Any]:
+        if precomputed is not None:
+            return {name: precomputed[name] for name in TAB_METRICS[tab]}
+        return get_tab_metrics(
+            tab, snapshot.generation, start, end, selections, engine, build_sources
+        )
 
-    overview, retention_tab, usage_tab, lifecycle_tab, deploy_tab, version_tab = st.tabs(
-        ["Overview", "Retention", "Usage & Stickiness", "Lifecycle", "Deployments", "Versions"]
-    )
+    tab_names = list(TAB_METRICS)
+    if perf_log is not None:
+        tab_names.append("Performance")
+    _render_tabs(tab_names, tab_metrics, perf_log)
+
+
+@st.fragment
+def _render_tabs(
+    tab_names: list[str],
+    tab_metrics: Callable[[str], Mapping[str, Any]],
+    perf_log: StageLog | None,
+) -> None:
+    """Render only the selected tab, computing just the metrics it shows.
+
+    Switching tabs reruns this fragment alone, not the sidebar and data preparation; a
+    fragment rerun shows the Performance stages of the last full rerun.
+    """
+    tabs = st.tabs(tab_names, key="tab", on_change="rerun")
+    for name, tab in zip(tab_names, tabs, strict=True):
+        if not tab.open:
+            continue
+        with tab:
+            if name != "Performance":
+                _TAB_RENDERERS[name](tab_metrics(name))
+            elif perf_log is not None:
+                _render_performance(perf_log)
 
-    quality = calculate_identity_quality(df)
-    new_installs = calculate_new_installs(starts)
-    stickiness_df, stickiness_stats = calculate_stickiness_metrics(df)
 
-    with overview:
-        _render_overview(quality, stickiness_stats, new_installs)
+def _render_retention(m: Mapping[str, Any]) -> None:
+    cohort_counts = m["cohort_counts"]
+    display_retention_heatmap(prepare_retention_matrix(cohort_counts))
+    with st.expander(f"Show top {COHORT_DETAILS_HEAD} rows"):
+        st.dataframe(cohort_counts.head(COHORT_DETAILS_HEAD))
+    display_cohort_engagement_analysis(m["cohort_engagement"])
 
-    with retention_tab:
-        cohort_counts = calculate_cohort_retention(df)
-        display_retention_heatmap(prepare_retention_matrix(cohort_counts))
-        with st.expander(f"Show top {COHORT_DETAILS_HEAD} rows"):
-            st.dataframe(cohort_counts.head(COHORT_DETAILS_HEAD))
-        display_cohort_engagement_analysis(calculate_cohort_engagement_metrics(df))
 
-    with usage_tab:
-        usage_frequency, overall_avg = calculate_usage_frequency(df)
-        display_usage_frequency_analysis(usage_frequency, overall_avg)
-        display_stickiness_analysis(stickiness_df, stickiness_stats)
-        display_concurrent_clients_analysis(calculate_concurrent_clients(df))
-        display_engagement_depth_analysis(calculate_engagement_depth(df))
+def _render_usage(m: Mapping[str, Any]) -> None:
+    display_usage_frequency_analysis(*m["usage_frequency"])
+    display_stickiness_analysis(*m["stickiness"])
+    display_active_installs_analysis(m["active_installs"])
+    display_concurrent_clients_analysis(m["concurrent_clients"])
+    display_engagement_depth_analysis(m["engagement_depth"])
 
-    with lifecycle_tab:
-        display_user_lifecycle_analysis(calculate_user_lifecycle_metrics(df))
-        display_new_installs_analysis(new_installs)
 
-    with deploy_tab:
-        display_deployment_scale_analysis(calculate_deployment_scale(attrs))
-        display_auth_mix_analysis(calculate_auth_mix(df))
-        browser_df, os_df = calculate_browser_mix(attrs)
-        display_browser_mix_analysis(browser_df, os_df)
+def _render_lifecycle(m: Mapping[str, Any]) -> None:
+    display_user_lifecycle_analysis(m["lifecycle"])
+    display_new_installs_analysis(m["new_installs"])
 
-    with version_tab:
-        display_version_adoption_analysis(calculate_version_adoption(df))
-        display_feature_adoption_analysis(calculate_feature_adoption(df))
 
+def _render_deployments(m: Mapping[str, Any]) -> None:
+    display_deployment_scale_analysis(m["deployment_scale"])
+    display_auth_mix_analysis(m["auth_mix"])
+    display_browser_mix_analysis(*m["browser_mix"])
 
-def _render_overview(quality: dict, stickiness_stats: dict, new_installs: pl.DataFrame) -> None:
+
+def _render_versions(m: Mapping[str, Any]) -> None:
+    display_version_adoption_analysis(m["version_adoption"])
+    display_feature_adoption_analysis(m["feature_adoption"])
+
+
+def _render_performance(perf_log: StageLog) -> None:
+    """Per-stage timings of this rerun; nested stages are indented under their caller."""
+    st.header("Performance")
+    stages = perf_log.to_frame()
+    top_level = stages.filter(pl.col("depth") == 0)["seconds"].sum()
+    st.caption(f"{stages.height} stages · {top_level:.2f}s in top-level stages this rerun.")
+    st.dataframe(stages.drop("depth"), width="stretch", hide_index=True)
+
+
+def _render_overview(m: Mapping[str, Any]) -> None:
     """Top-level KPIs plus data-quality caveats."""
     st.header("Overview")
+    quality, new_installs = m["quality"], m["new_installs"]
+    _, stickiness_stats = m["stickiness"]
 
     col1, col2, col3, col4 = st.columns(4)
     col1.metric("Installs", f"{quality['total_users']:,}")
@@ -219,5 +394,15 @@ def _render_overview(quality: dict, stickiness_stats: dict, new_installs: pl.Dat
         )
 
 
+_TAB_RENDERERS: dict[str, Callable[[Mapping[str, Any]], None]] = {
+    "Overview": _render_overview,
+    "Retention": _render_retention,
+    "Usage & Stickiness": _render_usage,
+    "Lifecycle": _render_lifecycle,
+    "Deployments": _render_deployments,
+    "Versions": _render_versions,
+}
+
+
 if __name__ == "__main__":
     main()
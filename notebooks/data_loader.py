@@ -1,9 +1,29 @@
 """Data loading and processing utilities for retention analysis."""
 
-from typing import cast
+import json
+import os
+import re
+from collections.abc import Collection
+from datetime import UTC, date, datetime, timedelta
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import cast, get_args, overload
 
 import polars as pl
-from config import DATA_PATH
+from cohort_analysis import week_index
+from config import (
+    COLLECT_ENGINE,
+    COMPACT_FRAMES,
+    COMPACTED_DIRNAME,
+    COMPACTED_MANIFEST,
+    DATA_PATH,
+    IN_MEMORY_BUDGET_FRACTION,
+    PARQUET_EXPANSION_FACTOR,
+)
+from day_manifest import DayFileEntry, refresh_day_manifest
+from frames import Engine, LazySummary, summarize
+from install_ids import dictionary_id, id_from_ip_expr, identity_expr, refresh_install_ids
+from instrumentation import instrumented
 
 # Explicit read schema: exactly the columns we analyse/chart. Listing them here means
 # the scan reads only these (projection pushdown), tolerates schema drift across files
@@ -30,48 +50,341 @@ _SCAN_SCHEMA = {
 # Raw identity columns dropped once UserID/id_from_ip are derived from them.
 _IDENTITY_COLUMNS = ["ServerID", "RemoteIP"]
 
+# Columns of every scan: the read schema with the identity columns replaced.
+_SCAN_COLUMNS = [
+    *(c for c in _SCAN_SCHEMA if c not in _IDENTITY_COLUMNS),
+    "id_from_ip",
+    "UserID",
+]
 
-def _scan(data_glob: str) -> pl.LazyFrame:
-    """Lazily scan the daily parquet files and derive the stable identity columns."""
-    return (
+# Compact in-memory types of the loaded columns: the low-cardinality strings (and the
+# user-agent, repeated on every row of an install) become dictionary codes and the
+# counters fit 32 bits. Applied after the Name filter so it is still pushed into the read.
+_COMPACT_TYPES = {
+    "Name": pl.Categorical,
+    "Version": pl.Categorical,
+    "AuthProvider": pl.Categorical,
+    "Browser": pl.Categorical,
+    "RunningContainers": pl.Int32,
+    "Clients": pl.Int32,
+}
+
+# The Go cleanup job names each merged file after its UTC day: day-YYYY-MM-DD.parquet.
+_DAY_FILE = re.compile(r"day-(\d{4}-\d{2}-\d{2})\.parquet$")
+
+
+def file_day(path: str | Path) -> date | None:
+    """The UTC day encoded in a ``day-YYYY-MM-DD.parquet`` file name, if any."""
+    match = _DAY_FILE.search(Path(path).name)
+    return date.fromisoformat(match.group(1)) if match else None
+
+
+def list_day_files(
+    data_glob: str = DATA_PATH, start: date | None = None, end: date | None = None
+) -> list[str]:
+    """List the day files matching ``data_glob`` whose day falls within ``[start, end]``.
+
+    Pruning happens on the file name alone, so files outside the window are never
+    opened. Files whose name carries no day are always kept.
+
+    Args:
+        data_glob: Glob pattern matching the daily parquet files.
+        start: First day to include (inclusive), or ``None`` for no lower bound.
+        end: Last day to include (inclusive), or ``None`` for no upper bound.
+
+    Returns:
+        list[str]: Matching file paths in name order.
+    """
+    pattern = Path(data_glob)
+    paths = []
+    for path in sorted(pattern.parent.glob(pattern.name)):
+        day = file_day(path)
+        if day is not None and ((start and day < start) or (end and day > end)):
+            continue
+        paths.append(str(path))
+    return paths
+
+
+def _day_start(day: date) -> datetime:
+    return datetime(day.year, day.month, day.day, tzinfo=UTC)
+
+
+def compacted_manifest(data_glob: str = DATA_PATH) -> dict:
+    """The compacted store's manifest (see :mod:`compaction`).
+
+    Args:
+        data_glob: Glob pattern matching the daily parquet files.
+
+    Returns:
+        dict: ``days`` (day file name -> ``{"size", "mtime_ns", "month"}`` when it was
+        compacted), ``files`` (partition files, relative to the store), ``retired``
+        (replaced partition files -> when, awaiting deletion) and ``install_ids`` (the
+        :func:`install_ids.dictionary_id` of the stored ids). Only the listed files
+        are read, so a compaction in progress is never seen half-done.
+    """
+    manifest = Path(data_glob).parent / COMPACTED_DIRNAME / COMPACTED_MANIFEST
+    empty = {"days": {}, "files": [], "retired": {}, "install_ids": None}
+    if not manifest.exists():
+        return empty
+    try:
+        return {**empty, **json.loads(manifest.read_text())}
+    except json.JSONDecodeError:
+        return empty
+
+
+def scan_day_files(paths: list[str], data_glob: str = DATA_PATH) -> pl.LazyFrame:
+    """Lazily scan raw day files and derive ``id_from_ip`` and the dense ``UserID``.
+
+    The install-id dictionary is brought up to date with ``paths`` first.
+
+    Args:
+        paths: Day files to scan.
+        data_glob: Glob pattern of all day files; locates the install-id dictionary.
+
+    Returns:
+        pl.LazyFrame: The scan columns without the raw identity columns.
+    """
+    ids = refresh_install_ids(data_glob, paths)
+    raw = (
         pl.scan_parquet(
-            data_glob,
-            schema=_SCAN_SCHEMA,
-            missing_columns="insert",
-            extra_columns="ignore",
+            paths, schema=_SCAN_SCHEMA, missing_columns="insert", extra_columns="ignore"
         )
-        .with_columns(
-            (pl.col("ServerID").is_null() | (pl.col("ServerID") == "")).alias("id_from_ip")
-        )
-        .with_columns(
-            pl.when(pl.col("id_from_ip"))
-            .then(pl.col("RemoteIP").hash())
-            .otherwise(pl.col("ServerID").hash())
-            .alias("UserID")
+        if paths
+        else pl.LazyFrame(schema=_SCAN_SCHEMA)
+    )
+    return (
+        raw.with_columns(id_from_ip_expr().alias("id_from_ip"), identity_expr().alias("identity"))
+        .join(ids.lazy(), on="identity", how="left", maintain_order="left")
+        .select(_SCAN_COLUMNS)
+    )
+
+
+def _scan_compacted(
+    data_glob: str, files: list[str], start: date | None = None, end: date | None = None
+) -> pl.LazyFrame | None:
+    """Lazily scan the compacted ``Name=…/month=…`` partitions overlapping the window."""
+    store = Path(data_glob).parent / COMPACTED_DIRNAME
+    first = f"{start:%Y-%m}" if start else ""
+    last = f"{end:%Y-%m}" if end else "9999-99"
+    paths = [
+        store / name
+        for name in files
+        if first <= Path(name).parent.name.removeprefix("month=") <= last
+    ]
+    if not paths:
+        return None
+    return pl.scan_parquet(
+        paths,
+        hive_partitioning=True,
+        hive_schema={"Name": pl.String, "month": pl.String},
+    ).select(_SCAN_COLUMNS)
+
+
+def _overlaps(entry: DayFileEntry, start: date | None, end: date | None, name: str | None) -> bool:
+    """Whether a day file can hold rows of beacon ``name`` within ``[start, end]``."""
+    if name is not None and not entry.name_rows.get(name):
+        return False
+    if entry.min_created is None or entry.max_created is None:
+        return True
+    if start is not None and entry.max_created < _day_start(start):
+        return False
+    return end is None or entry.min_created < _day_start(end + timedelta(days=1))
+
+
+def _scan(
+    data_glob: str,
+    start: date | None = None,
+    end: date | None = None,
+    name: str | None = None,
+    paths: Collection[str] | None = None,
+) -> pl.LazyFrame:
+    """Lazily scan the beacons with the stable identity columns derived.
+
+    When ``data_glob`` covers every day in the compacted store and the store was built
+    against the current install-id dictionary, the store is read for those days and the
+    raw day files only for the rest; a narrower glob (a single day file, say) reads raw
+    day files only. ``UserID`` is the dense install id from :mod:`install_ids`. With
+    ``start``/``end`` only the day files and partitions overlapping the window are
+    scanned, and rows are additionally filtered to ``CreatedAt`` within those (UTC)
+    days. Day files are further pruned with the cached :mod:`day_manifest`: by their
+    actual ``CreatedAt`` bounds and, given ``name``, by whether they hold any beacons
+    of that name at all. Files it has no entry for (still being written, say) are
+    skipped. Given ``paths``, only those of the raw day files are read.
+    """
+    manifest = compacted_manifest(data_glob)
+    compacted = manifest["days"]
+    pattern = Path(data_glob).name
+    if not all(fnmatch(name, pattern) for name in compacted):
+        compacted = {}
+    if manifest["install_ids"] != dictionary_id(data_glob):
+        compacted = {}  # ids of a rebuilt dictionary; read the day files until recompacted
+    wanted = None if paths is None else {Path(p).name for p in paths}
+    paths = [
+        p
+        for p in list_day_files(data_glob, start, end)
+        if Path(p).name not in compacted and (wanted is None or Path(p).name in wanted)
+    ]
+    entries = refresh_day_manifest(data_glob, paths)
+    paths = [
+        p
+        for p in paths
+        if (entry := entries.get(Path(p).name)) is not None and _overlaps(entry, start, end, name)
+    ]
+    parts = [scan_day_files(paths, data_glob)]
+    store = _scan_compacted(data_glob, manifest["files"], start, end) if compacted else None
+    if store is not None:
+        parts.append(store)
+    scan = pl.concat(parts) if len(parts) > 1 else parts[0]
+    if start is not None:
+        scan = scan.filter(pl.col("CreatedAt") >= _day_start(start))
+    if end is not None:
+        scan = scan.filter(pl.col("CreatedAt") < _day_start(end + timedelta(days=1)))
+    return scan
+
+
+def _compact(scan: pl.LazyFrame) -> pl.LazyFrame:
+    """Cast ``scan`` to the compact column types and add the Int32 ``current_week``.
+
+    A no-op unless ``COMPACT_FRAMES`` is set.
+    """
+    if not COMPACT_FRAMES:
+        return scan
+    return scan.with_columns(
+        *(pl.col(column).cast(dtype) for column, dtype in _COMPACT_TYPES.items()),
+        week_index(pl.col("CreatedAt")).alias("current_week"),
+    )
+
+
+def _available_memory() -> int:
+    """Bytes of memory this process may use: the cgroup limit if set, else physical RAM."""
+    for limit_file in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            limit = Path(limit_file).read_text().strip()
+        except OSError:
+            continue
+        if limit.isdigit():
+            return int(limit)
+    return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+
+
+def collect_engine(
+    data_glob: str = DATA_PATH, start: date | None = None, end: date | None = None
+) -> Engine:
+    """Pick the Polars engine for collecting scans of ``data_glob``.
+
+    Honours an explicit ``COLLECT_ENGINE``. In ``"auto"`` mode the in-memory size of the
+    data is estimated from the on-disk parquet size; if it would exceed the configured
+    share of the available memory the streaming engine is used, which processes the
+    scan in bounded-memory batches instead of materializing every row. Window
+    functions (``over``) are not streamed: Polars runs those nodes in memory. The
+    metrics only use them on aggregated frames (the distinct install-days and
+    install-weeks of :func:`engagement_analysis.trailing_distinct`); over the events,
+    :func:`cohort_analysis.compute_cohort_data` needs one unless it is given the
+    first-seen table, which is why the streaming callers always pass it.
+
+    The estimate stats every day file in the window, so callers that run often (the
+    dashboard's reruns) should keep the result for as long as the files are unchanged.
+
+    Args:
+        data_glob: Glob pattern matching the daily parquet files.
+        start: First day that will be scanned, if the scan is time-bounded.
+        end: Last day that will be scanned, if the scan is time-bounded.
+
+    Returns:
+        ``"in-memory"`` or ``"streaming"`` (or the configured engine).
+
+    Raises:
+        ValueError: If ``COLLECT_ENGINE`` is not a Polars engine or ``"auto"``.
+    """
+    if COLLECT_ENGINE not in get_args(Engine):
+        raise ValueError(
+            f"DRAIN_COLLECT_ENGINE must be one of {', '.join(get_args(Engine))}, "
+            f"not {COLLECT_ENGINE!r}"
         )
+    if COLLECT_ENGINE != "auto":
+        return cast(Engine, COLLECT_ENGINE)
+    on_disk = sum(Path(p).stat().st_size for p in list_day_files(data_glob, start, end))
+    budget = _available_memory() * IN_MEMORY_BUDGET_FRACTION
+    return "streaming" if on_disk * PARQUET_EXPANSION_FACTOR > budget else "in-memory"
+
+
+def scan_events(
+    data_glob: str = DATA_PATH, start: date | None = None, end: date | None = None
+) -> pl.LazyFrame:
+    """Lazily scan the ``events`` beacons; see :func:`load_and_process_data`.
+
+    Aggregating directly from this scan (e.g. ``compute_cohort_data`` and the metric
+    graph collected with the streaming engine) never holds the full events frame.
+    """
+    return _compact(_scan(data_glob, start, end, "events").filter(pl.col("Name") == "events"))
+
+
+def scan_start_beacons(
+    data_glob: str = DATA_PATH, start: date | None = None, end: date | None = None
+) -> pl.LazyFrame:
+    """Lazily scan the ``start`` beacons; see :func:`load_start_beacons`."""
+    return (
+        _scan(data_glob, start, end, "start")
+        .filter(pl.col("Name") == "start")
+        .select("UserID", "CreatedAt")
     )
 
 
-def load_and_process_data(data_glob: str = DATA_PATH) -> pl.DataFrame:
+def scan_beacons(
+    data_glob: str = DATA_PATH,
+    start: date | None = None,
+    end: date | None = None,
+    paths: Collection[str] | None = None,
+) -> pl.LazyFrame:
+    """Lazily scan the ``events`` and ``start`` beacons together, keeping ``Name``.
+
+    Unlike :func:`scan_events` and :func:`scan_start_beacons` the day files, manifests
+    and install ids are gone through once for both; see :func:`load_events_and_starts`.
+    """
+    beacons = _scan(data_glob, start, end, paths=paths)
+    return _compact(beacons.filter(pl.col("Name").is_in(["events", "start"])))
+
+
+@instrumented
+def load_and_process_data(
+    data_glob: str = DATA_PATH,
+    engine: Engine | None = None,
+    *,
+    start: date | None = None,
+    end: date | None = None,
+) -> pl.DataFrame:
     """Load the ``events`` beacons with the descriptive columns used for analysis.
 
     Uses a lazy scan so the ``Name == "events"`` predicate and the column projection are
     pushed into the parquet read instead of loading every row/column of every file into
     memory first. Keeps the descriptive columns (version, deployment size, auth, clients,
     browser, feature flags) for charting and segmentation, drops the raw identity columns
-    once ``UserID``/``id_from_ip`` are derived, and flags IP-derived identities.
+    once ``UserID``/``id_from_ip`` are derived, and flags IP-derived identities. With
+    ``COMPACT_FRAMES`` the strings are dictionary encoded, the counters narrowed to
+    ``Int32`` and the ``Int32`` ``current_week`` added at load.
 
     Args:
         data_glob: Glob pattern matching the daily parquet files.
+        engine: Polars engine to collect with; defaults to :func:`collect_engine`.
+        start: First UTC day to load (inclusive); day files before it are not opened.
+        end: Last UTC day to load (inclusive); day files after it are not opened.
 
     Returns:
         pl.DataFrame: Events with UserID, id_from_ip, and descriptive columns.
     """
-    lazy = _scan(data_glob).filter(pl.col("Name") == "events").drop(_IDENTITY_COLUMNS, strict=False)
-    return cast(pl.DataFrame, lazy.collect())
+    lazy = scan_events(data_glob, start, end)
+    engine = engine or collect_engine(data_glob, start, end)
+    return cast(pl.DataFrame, lazy.collect(engine=engine))
 
 
-def load_start_beacons(data_glob: str = DATA_PATH) -> pl.DataFrame:
+@instrumented
+def load_start_beacons(
+    data_glob: str = DATA_PATH,
+    engine: Engine | None = None,
+    *,
+    start: date | None = None,
+    end: date | None = None,
+) -> pl.DataFrame:
     """Load the ``start`` (app-launch) beacons for new-install analysis.
 
     These are a distinct ~45% of rows that the events pipeline filters out; they are a
@@ -79,15 +392,61 @@ def load_start_beacons(data_glob: str = DATA_PATH) -> pl.DataFrame:
 
     Args:
         data_glob: Glob pattern matching the daily parquet files.
+        engine: Polars engine to collect with; defaults to :func:`collect_engine`.
+        start: First UTC day to load (inclusive); day files before it are not opened.
+        end: Last UTC day to load (inclusive); day files after it are not opened.
 
     Returns:
         pl.DataFrame: Launch beacons with ``UserID`` and ``CreatedAt``.
     """
-    lazy = _scan(data_glob).filter(pl.col("Name") == "start").select("UserID", "CreatedAt")
-    return cast(pl.DataFrame, lazy.collect())
+    lazy = scan_start_beacons(data_glob, start, end)
+    engine = engine or collect_engine(data_glob, start, end)
+    return cast(pl.DataFrame, lazy.collect(engine=engine))
+
+
+@instrumented
+def load_events_and_starts(
+    data_glob: str = DATA_PATH,
+    engine: Engine | None = None,
+    *,
+    start: date | None = None,
+    end: date | None = None,
+    paths: Collection[str] | None = None,
+) -> tuple[pl.DataFrame, pl.DataFrame]:
+    """Load the events and the start beacons with a single pass over the day files.
+
+    Equivalent to :func:`load_and_process_data` plus :func:`load_start_beacons`, but each
+    file is opened, pruned and read once and the identity columns are read and resolved
+    to ``UserID`` once, instead of once per beacon kind. The rows are split by ``Name``
+    after the read.
+
+    Args:
+        data_glob: Glob pattern matching the daily parquet files.
+        engine: Polars engine to collect with; defaults to :func:`collect_engine`.
+        start: First UTC day to load (inclusive); day files before it are not opened.
+        end: Last UTC day to load (inclusive); day files after it are not opened.
+        paths: The day files matching ``data_glob`` to load (e.g. the completely
+            written ones); all of them by default.
+
+    Returns:
+        tuple[pl.DataFrame, pl.DataFrame]: The events, as from :func:`load_and_process_data`,
+        and the launch beacons, as from :func:`load_start_beacons`.
+    """
+    engine = engine or collect_engine(data_glob, start, end)
+    scan = scan_beacons(data_glob, start, end, paths)
+    beacons = scan.collect(engine=engine)
+    is_start = pl.col("Name") == "start"
+    return (
+        beacons.filter(~is_start),
+        beacons.filter(is_start).select("UserID", "CreatedAt"),
+    )
 
 
-def calculate_identity_quality(df: pl.DataFrame) -> dict:
+@overload
+def calculate_identity_quality(df: pl.DataFrame) -> dict: ...
+@overload
+def calculate_identity_quality(df: pl.LazyFrame) -> LazySummary: ...
+def calculate_identity_quality(df: pl.DataFrame | pl.LazyFrame) -> dict | LazySummary:
     """Report how much of the data relies on the RemoteIP identity fallback.
 
     UserIDs derived from RemoteIP (no ServerID) are unstable across IP changes and
@@ -98,18 +457,31 @@ def calculate_identity_quality(df: pl.DataFrame) -> dict:
         df: Dataframe with ``UserID`` and ``id_from_ip`` columns.
 
     Returns:
-        dict: Row/user counts and the IP-derived fraction of each.
+        dict: Row/user counts and the IP-derived fraction of each (a
+        :class:`frames.LazySummary` when ``df`` is lazy).
     """
-    total_rows = df.height
-    ip_rows = int(df.select(pl.col("id_from_ip").sum()).item())
-    total_users = int(df.select(pl.col("UserID").n_unique()).item())
-    ip_users = int(df.filter(pl.col("id_from_ip")).select(pl.col("UserID").n_unique()).item())
-
-    return {
-        "total_rows": total_rows,
-        "ip_rows": ip_rows,
-        "ip_row_pct": ip_rows / total_rows if total_rows else 0.0,
-        "total_users": total_users,
-        "ip_users": ip_users,
-        "ip_user_pct": ip_users / total_users if total_users else 0.0,
-    }
+
+    def pct(part: str, whole: str) -> pl.Expr:
+        return (
+            pl.when(pl.col(whole) > 0)
+            .then(pl.col(part) / pl.col(whole))
+            .otherwise(0.0)
+            .alias(f"{part.removesuffix('s')}_pct")
+        )
+
+    counts = df.select(
+        pl.len().cast(pl.Int64).alias("total_rows"),
+        pl.col("id_from_ip").sum().cast(pl.Int64).alias("ip_rows"),
+        pl.col("UserID").n_unique().cast(pl.Int64).alias("total_users"),
+        pl.col("UserID").filter(pl.col("id_from_ip")).n_unique().cast(pl.Int64).alias("ip_users"),
+    )
+    return summarize(
+        counts.select(
+            "total_rows",
+            "ip_rows",
+            pct("ip_rows", "total_rows"),
+            "total_users",
+            "ip_users",
+            pct("ip_users", "total_users"),
+        )
+    )
@@ -0,0 +1,144 @@
+"""Cached per-day-file metadata so scans skip the files that cannot match.
+
+For each day file the manifest records its size and mtime (the cache key), its
+min/max ``CreatedAt`` and its row count per beacon ``Name``. It lives next to the day
+files (``day_manifest.json``). Only files whose size or mtime changed since the last
+refresh are reopened, so deciding which files a time window or a beacon kind needs
+costs a directory listing and a JSON read; the files that are scanned are still
+opened by Polars.
+"""
+
+import json
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Self
+
+import polars as pl
+from config import DAY_MANIFEST_FILENAME
+
+# Bump whenever the entry fields change so the manifest is rebuilt.
+DAY_MANIFEST_VERSION = 2
+
+
+@dataclass(frozen=True)
+class DayFileEntry:
+    """What the loader needs to know about one day file without opening it."""
+
+    size: int
+    mtime_ns: int
+    min_created: datetime | None
+    max_created: datetime | None
+    name_rows: dict[str, int]
+
+    def to_json(self) -> dict:
+        created = {
+            "min_created": self.min_created.isoformat() if self.min_created else None,
+            "max_created": self.max_created.isoformat() if self.max_created else None,
+        }
+        return {**asdict(self), **created}
+
+    @classmethod
+    def from_json(cls, data: dict) -> Self:
+        return cls(
+            size=data["size"],
+            mtime_ns=data["mtime_ns"],
+            min_created=_parse_created(data["min_created"]),
+            max_created=_parse_created(data["max_created"]),
+            name_rows=data["name_rows"],
+        )
+
+
+def _parse_created(value: str | None) -> datetime | None:
+    return datetime.fromisoformat(value) if value else None
+
+
+def _manifest_path(data_glob: str) -> Path:
+    return Path(data_glob).parent / DAY_MANIFEST_FILENAME
+
+
+def _read(data_glob: str) -> dict[str, DayFileEntry]:
+    path = _manifest_path(data_glob)
+    if not path.exists():
+        return {}
+    try:
+        manifest = json.loads(path.read_text())
+    except json.JSONDecodeError:
+        return {}
+    if manifest.get("version") != DAY_MANIFEST_VERSION:
+        return {}
+    return {name: DayFileEntry.from_json(entry) for name, entry in manifest["files"].items()}
+
+
+def _write(data_glob: str, entries: dict[str, DayFileEntry]) -> None:
+    path = _manifest_path(data_glob)
+    tmp = path.with_name(f"{path.name}.tmp")
+    files = {name: entry.to_json() for name, entry in sorted(entries.items())}
+    tmp.write_text(json.dumps({"version": DAY_MANIFEST_VERSION, "files": files}, indent=1))
+    tmp.replace(path)
+
+
+def describe_day_file(path: Path) -> DayFileEntry:
+    """Open one day file and build its entry (one pass over two columns).
+
+    Raises:
+        OSError: If the file disappeared.
+        pl.exceptions.PolarsError: If it cannot be read.
+    """
+    stat = path.stat()
+    by_name = (
+        pl.scan_parquet(path)
+        .group_by("Name")
+        .agg(
+            pl.len().alias("rows"),
+            pl.col("CreatedAt").min().alias("min"),
+            pl.col("CreatedAt").max().alias("max"),
+        )
+        .collect()
+    )
+    min_created, max_created = by_name.select(pl.col("min").min(), pl.col("max").max()).row(0)
+    return DayFileEntry(
+        size=stat.st_size,
+        mtime_ns=stat.st_mtime_ns,
+        min_created=min_created,
+        max_created=max_created,
+        name_rows={str(name): rows for name, rows in by_name.select("Name", "rows").iter_rows()},
+    )
+
+
+def refresh_day_manifest(data_glob: str, paths: list[str]) -> dict[str, DayFileEntry]:
+    """Entries for ``paths``, reopening only files that are new or changed.
+
+    Entries of other files are kept, so refreshing a subset (a time window, a single
+    new file) is cheap and safe. A file that cannot be read (e.g. still being written)
+    or was deleted after ``paths`` was listed gets no entry and is not cached.
+
+    Args:
+        data_glob: Glob pattern of the day files; locates the manifest.
+        paths: Day files to describe.
+
+    Returns:
+        dict: Day file name -> :class:`DayFileEntry` for the readable files in ``paths``.
+    """
+    entries = _read(data_glob)
+    changed = False
+    result = {}
+    for path in map(Path, paths):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        entry = entries.get(path.name)
+        if entry is None or (entry.size, entry.mtime_ns) != (stat.st_size, stat.st_mtime_ns):
+            try:
+                entry = describe_day_file(path)
+            except OSError:
+                continue  # deleted meanwhile
+            except pl.exceptions.PolarsError:
+                continue
+            entries[path.name] = entry
+            changed = True
+        result[path.name] = entry
+    if changed:
+        _write(data_glob, entries)
+    return result
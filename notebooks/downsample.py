@@ -0,0 +1,80 @@
+"""Reduce long time series to a point budget before they are charted.
+
+Uses Largest-Triangle-Three-Buckets (LTTB): the first and last points are kept and
+every bucket in between contributes the point forming the largest triangle with the
+previously kept point and the average of the next bucket, which preserves the peaks
+and troughs a plain stride would drop. Charts with several series keep the same x
+values for all of them: each bucket keeps the point with the largest triangle in any
+series, so a spike in one series survives however flat the others are.
+"""
+
+import numpy as np
+import polars as pl
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Indices of the ``n_out`` points LTTB keeps from the series ``(x, y)``.
+
+    Args:
+        x: Sorted numeric x values.
+        y: y values, one column per series sharing ``x`` if two-dimensional; NaNs
+            count as zero when picking points. Each series is scaled to its own range
+            so small series weigh as much as large ones.
+        n_out: Number of points to keep.
+
+    Returns:
+        np.ndarray: Ascending indices into ``x``/``y``; all of them if the series is
+        already within the budget.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.nan_to_num(np.asarray(y, dtype=np.float64)).reshape(n, -1)
+    spread = np.ptp(y, axis=0)
+    y = y / np.where(spread > 0, spread, 1.0)
+
+    # n_out - 2 buckets over the points between the first and the last.
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    kept = np.empty(n_out, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_lo, next_hi = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        avg_x, avg_y = x[next_lo:next_hi].mean(), y[next_lo:next_hi].mean(axis=0)
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi, None]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area.max(axis=1)))
+        kept[i + 1] = a
+    return kept
+
+
+def downsample(
+    df: pl.DataFrame, x: str, y: list[str], n_out: int, series: str | None = None
+) -> pl.DataFrame:
+    """Keep the rows of at most ``n_out`` distinct ``x`` values, chosen by LTTB.
+
+    Every series keeps the same ``x`` values, so stacked charts stay aligned. The
+    points are picked on each series separately (see :func:`lttb_indices`), never on
+    their total: shares sum to one every week, and a total would hide their peaks.
+
+    Args:
+        df: Chart data.
+        x: The x-axis column (dates or numbers).
+        y: The value columns.
+        n_out: Point budget per series.
+        series: For long frames (one row per series and ``x``), the column naming the
+            series; ``None`` for wide frames (one ``y`` column per series).
+
+    Returns:
+        pl.DataFrame: ``df`` itself if it is within the budget, else its kept rows.
+    """
+    if series is None:
+        wide = df.group_by(x).agg(pl.col(y).sum())
+    else:
+        wide = df.pivot(on=series, index=x, values=y, aggregate_function="sum")
+    wide = wide.drop_nulls(x).sort(x)
+    if wide.height <= n_out:
+        return df
+    keep = lttb_indices(wide[x].to_physical().to_numpy(), wide.drop(x).to_numpy(), n_out)
+    return df.filter(pl.col(x).is_in(wide[x].gather(keep).implode()))
@@ -1,102 +1,187 @@
 """Engagement analysis calculations for user behavior metrics."""
 
+from typing import Any, cast, overload
+
 import polars as pl
-from config import BASELINE
+from cohort_analysis import day_index
+from config import ACTIVE_WINDOWS_DAYS, BASELINE
+from frames import Frame, LazySummary, summarize
 
 
-def calculate_user_lifecycle_metrics(df: pl.DataFrame) -> pl.DataFrame:
+@overload
+def calculate_user_lifecycle_metrics(weekly: pl.DataFrame) -> pl.DataFrame: ...
+@overload
+def calculate_user_lifecycle_metrics(weekly: pl.LazyFrame) -> pl.LazyFrame: ...
+def calculate_user_lifecycle_metrics(weekly: Frame) -> Frame:
     """Calculate user lifecycle metrics including new, retained, churned, and resurrected users.
 
+    Weeks are the weeks with any activity, in order; "previous week" means the previous
+    active week. Each distinct (user, week) is classified from that user's previous
+    active week: none -> new, the previous week -> retained, earlier -> resurrected. A
+    user churns in the week after an active week they are not seen in the next one.
+
     Args:
-        df: Dataframe with UserID and current_week columns.
+        weekly: The user-week table (:func:`cohort_analysis.compute_user_weeks`).
 
     Returns:
         pl.DataFrame: Weekly lifecycle metrics.
     """
-    # Get unique users per week
-    weekly_users = (
-        df.group_by("current_week")
-        .agg(pl.col("UserID").unique().alias("users"))
-        .sort("current_week")
+    weeks = weekly.select("current_week").unique().sort("current_week").with_row_index("rank")
+
+    # Rank-space activity per user. Joins rather than window functions over UserID,
+    # which the streaming engine would run in memory.
+    activity = (
+        weekly.select("UserID", "current_week")
+        .join(cast(Any, weeks), on="current_week")
+        .select("UserID", pl.col("rank").cast(pl.Int64))
+    )
+    first = activity.group_by("UserID").agg(pl.col("rank").min().alias("first_rank"))
+    # Active the week before: (user, rank) of each activity moved one week on.
+    followed = activity.select("UserID", pl.col("rank") + 1, pl.lit(True).alias("was_active"))
+
+    status = (
+        activity.join(cast(Any, first), on="UserID")
+        .join(cast(Any, followed), on=["UserID", "rank"], how="left")
+        .group_by("rank")
+        .agg(
+            (pl.col("rank") == pl.col("first_rank")).sum().alias("new_users"),
+            pl.col("was_active").is_not_null().sum().alias("retained_users"),
+            ((pl.col("rank") != pl.col("first_rank")) & pl.col("was_active").is_null())
+            .sum()
+            .alias("resurrected_users"),
+            pl.len().alias("total_active_users"),
+        )
     )
 
-    # Calculate lifecycle metrics
-    lifecycle_metrics = []
-    prev_users: set = set()
-    all_previous_users: set = set()
-    for i, row in enumerate(weekly_users.iter_rows(named=True)):
-        week = row["current_week"]
-        current_users = set(row["users"])
-
-        if i == 0:
-            # First week - all users are new
-            new_users = len(current_users)
-            retained_users = 0
-            churned_users = 0
-            resurrected_users = 0
-        else:
-            # Users from previous week
-            retained_users = len(current_users & prev_users)
-            new_users = len(current_users - prev_users - all_previous_users)
-            resurrected_users = len(current_users & all_previous_users - prev_users)
-            churned_users = len(prev_users - current_users)
-
-            all_previous_users = all_previous_users | prev_users
-
-        prev_users = current_users
-
-        lifecycle_metrics.append(
-            {
-                "current_week": week,
-                "new_users": new_users,
-                "retained_users": retained_users,
-                "churned_users": churned_users,
-                "resurrected_users": resurrected_users,
-                "total_active_users": len(current_users),
-            }
+    # Users active in a week but not the next one churn in that next week.
+    churned = (
+        activity.join(
+            cast(Any, activity.select("UserID", pl.col("rank") - 1)),
+            on=["UserID", "rank"],
+            how="anti",
         )
+        .group_by((pl.col("rank") + 1).alias("rank"))
+        .agg(pl.len().alias("churned_users"))
+    )
 
-    lifecycle_df = pl.DataFrame(lifecycle_metrics).with_columns(
-        (pl.lit(BASELINE) + pl.col("current_week").cast(pl.Int64) * pl.duration(weeks=1)).alias(
-            "week_date"
+    lifecycle_df = (
+        weeks.with_columns(pl.col("rank").cast(pl.Int64))
+        .join(cast(Any, status), on="rank", how="left")
+        .join(cast(Any, churned), on="rank", how="left")
+        .sort("rank")
+        .select(
+            "current_week",
+            *[
+                pl.col(c).fill_null(0).cast(pl.Int64)
+                for c in ("new_users", "retained_users", "churned_users", "resurrected_users")
+            ],
+            pl.col("total_active_users").cast(pl.Int64),
+        )
+        .with_columns(
+            (pl.lit(BASELINE) + pl.col("current_week").cast(pl.Int64) * pl.duration(weeks=1)).alias(
+                "week_date"
+            )
         )
     )
 
     return lifecycle_df
 
 
-def calculate_stickiness_metrics(df: pl.DataFrame) -> tuple[pl.DataFrame, dict]:
+@overload
+def trailing_distinct(
+    df: pl.DataFrame, period: str, window: int, by: str = "UserID"
+) -> pl.DataFrame: ...
+@overload
+def trailing_distinct(
+    df: pl.LazyFrame, period: str, window: int, by: str = "UserID"
+) -> pl.LazyFrame: ...
+def trailing_distinct(df: Frame, period: str, window: int, by: str = "UserID") -> Frame:
+    """Distinct ``by`` values active within a trailing window of ``window`` periods.
+
+    A value active in periods t1 < t2 < ... counts at period T exactly when some t_i
+    lies in (T - window, T], i.e. when T is in the union of the [t_i, t_i + window).
+    Each run of activity with gaps shorter than ``window`` is one such interval, so the
+    count only changes where a run starts (+1) or ends (-1), and the running sum of
+    those changes is the distinct count. Work and memory stay linear in the distinct
+    (value, period) rows for any window length, instead of ``window`` copies of each.
+
+    Args:
+        df: Frame with ``by`` and an integer ``period`` column.
+        period: Integer period index, e.g. ``current_week`` or a day index.
+        window: Window length in periods; 1 is the period itself.
+        by: Column whose distinct values are counted.
+
+    Returns:
+        Frame (eager or lazy, like the input) of ``period`` and ``distinct`` (UInt32)
+        at every period where the count changes, sorted by ``period``; look other
+        periods up with a backward ``join_asof``.
+    """
+    active = df.select(by, period).unique().sort(by, period)
+    gap_before = pl.col(period) - pl.col(period).shift(1).over(by)
+    gap_after = pl.col(period).shift(-1).over(by) - pl.col(period)
+    starts = active.filter(gap_before.is_null() | (gap_before >= window)).select(
+        period, pl.lit(1, pl.Int32).alias("delta")
+    )
+    ends = active.filter(gap_after.is_null() | (gap_after >= window)).select(
+        pl.col(period) + window, pl.lit(-1, pl.Int32).alias("delta")
+    )
+    return (
+        pl.concat([starts, ends])
+        .group_by(period)
+        .agg(pl.col("delta").sum())
+        .sort(period)
+        .select(period, pl.col("delta").cum_sum().cast(pl.UInt32).alias("distinct"))
+    )
+
+
+@overload
+def calculate_active_installs(df: pl.DataFrame) -> pl.DataFrame: ...
+@overload
+def calculate_active_installs(df: pl.LazyFrame) -> pl.LazyFrame: ...
+def calculate_active_installs(df: Frame) -> Frame:
+    """Calculate daily active installs over trailing windows of ``ACTIVE_WINDOWS_DAYS``.
+
+    Args:
+        df: Dataframe with UserID and CreatedAt columns (e.g. the cohort data).
+
+    Returns:
+        pl.DataFrame: One row per day with activity: ``day``, ``active_<n>d`` (distinct
+        installs in the n days ending that day) for each window, and ``date``.
+    """
+    days = df.select("UserID", day_index(pl.col("CreatedAt")).alias("day")).unique()
+    active = days.select("day").unique().sort("day")
+    for n in ACTIVE_WINDOWS_DAYS:
+        installs = trailing_distinct(days, "day", n).rename({"distinct": f"active_{n}d"})
+        active = active.join_asof(cast(Any, installs), on="day", strategy="backward")
+
+    return active.with_columns(
+        (pl.lit(BASELINE) + pl.col("day").cast(pl.Int64) * pl.duration(days=1)).alias("date")
+    )
+
+
+@overload
+def calculate_stickiness_metrics(weekly: pl.DataFrame) -> tuple[pl.DataFrame, dict]: ...
+@overload
+def calculate_stickiness_metrics(weekly: pl.LazyFrame) -> tuple[pl.LazyFrame, LazySummary]: ...
+def calculate_stickiness_metrics(weekly: Frame) -> tuple[Frame, dict | LazySummary]:
     """Calculate stickiness metrics including DAU/MAU ratio equivalent (WAU/MAU).
 
     Args:
-        df: Dataframe with UserID and current_week columns.
+        weekly: The user-week table (:func:`cohort_analysis.compute_user_weeks`).
 
     Returns:
         Tuple containing:
             - stickiness_df: Weekly stickiness metrics
-            - summary_stats: Dictionary with summary statistics
+            - summary_stats: Dictionary with summary statistics (a
+              :class:`frames.LazySummary` when ``weekly`` is lazy)
     """
     # Calculate weekly active users (WAU)
-    wau = (
-        df.group_by("current_week")
-        .agg(pl.col("UserID").n_unique().alias("wau"))
-        .sort("current_week")
-    )
+    wau = weekly.group_by("current_week").agg(pl.len().alias("wau")).sort("current_week")
 
-    # Calculate true MAU: distinct users over a trailing 4-week window. Each active
-    # (user, week) contributes to the MAU of that week and the next three, so distinct
-    # users per target week is exactly the trailing-4-week unique count.
-    mau = (
-        df.select("UserID", "current_week")
-        .unique()
-        .with_columns(
-            pl.int_ranges(pl.col("current_week"), pl.col("current_week") + 4).alias("window_week")
-        )
-        .explode("window_week")
-        .group_by("window_week")
-        .agg(pl.col("UserID").n_unique().alias("mau"))
-    )
-    wau = wau.join(mau, left_on="current_week", right_on="window_week", how="left")
+    # Calculate true MAU: distinct users over a trailing 4-week window (the week and the
+    # three before it), read off the step function at each active week.
+    mau = trailing_distinct(weekly, "current_week", 4).rename({"distinct": "mau"})
+    wau = wau.join_asof(cast(Any, mau), on="current_week", strategy="backward")
 
     # Calculate stickiness ratio (WAU / MAU)
     wau = wau.with_columns((pl.col("wau") / pl.col("mau")).alias("stickiness_ratio")).sort(
@@ -111,46 +196,48 @@ def calculate_stickiness_metrics(df: pl.DataFrame) -> tuple[pl.DataFrame, dict]:
     )
 
     # Calculate summary statistics
-    summary_stats = {
-        "avg_stickiness": wau.select(pl.col("stickiness_ratio").mean())[0, 0],
-        "current_wau": wau.select(pl.col("wau").tail(1))[0, 0],
-        "current_mau": wau.select(pl.col("mau").tail(1))[0, 0],
-    }
+    summary_stats = summarize(
+        wau.select(
+            pl.col("stickiness_ratio").mean().alias("avg_stickiness"),
+            pl.col("wau").last().alias("current_wau"),
+            pl.col("mau").last().alias("current_mau"),
+        )
+    )
 
     return wau, summary_stats
 
 
-def calculate_engagement_depth(df: pl.DataFrame) -> pl.DataFrame:
+@overload
+def calculate_engagement_depth(weekly: pl.DataFrame) -> pl.DataFrame: ...
+@overload
+def calculate_engagement_depth(weekly: pl.LazyFrame) -> pl.LazyFrame: ...
+def calculate_engagement_depth(weekly: Frame) -> Frame:
     """Calculate engagement depth metrics (distribution of user activity levels).
 
     Args:
-        df: Dataframe with UserID and current_week columns.
+        weekly: The user-week table (:func:`cohort_analysis.compute_user_weeks`).
 
     Returns:
         pl.DataFrame: Engagement depth distribution by week.
     """
-    # Calculate events per user per week
-    user_weekly_events = (
-        df.group_by(["UserID", "current_week"])
-        .agg(pl.len().alias("event_count"))
-        .with_columns(
-            pl.when(pl.col("event_count") == 1)
-            .then(pl.lit("1_event"))
-            .when(pl.col("event_count") <= 5)
-            .then(pl.lit("2-5_events"))
-            .when(pl.col("event_count") <= 20)
-            .then(pl.lit("6-20_events"))
-            .when(pl.col("event_count") <= 50)
-            .then(pl.lit("21-50_events"))
-            .otherwise(pl.lit("50+_events"))
-            .alias("engagement_level")
-        )
+    # Bucket each install's events in the week
+    user_weekly_events = weekly.with_columns(
+        pl.when(pl.col("event_count") == 1)
+        .then(pl.lit("1_event"))
+        .when(pl.col("event_count") <= 5)
+        .then(pl.lit("2-5_events"))
+        .when(pl.col("event_count") <= 20)
+        .then(pl.lit("6-20_events"))
+        .when(pl.col("event_count") <= 50)
+        .then(pl.lit("21-50_events"))
+        .otherwise(pl.lit("50+_events"))
+        .alias("engagement_level")
     )
 
     # Count users in each engagement level per week
     engagement_distribution = (
         user_weekly_events.group_by(["current_week", "engagement_level"])
-        .agg(pl.col("UserID").n_unique().alias("user_count"))
+        .agg(pl.len().alias("user_count"))
         .sort(["current_week", "engagement_level"])
     )
 
@@ -164,21 +251,26 @@ def calculate_engagement_depth(df: pl.DataFrame) -> pl.DataFrame:
     return engagement_distribution
 
 
-def calculate_cohort_engagement_metrics(df: pl.DataFrame) -> pl.DataFrame:
+@overload
+def calculate_cohort_engagement_metrics(weekly: pl.DataFrame) -> pl.DataFrame: ...
+@overload
+def calculate_cohort_engagement_metrics(weekly: pl.LazyFrame) -> pl.LazyFrame: ...
+def calculate_cohort_engagement_metrics(weekly: Frame) -> Frame:
     """Calculate engagement metrics by cohort age.
 
     Args:
-        df: Dataframe with cohort data already computed.
+        weekly: The user-week table (:func:`cohort_analysis.compute_user_weeks`).
 
     Returns:
         pl.DataFrame: Average events per user by cohort age.
     """
     cohort_engagement = (
-        df.group_by("cohort_index")
+        weekly.drop_nulls("cohort_index")  # installs without a cohort in this view
+        .group_by("cohort_index")
         .agg(
             [
-                pl.len().alias("total_events"),
-                pl.col("UserID").n_unique().alias("active_users"),
+                pl.col("event_count").sum().alias("total_events"),
+                pl.len().alias("active_users"),
             ]
         )
         .with_columns(
@@ -0,0 +1,33 @@
+"""Exclusive advisory file locks around the read-modify-write of the persisted tables.
+
+The install-id dictionary, the first-seen table, the user-agent table and the rollup
+store are updated in place by whichever process or thread loads a new day file first:
+the live watcher, dashboard sessions, the compaction and precompute jobs. Each update
+holds an ``fcntl`` lock on a ``.lock`` file next to the table (in the store, for the
+rollups), so concurrent updates run one after the other.
+Locks are per open file, so threads of one process exclude each other too.
+"""
+
+import fcntl
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+
+@contextmanager
+def exclusive_lock(path: Path) -> Iterator[None]:
+    """Hold an exclusive lock on ``path`` (created if missing) for the ``with`` block.
+
+    Blocks until every other holder has released it. Not reentrant: a thread that
+    already holds the lock must not take it again.
+
+    Args:
+        path: The lock file.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
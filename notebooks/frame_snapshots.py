@@ -0,0 +1,229 @@
+"""Memory-mapped Arrow IPC snapshots of the processed frames, for fast cold starts.
+
+Building the live frames from scratch means scanning every day file, deriving the
+install ids, the cohort columns and the install attributes. After each (re)load the
+processed frames are written next to the day files as uncompressed Arrow IPC files
+(``snapshots/<fingerprint>/<frame>.arrow``), where the fingerprint covers the day
+files they were built from (name, size and mtime), the frame layout and the
+install-id dictionary their ids come from. A restarted
+process memory-maps them instead: the columns are backed by the page cache, so
+startup costs what is actually read rather than the size of the history, and
+replicas on the same host share the pages.
+
+Dictionary-encoded columns (``Categorical``, and lists of them) are stored as the
+codes of an ``Enum`` of their values, with the values in ``dictionaries.json``. Polars
+imports a mapped dictionary column by re-encoding every value, in each process that
+maps it; the codes are imported as they are, and turning them back into an ``Enum``
+keeps the mapped buffers.
+
+The manifest is written last and the previous snapshot removed after it, so readers
+see either the old or the new snapshot. Mapped files stay readable after removal.
+
+With ``DRAIN_FRAMES_SOURCE=shared`` one loader process publishes the snapshots and the
+dashboard workers only map them (:class:`live_data.SharedFrames`); ``SNAPSHOTS_DIR``
+can put them on a tmpfs.
+"""
+
+import hashlib
+import json
+import shutil
+from pathlib import Path
+from typing import cast
+
+import polars as pl
+import pyarrow as pa
+from activations import ACTIVATIONS_VERSION
+from config import (
+    COMPACT_FRAMES,
+    DATA_PATH,
+    SNAPSHOTS_DIR,
+    SNAPSHOTS_DIRNAME,
+    SNAPSHOTS_MANIFEST,
+)
+from install_ids import dictionary_id
+from rollups import ROLLUP_VERSION
+from user_agents import USER_AGENTS_VERSION
+
+# Bump whenever the way the snapshotted frames are derived or stored changes.
+SNAPSHOT_VERSION = 5
+
+# Frame name -> column -> categories of its stored Enum codes, next to the frames.
+_DICTIONARIES = "dictionaries.json"
+
+
+def _root(data_glob: str) -> Path:
+    if SNAPSHOTS_DIR:
+        return Path(SNAPSHOTS_DIR)
+    return Path(data_glob).parent / SNAPSHOTS_DIRNAME
+
+
+def fingerprint(data_glob: str, files: dict[str, tuple[int, int]]) -> str:
+    """Fingerprint of the frames built from the day files ``files`` (name -> size, mtime).
+
+    Besides the day files it covers everything else the frames are derived from: the
+    versions of the persisted tables they are built with and the install-id
+    dictionary their ``UserID`` values index.
+    """
+    key = {
+        "version": SNAPSHOT_VERSION,
+        "compact": COMPACT_FRAMES,
+        "tables": [ACTIVATIONS_VERSION, ROLLUP_VERSION, USER_AGENTS_VERSION],
+        "install_ids": dictionary_id(data_glob),
+        "files": sorted((name, *key) for name, key in files.items()),
+    }
+    return hashlib.sha256(json.dumps(key).encode()).hexdigest()[:16]
+
+
+def _read_manifest(data_glob: str) -> dict | None:
+    path = _root(data_glob) / SNAPSHOTS_MANIFEST
+    if not path.exists():
+        return None
+    try:
+        manifest = json.loads(path.read_text())
+    except json.JSONDecodeError:
+        return None
+    files = {name: tuple(key) for name, key in manifest.get("files", {}).items()}
+    if manifest.get("fingerprint") != fingerprint(data_glob, files):
+        return None  # other version, frame layout or install-id dictionary
+    return {**manifest, "files": files}
+
+
+def _map(path: Path) -> pl.DataFrame:
+    # pl.read_ipc copies into memory; a pyarrow memory map keeps the buffers on disk.
+    # The mapping is released once no column references it any more.
+    table = pa.ipc.open_file(pa.memory_map(str(path))).read_all()
+    return cast(pl.DataFrame, pl.from_arrow(table))  # a Table always converts to a DataFrame
+
+
+def _is_dictionary(dtype: pl.DataType) -> bool:
+    inner = dtype.inner if isinstance(dtype, pl.List) else dtype
+    return isinstance(inner, pl.Categorical | pl.Enum)
+
+
+def _encode(frame: pl.DataFrame) -> tuple[pl.DataFrame, dict[str, list[str]]]:
+    """``frame`` with its dictionary columns as Enum codes, and each one's categories."""
+    dictionaries, codes = {}, []
+    for name, dtype in frame.schema.items():
+        if not _is_dictionary(dtype):
+            continue
+        values = frame[name].explode() if isinstance(dtype, pl.List) else frame[name]
+        categories = values.drop_nulls().unique().cast(pl.String).sort().to_list()
+        enum = pl.Enum(categories)
+        target = pl.List(enum) if isinstance(dtype, pl.List) else enum
+        codes.append(pl.col(name).cast(target).to_physical())
+        dictionaries[name] = categories
+    return frame.with_columns(codes), dictionaries
+
+
+def _decode(
+    frame: pl.DataFrame, dictionaries: dict[str, list[str]], categorical: bool
+) -> pl.DataFrame:
+    """Turn the Enum codes :func:`_encode` stored back into Enums (or Categoricals)."""
+    columns = []
+    for name, categories in dictionaries.items():
+        enum = pl.Enum(categories)
+        if isinstance(frame.schema[name], pl.List):
+            column = pl.col(name).list.eval(pl.element().cat.to(enum))
+            target = pl.List(pl.Categorical)
+        else:
+            column = pl.col(name).cat.to(enum)
+            target = pl.Categorical
+        columns.append(column.cast(target) if categorical else column)
+    return frame.with_columns(columns)
+
+
+def write_frames(
+    data_glob: str, files: dict[str, tuple[int, int]], frames: dict[str, pl.DataFrame]
+) -> Path:
+    """Store ``frames`` as the snapshot of the day files ``files``.
+
+    Does nothing if the current snapshot already holds these frames of these files.
+
+    Args:
+        data_glob: Glob pattern matching the daily parquet files.
+        files: Day file name -> ``(size, mtime_ns)`` the frames were built from.
+        frames: Frame name -> frame.
+
+    Returns:
+        Path: Directory of the snapshot.
+    """
+    root = _root(data_glob)
+    current = fingerprint(data_glob, files)
+    directory = root / current
+    manifest = _read_manifest(data_glob)
+    if manifest is not None and (manifest["fingerprint"], manifest["frames"]) == (
+        current,
+        sorted(frames),
+    ):
+        return directory
+
+    directory.mkdir(parents=True, exist_ok=True)
+    dictionaries = {}
+    for name, frame in frames.items():
+        encoded, dictionaries[name] = _encode(frame)
+        tmp = directory / f"{name}.arrow.tmp"
+        encoded.write_ipc(tmp, compression="uncompressed")
+        tmp.replace(directory / f"{name}.arrow")
+    tmp = directory / f"{_DICTIONARIES}.tmp"
+    tmp.write_text(json.dumps(dictionaries))
+    tmp.replace(directory / _DICTIONARIES)
+    manifest = {
+        "version": SNAPSHOT_VERSION,
+        "fingerprint": current,
+        "files": {name: list(key) for name, key in sorted(files.items())},
+        "frames": sorted(frames),
+    }
+    tmp = root / f"{SNAPSHOTS_MANIFEST}.tmp"
+    tmp.write_text(json.dumps(manifest, indent=1))
+    tmp.replace(root / SNAPSHOTS_MANIFEST)
+    for old in root.iterdir():
+        if old.is_dir() and old.name != current:
+            shutil.rmtree(old, ignore_errors=True)
+    return directory
+
+
+def snapshot_stamp(data_glob: str = DATA_PATH) -> tuple[int, int]:
+    """Changes whenever a new snapshot is published (``(0, 0)`` if there is none).
+
+    Each publish replaces the manifest with a new file, so its inode changes even
+    where mtimes are coarse.
+    """
+    try:
+        stat = (_root(data_glob) / SNAPSHOTS_MANIFEST).stat()
+    except FileNotFoundError:
+        return 0, 0
+    return stat.st_ino, stat.st_mtime_ns
+
+
+def read_frames(
+    data_glob: str = DATA_PATH, categorical: bool = False
+) -> tuple[dict[str, tuple[int, int]], dict[str, pl.DataFrame]] | None:
+    """Memory-map the current snapshot, if there is one for this frame layout.
+
+    Args:
+        data_glob: Glob pattern matching the daily parquet files.
+        categorical: Return the dictionary columns as ``Categorical``, as the loader
+            builds them, so the frames can be extended with newly loaded rows. This
+            re-encodes them in memory; by default they are ``Enum`` columns backed by
+            the mapped files.
+
+    Returns:
+        tuple | None: The day files the snapshot was built from (name ->
+        ``(size, mtime_ns)``) and frame name -> frame; ``None`` if there is no usable
+        snapshot. The caller decides whether those day files are still current.
+    """
+    manifest = _read_manifest(data_glob)
+    if manifest is None:
+        return None
+    directory = _root(data_glob) / manifest["fingerprint"]
+    try:
+        dictionaries = json.loads((directory / _DICTIONARIES).read_text())
+        frames = {
+            name: _decode(_map(directory / f"{name}.arrow"), dictionaries[name], categorical)
+            for name in manifest["frames"]
+        }
+    except OSError:
+        return None  # replaced by a newer snapshot while reading
+    except pa.ArrowInvalid:
+        return None
+    return manifest["files"], frames
@@ -0,0 +1,84 @@
+"""Helpers for running the analysis functions eagerly or as one lazy query graph.
+
+Every ``calculate_*`` function is written against the API shared by
+``pl.DataFrame`` and ``pl.LazyFrame``, so the same code either computes a result
+immediately or contributes a node to a lazy graph that is executed once with
+``pl.collect_all``. Single-row summaries (returned as dicts in eager mode) are
+wrapped in :class:`LazySummary` until collected.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Literal, overload
+
+import polars as pl
+
+# An eager or lazy frame. Functions taking one are overloaded to return the same kind.
+# Frames derived from the same input are of the same kind too, which type checkers cannot
+# see, so the other operand of a join between them is cast to ``Any``.
+Frame = pl.DataFrame | pl.LazyFrame
+
+# Polars engines that scans and the metric graph can be collected with.
+Engine = Literal["auto", "in-memory", "streaming"]
+
+
+@dataclass(frozen=True)
+class LazySummary:
+    """A one-row lazy frame that becomes a ``dict`` once collected."""
+
+    frame: pl.LazyFrame
+
+
+@overload
+def summarize(frame: pl.DataFrame) -> dict: ...
+@overload
+def summarize(frame: pl.LazyFrame) -> LazySummary: ...
+def summarize(frame: pl.DataFrame | pl.LazyFrame) -> dict | LazySummary:
+    """Turn a one-row summary frame into a dict, deferring it when the frame is lazy."""
+    if isinstance(frame, pl.LazyFrame):
+        return LazySummary(frame)
+    return frame.row(0, named=True)
+
+
+def is_lazy(*frames: Any) -> bool:
+    """True if any of ``frames`` is a ``pl.LazyFrame``."""
+    return any(isinstance(frame, pl.LazyFrame) for frame in frames)
+
+
+def _pending(value: Any) -> list[pl.LazyFrame]:
+    if isinstance(value, pl.LazyFrame):
+        return [value]
+    if isinstance(value, LazySummary):
+        return [value.frame]
+    if isinstance(value, tuple):
+        return [frame for item in value for frame in _pending(item)]
+    return []
+
+
+def _resolve(value: Any, collected: dict[int, pl.DataFrame]) -> Any:
+    if isinstance(value, pl.LazyFrame):
+        return collected[id(value)]
+    if isinstance(value, LazySummary):
+        return summarize(collected[id(value.frame)])
+    if isinstance(value, tuple):
+        return tuple(_resolve(item, collected) for item in value)
+    return value
+
+
+def collect_all(results: dict[str, Any], engine: Engine = "auto") -> dict[str, Any]:
+    """Collect every lazy result in ``results`` with a single ``pl.collect_all``.
+
+    Values may be frames, :class:`LazySummary` objects, or tuples of them (as returned
+    by the ``calculate_*`` functions). Running the whole graph at once lets Polars
+    share common subplans (the scan, the cohort columns, the user-week table) across
+    metrics and execute independent branches in parallel.
+
+    Args:
+        results: Mapping of metric name -> (possibly lazy) result.
+        engine: Polars engine to run the graph with (e.g. ``"streaming"``).
+
+    Returns:
+        dict: The same mapping with every lazy value replaced by its eager result.
+    """
+    pending = [frame for value in results.values() for frame in _pending(value)]
+    collected = dict(zip(map(id, pending), pl.collect_all(pending, engine=engine), strict=True))
+    return {name: _resolve(value, collected) for name, value in results.items()}
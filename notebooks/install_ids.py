@@ -0,0 +1,187 @@
+"""Stable dense install ids: a persisted dictionary from install identity to 0..N-1.
+
+An install is identified by its ServerID, or by its RemoteIP when it reports none.
+Rather than keying every group-by, join and membership test on a sparse 64-bit hash
+of that string, the loader maps it to a dense ``UInt32`` id. Ids are assigned in
+order of first appearance and never change: the dictionary lives next to the day
+files (``install_ids.parquet``, with a JSON manifest of the day files already
+assigned) and only grows, so cached frames, rollups and indexes built from earlier
+loads stay valid. Should it be built anew, its :func:`dictionary_id` changes, and the
+persisted tables keyed by its ids are rebuilt. Updates hold an exclusive lock
+(``install_ids.lock``, see :mod:`file_lock`), so concurrent loaders never hand out the
+same id twice.
+"""
+
+import json
+import uuid
+from pathlib import Path
+
+import polars as pl
+from config import DATA_PATH, INSTALL_IDS_FILENAME
+from day_manifest import refresh_day_manifest
+from file_lock import exclusive_lock
+
+# Bump whenever the identity definition changes so the dictionary is rebuilt.
+INSTALL_IDS_VERSION = 1
+
+INSTALL_ID_DTYPE = pl.UInt32
+
+# Columns read from the day files to assign ids.
+_IDENTITY_SCHEMA = {
+    "CreatedAt": pl.Datetime("ns", "UTC"),
+    "ServerID": pl.String,
+    "RemoteIP": pl.String,
+}
+
+_SCHEMA = {"identity": pl.String, "UserID": INSTALL_ID_DTYPE}
+
+
+def id_from_ip_expr() -> pl.Expr:
+    """True for rows whose install reports no ServerID and is identified by IP."""
+    return pl.col("ServerID").is_null() | (pl.col("ServerID") == "")
+
+
+def identity_expr() -> pl.Expr:
+    """The string an install is identified by: its ServerID, else its RemoteIP."""
+    return (
+        pl.when(id_from_ip_expr())
+        .then(pl.col("RemoteIP"))
+        .otherwise(pl.col("ServerID"))
+        .fill_null("")
+    )
+
+
+def _paths(data_glob: str) -> tuple[Path, Path]:
+    table = Path(data_glob).parent / INSTALL_IDS_FILENAME
+    return table, table.with_suffix(".json")
+
+
+def _lock_path(data_glob: str) -> Path:
+    return (Path(data_glob).parent / INSTALL_IDS_FILENAME).with_suffix(".lock")
+
+
+def _file_key(path: Path) -> dict:
+    stat = path.stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _read_manifest(data_glob: str) -> dict | None:
+    table, manifest = _paths(data_glob)
+    if not (table.exists() and manifest.exists()):
+        return None
+    try:
+        meta = json.loads(manifest.read_text())
+    except json.JSONDecodeError:
+        return None
+    if meta.get("version") != INSTALL_IDS_VERSION:
+        return None
+    return meta
+
+
+def _read(data_glob: str) -> tuple[pl.DataFrame, dict, str]:
+    # The manifest is read before the table, the reverse of the write order, so the
+    # table always covers the files the manifest lists even without the lock.
+    meta = _read_manifest(data_glob)
+    if meta is None:
+        # A new dictionary: its ids mean nothing to tables built from an earlier one.
+        return pl.DataFrame(schema=_SCHEMA), {}, uuid.uuid4().hex
+    # Through one open file: a concurrent replace cannot swap the file mid-read.
+    with _paths(data_glob)[0].open("rb") as f:
+        return pl.read_parquet(f), meta.get("files", {}), meta.get("id", "")
+
+
+def _write(data_glob: str, ids: pl.DataFrame, files: dict, dictionary: str) -> None:
+    # The table is replaced before the manifest: a crash in between only means the
+    # pending files are read again, and their installs are already in the table.
+    table, manifest = _paths(data_glob)
+    tmp = table.with_name(f"{table.name}.tmp")
+    ids.write_parquet(tmp)
+    tmp.replace(table)
+    tmp = manifest.with_name(f"{manifest.name}.tmp")
+    meta = {"version": INSTALL_IDS_VERSION, "id": dictionary, "files": files}
+    tmp.write_text(json.dumps(meta, indent=1))
+    tmp.replace(manifest)
+
+
+def dictionary_id(data_glob: str = DATA_PATH) -> str | None:
+    """Identity of the current dictionary, for tables that store its ids.
+
+    It stays the same while the dictionary grows and changes whenever it is built anew
+    (a new ``INSTALL_IDS_VERSION``, a deleted or unreadable dictionary), when the ids
+    stored elsewhere no longer mean the same installs.
+
+    Args:
+        data_glob: Glob pattern of the day files; locates the dictionary.
+
+    Returns:
+        str | None: The identity; ``None`` if there is no dictionary yet.
+    """
+    meta = _read_manifest(data_glob)
+    return None if meta is None else f"{INSTALL_IDS_VERSION}:{meta.get('id', '')}"
+
+
+def refresh_install_ids(data_glob: str = DATA_PATH, paths: list[str] | None = None) -> pl.DataFrame:
+    """Assign ids to the installs first seen in day files not yet in the dictionary.
+
+    Only new or changed day files are read (just their identity columns). Entries for
+    other files are kept, so refreshing with a single day file's path is safe. Ids are
+    assigned under the dictionary's lock, from the dictionary as re-read under it. Files
+    that cannot be read yet (still being written) are left for a later refresh.
+
+    Args:
+        data_glob: Glob pattern of the day files; locates the dictionary.
+        paths: The day files to cover; defaults to every file matching ``data_glob``.
+
+    Returns:
+        pl.DataFrame: The whole dictionary, ``identity`` -> ``UserID``.
+    """
+    if paths is None:
+        pattern = Path(data_glob)
+        paths = sorted(map(str, pattern.parent.glob(pattern.name)))
+    ids, files, _ = _read(data_glob)
+    if not _pending(files, paths):
+        return ids
+    with exclusive_lock(_lock_path(data_glob)):
+        # Another loader may have assigned ids since the read above: start from its
+        # dictionary, never from a stale copy, or two installs could share an id.
+        ids, files, dictionary = _read(data_glob)
+        return _assign(data_glob, ids, files, dictionary, _pending(files, paths))
+
+
+def _pending(files: dict, paths: list[str]) -> dict[str, Path]:
+    return {path.name: path for path in map(Path, paths) if files.get(path.name) != _file_key(path)}
+
+
+def _assign(
+    data_glob: str, ids: pl.DataFrame, files: dict, dictionary: str, pending: dict[str, Path]
+) -> pl.DataFrame:
+    """Give the new installs of the ``pending`` day files the next ids and persist them."""
+    # Files that cannot be read yet (still being written) are left for a later refresh.
+    readable = refresh_day_manifest(data_glob, [str(path) for path in pending.values()])
+    pending = {name: path for name, path in pending.items() if name in readable}
+    if not pending:
+        return ids
+
+    seen = (
+        pl.scan_parquet(
+            list(pending.values()),
+            schema=_IDENTITY_SCHEMA,
+            missing_columns="insert",
+            extra_columns="ignore",
+        )
+        .group_by(identity_expr().alias("identity"))
+        .agg(pl.col("CreatedAt").min())
+        .join(ids.lazy(), on="identity", how="anti")
+        .sort("CreatedAt", "identity", nulls_last=True)
+        .collect()
+    )
+    if seen.height:
+        new_ids = seen.select(
+            "identity",
+            (pl.int_range(seen.height, dtype=INSTALL_ID_DTYPE) + ids.height).alias("UserID"),
+        )
+        ids = pl.concat([ids, new_ids])
+
+    files.update({name: _file_key(path) for name, path in pending.items()})
+    _write(data_glob, ids, files, dictionary)
+    return ids
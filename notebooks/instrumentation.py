@@ -0,0 +1,156 @@
+"""Per-stage wall time, row counts and frame sizes for one dashboard run.
+
+Pipeline stages are wrapped with :func:`stage` (a context manager) or
+:func:`instrumented` (a decorator). Nothing is measured unless a :func:`recording`
+is active in the current context: the disabled path is a single ``ContextVar`` lookup,
+so the wrappers can stay in place permanently. Work handed to other threads is
+recorded too when it runs in a copy of the caller's context
+(``contextvars.copy_context().run``); its stages nest under the caller's. Each
+finished recording is also emitted as one JSON log line per stage on the
+``drain.perf`` logger.
+"""
+
+import functools
+import json
+import logging
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+import polars as pl
+
+logger = logging.getLogger("drain.perf")
+
+
+@dataclass
+class StageRecord:
+    """Measurements of one stage. Row counts and sizes are ``None`` for lazy frames."""
+
+    stage: str
+    depth: int
+    seconds: float = 0.0
+    rows_in: int | None = None
+    rows_out: int | None = None
+    bytes_out: int | None = None
+
+
+@dataclass
+class StageLog:
+    """The stages recorded during one run, in start order."""
+
+    records: list[StageRecord] = field(default_factory=list)
+
+    def to_frame(self) -> pl.DataFrame:
+        """The records as a frame, nested stages indented by depth."""
+        return pl.DataFrame(
+            [{**asdict(r), "stage": "  " * r.depth + r.stage} for r in self.records],
+            schema={
+                "stage": pl.String,
+                "depth": pl.Int64,
+                "seconds": pl.Float64,
+                "rows_in": pl.Int64,
+                "rows_out": pl.Int64,
+                "bytes_out": pl.Int64,
+            },
+        )
+
+
+_LOG: ContextVar[StageLog | None] = ContextVar("drain_stage_log", default=None)
+
+# Nesting depth of the current stage; per context, so concurrent stages don't mix.
+_DEPTH: ContextVar[int] = ContextVar("drain_stage_depth", default=0)
+
+
+def _rows(value: Any) -> int | None:
+    if isinstance(value, pl.DataFrame | pl.Series):
+        return len(value)
+    if isinstance(value, tuple) and value:
+        return _rows(value[0])
+    return getattr(value, "shape", (None,))[0]  # pandas frames
+
+
+def _size(value: Any) -> int | None:
+    if isinstance(value, pl.DataFrame | pl.Series):
+        return value.estimated_size()
+    if isinstance(value, tuple):
+        sizes = [s for s in map(_size, value) if s is not None]
+        return sum(sizes) if sizes else None
+    return None
+
+
+class _Stage:
+    """Handle yielded by :func:`stage`; assign ``output`` to record its rows and size."""
+
+    def __init__(self, record: StageRecord | None = None) -> None:
+        self.record = record
+        self.output: Any = None
+
+
+_DISABLED = _Stage()
+
+
+@contextmanager
+def stage(name: str, frame: Any = None) -> Iterator[_Stage]:
+    """Time the ``with`` block as a pipeline stage when a recording is active.
+
+    Args:
+        name: Stage name shown in the Performance tab and logs.
+        frame: The stage's input, for the rows-in count.
+
+    Yields:
+        A handle whose ``output`` attribute may be set to the stage's result.
+    """
+    log = _LOG.get()
+    if log is None:
+        yield _DISABLED
+        return
+
+    depth = _DEPTH.get()
+    record = StageRecord(name, depth, rows_in=_rows(frame))
+    log.records.append(record)
+    handle = _Stage(record)
+    token = _DEPTH.set(depth + 1)
+    start = time.perf_counter()
+    try:
+        yield handle
+    finally:
+        record.seconds = time.perf_counter() - start
+        _DEPTH.reset(token)
+        record.rows_out = _rows(handle.output)
+        record.bytes_out = _size(handle.output)
+
+
+def instrumented[**P, R](func: Callable[P, R]) -> Callable[P, R]:
+    """Record every call of ``func`` as a stage named after it.
+
+    The first positional argument is taken as the stage input and the return value as
+    its output.
+    """
+
+    name = getattr(func, "__name__", repr(func))
+
+    @functools.wraps(func)
+    def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+        if _LOG.get() is None:
+            return func(*args, **kwargs)
+        with stage(name, args[0] if args else None) as s:
+            s.output = func(*args, **kwargs)
+            return s.output
+
+    return wrapper
+
+
+@contextmanager
+def recording() -> Iterator[StageLog]:
+    """Record the stages run inside the ``with`` block and log them when it ends."""
+    log = StageLog()
+    token = _LOG.set(log)
+    try:
+        yield log
+    finally:
+        _LOG.reset(token)
+        for record in log.records:
+            logger.info(json.dumps(asdict(record)))
@@ -0,0 +1,459 @@
+"""Live base frames for the dashboard, refreshed incrementally as day files arrive.
+
+A watchdog observer watches the data directory. When the Go cleanup job writes a new
+``day-*.parquet`` file, only that file is loaded and appended to the current frames;
+the result is published as a new immutable :class:`Snapshot` by a single reference
+swap, so readers always see a consistent set of frames and never wait on a reload.
+A file that changed or disappeared (rather than a new one) triggers a full reload.
+
+Snapshots are also persisted as memory-mappable Arrow IPC files (see
+:mod:`frame_snapshots`), so a restarted process maps the frames built by its
+predecessor and only appends the day files that arrived since. The files are written
+in the background once the frames have stopped changing for
+``SNAPSHOT_PERSIST_DELAY_SECONDS``, so refreshes never wait on rewriting the history.
+Run as a script, the module is the loader process that publishes them for
+:class:`SharedFrames` workers::
+
+    python live_data.py [--data GLOB]
+"""
+
+import argparse
+import contextlib
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import cast
+
+import polars as pl
+from activations import refresh_activations
+from attribute_analysis import calculate_install_attributes
+from cohort_analysis import compute_cohort_data, compute_user_weeks
+from config import (
+    COMPACT_FRAMES,
+    DATA_PATH,
+    REFRESH_DEBOUNCE_SECONDS,
+    SHARED_FRAMES_POLL_SECONDS,
+    SHARED_FRAMES_WAIT_SECONDS,
+    SNAPSHOT_PERSIST_DELAY_SECONDS,
+)
+from data_loader import collect_engine, list_day_files, load_events_and_starts
+from frame_snapshots import read_frames, snapshot_stamp, write_frames
+from rollups import load_user_week_rollups, merge_rollups, rollup_events
+from user_agents import refresh_user_agents
+from watchdog.events import FileSystemEvent, FileSystemEventHandler
+from watchdog.observers import Observer
+from watchdog.observers.api import BaseObserver
+
+# Trailing magic bytes of a completely written parquet file.
+_PARQUET_MAGIC = b"PAR1"
+
+# Event-level frames persisted in the frame snapshot; ``events`` is derived from ``cohort``.
+_FRAME_NAMES = ["cohort", "starts", "user_weeks"]
+
+
+@dataclass(frozen=True)
+class EventFrames:
+    """The event-level frames derived from the day files."""
+
+    events: pl.DataFrame
+    starts: pl.DataFrame
+    cohort: pl.DataFrame
+    user_weeks: pl.DataFrame
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """One consistent generation of the dashboard's base frames.
+
+    ``frames`` is ``None`` when only install attributes are tracked (streaming mode
+    aggregates from scans instead of holding the events in memory).
+    """
+
+    generation: int
+    files: dict[str, tuple[int, int]]  # day file name -> (size, mtime_ns)
+    attrs: pl.DataFrame
+    activations: pl.DataFrame  # first-seen table, see activations.refresh_activations
+    frames: EventFrames | None = None
+
+
+def _file_key(path: Path) -> tuple[int, int]:
+    stat = path.stat()
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _is_complete(path: Path) -> bool:
+    """True once a parquet file has been fully written (ends with its footer magic)."""
+    try:
+        with path.open("rb") as f:
+            f.seek(-len(_PARQUET_MAGIC), 2)
+            return f.read() == _PARQUET_MAGIC
+    except OSError:
+        return False
+
+
+def _loaded_events(cohort: pl.DataFrame) -> pl.DataFrame:
+    """The loaded events ``cohort`` was built from: it less the columns cohort data adds."""
+    added = ["activated", "activated_week", "cohort_index"]
+    if not COMPACT_FRAMES:
+        added.append("current_week")  # the compact loader adds it when loading
+    return cohort.drop(added)
+
+
+def _install_attributes(data_glob: str, rollups: pl.DataFrame) -> pl.DataFrame:
+    """Install attributes of the user-week ``rollups``."""
+    rollups = rollups.rename({"last_seen": "CreatedAt"})
+    return calculate_install_attributes(rollups, refresh_user_agents(data_glob, rollups["Browser"]))
+
+
+def _update_install_attributes(
+    data_glob: str, attrs: pl.DataFrame, rollups: pl.DataFrame
+) -> pl.DataFrame:
+    """``attrs`` with the installs in the new day files' ``rollups`` brought up to date.
+
+    Each install's attributes are its latest user-week rollup, so only the installs in
+    ``rollups`` change: their latest week is merged with the new rows again.
+    """
+    touched = attrs.join(rollups.select("UserID").unique(), on="UserID", how="semi")
+    known = touched.rename({"CreatedAt": "last_seen"}).select(rollups.columns)
+    updated = _install_attributes(data_glob, merge_rollups(pl.concat([known, rollups])))
+    return pl.concat([attrs.join(touched, on="UserID", how="anti"), updated.select(attrs.columns)])
+
+
+def _mapped_snapshot(
+    generation: int,
+    files: dict[str, tuple[int, int]],
+    frames: dict[str, pl.DataFrame],
+    materialize: bool,
+) -> Snapshot | None:
+    """The :class:`Snapshot` held by mapped snapshot ``frames``; ``None`` if one is missing."""
+    if not {"attrs", "activations", *(_FRAME_NAMES if materialize else [])} <= frames.keys():
+        return None
+    event_frames = None
+    if materialize:
+        event_frames = EventFrames(
+            events=_loaded_events(frames["cohort"]),
+            starts=frames["starts"],
+            cohort=frames["cohort"],
+            user_weeks=frames["user_weeks"],
+        )
+    return Snapshot(generation, files, frames["attrs"], frames["activations"], event_frames)
+
+
+class LiveFrames:
+    """Holds the current :class:`Snapshot` and keeps it in sync with the data directory.
+
+    Args:
+        data_glob: Glob pattern matching the daily parquet files.
+        materialize: Whether to hold the event-level frames; when ``False`` only the
+            install attributes are maintained.
+    """
+
+    def __init__(self, data_glob: str = DATA_PATH, materialize: bool = True) -> None:
+        self._data_glob = data_glob
+        self._materialize = materialize
+        self._lock = threading.Lock()
+        self._timer_lock = threading.Lock()  # watchdog threads reschedule the refresh
+        self._timer: threading.Timer | None = None
+        self._observer: BaseObserver | None = None
+        self._persist_lock = threading.Lock()
+        self._persist_timer: threading.Timer | None = None
+        restored = self._restore()
+        self._persisted: Snapshot | None = restored  # the snapshot on disk
+        if restored is None:
+            self._snapshot = self._load_all(generation=0)
+            self._schedule_persist()
+        else:
+            self._snapshot = restored
+            self.refresh()  # append the day files that arrived since it was written
+
+    @property
+    def snapshot(self) -> Snapshot:
+        """The current snapshot; replaced atomically, never mutated."""
+        return self._snapshot
+
+    def start(self) -> None:
+        """Start watching the data directory for new or changed day files."""
+        if self._observer is not None:
+            return
+        handler = _DayFileHandler(Path(self._data_glob).name, self._schedule_refresh)
+        self._observer = Observer()
+        self._observer.schedule(handler, str(Path(self._data_glob).parent))
+        self._observer.daemon = True
+        self._observer.start()
+
+    def stop(self) -> None:
+        """Stop watching, cancel any pending refresh and persist the current frames."""
+        with self._timer_lock:
+            if self._timer is not None:
+                self._timer.cancel()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+        self.flush()
+
+    def flush(self) -> None:
+        """Persist the current snapshot now if its write is still pending."""
+        if self._persist_timer is not None:
+            self._persist_timer.cancel()
+        self._write_snapshot()
+
+    def refresh(self) -> Snapshot:
+        """Bring the snapshot in line with the day files on disk.
+
+        New day files are appended incrementally; if any known file changed or was
+        removed, everything is reloaded. Files still being written are skipped until
+        a later refresh.
+
+        Returns:
+            Snapshot: The (possibly unchanged) current snapshot.
+        """
+        with self._lock:
+            current = self._snapshot
+            on_disk = {Path(p).name: Path(p) for p in list_day_files(self._data_glob)}
+            complete = {name: path for name, path in on_disk.items() if _is_complete(path)}
+
+            changed = [
+                name
+                for name, key in current.files.items()
+                if name not in complete or _file_key(complete[name]) != key
+            ]
+            added = sorted(complete.keys() - current.files.keys())
+            if changed:
+                self._snapshot = self._load_all(current.generation + 1)
+            elif added:
+                self._snapshot = self._append(current, [complete[name] for name in added])
+            if self._snapshot is not current:
+                self._schedule_persist()
+            return self._snapshot
+
+    def _schedule_refresh(self) -> None:
+        """Debounce bursts of file events into a single refresh."""
+        with self._timer_lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(REFRESH_DEBOUNCE_SECONDS, self.refresh)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _restore(self) -> Snapshot | None:
+        """Map the snapshot persisted by an earlier process, if its day files are unchanged.
+
+        Day files added since are left to :meth:`refresh`; a changed or removed one means
+        the snapshot is stale and everything is loaded from scratch instead.
+        """
+        stored = read_frames(self._data_glob, categorical=True)  # appended to, see _append
+        if stored is None:
+            return None
+        files, frames = stored
+        on_disk = {Path(p).name: Path(p) for p in list_day_files(self._data_glob)}
+        if any(
+            name not in on_disk or _file_key(on_disk[name]) != key for name, key in files.items()
+        ):
+            return None
+        return _mapped_snapshot(0, files, frames, self._materialize)
+
+    def _schedule_persist(self) -> None:
+        """Write the current snapshot in the background once the frames stop changing."""
+        if self._persist_timer is not None:
+            self._persist_timer.cancel()
+        self._persist_timer = threading.Timer(SNAPSHOT_PERSIST_DELAY_SECONDS, self._write_snapshot)
+        self._persist_timer.daemon = True
+        self._persist_timer.start()
+
+    def _write_snapshot(self) -> None:
+        with self._persist_lock:
+            snapshot = self._snapshot
+            if snapshot is self._persisted:
+                return
+            frames = {"attrs": snapshot.attrs, "activations": snapshot.activations}
+            if snapshot.frames is not None:
+                frames |= {name: getattr(snapshot.frames, name) for name in _FRAME_NAMES}
+            # The snapshot only speeds up the next start; failing to write it is not an error.
+            with contextlib.suppress(OSError):
+                write_frames(self._data_glob, snapshot.files, frames)
+                self._persisted = snapshot
+
+    def _load_all(self, generation: int) -> Snapshot:
+        paths = [Path(p) for p in list_day_files(self._data_glob) if _is_complete(Path(p))]
+        files = {p.name: _file_key(p) for p in paths}
+        rollups = load_user_week_rollups(self._data_glob, files=files)
+        attrs = _install_attributes(self._data_glob, rollups)
+        activations = refresh_activations(self._data_glob, list(map(str, paths)))
+        if not self._materialize:
+            return Snapshot(generation, files, attrs, activations)
+
+        # Only the complete files: the glob also matches files still being written.
+        events, starts = load_events_and_starts(self._data_glob, paths=list(map(str, paths)))
+        cohort = compute_cohort_data(events, activations)
+        frames = EventFrames(
+            events=events,
+            starts=starts,
+            cohort=cohort,
+            user_weeks=compute_user_weeks(cohort),
+        )
+        return Snapshot(generation, files, attrs, activations, frames)
+
+    def _append(self, current: Snapshot, paths: list[Path]) -> Snapshot:
+        """``current`` grown by the new day files ``paths``, each read once."""
+        files = {**current.files, **{p.name: _file_key(p) for p in paths}}
+        directory = Path(self._data_glob).parent
+        all_paths = [str(directory / f) for f in files]
+        base = current.frames
+        if base is None:
+            activations = refresh_activations(self._data_glob, all_paths)
+            rollups = load_user_week_rollups(self._data_glob, files=[p.name for p in paths])
+            attrs = _update_install_attributes(self._data_glob, current.attrs, rollups)
+            return Snapshot(current.generation + 1, files, attrs, activations)
+
+        loaded = {p.name: load_events_and_starts(str(p)) for p in paths}
+        activations = refresh_activations(self._data_glob, all_paths, loaded)
+        new_events = pl.concat([events for events, _ in loaded.values()])
+        new_starts = pl.concat([starts for _, starts in loaded.values()])
+        # The rollups of the new days come from the events in memory, not the files.
+        rollups = rollup_events(new_events)
+        attrs = _update_install_attributes(self._data_glob, current.attrs, rollups)
+        events = pl.concat([base.events, new_events])
+
+        earlier = activations.join(current.activations, on="UserID", suffix="_known").filter(
+            pl.col("activated") < pl.col("activated_known")
+        )
+        if earlier.height:
+            # A late file moved some install's activation earlier, which changes the
+            # cohort of its existing rows: recompute the cohort columns from scratch.
+            cohort = compute_cohort_data(events, activations)
+            user_weeks = compute_user_weeks(cohort)
+        else:
+            new_cohort = compute_cohort_data(new_events, activations)
+            cohort = pl.concat([base.cohort, new_cohort])
+            # Only the weeks the new rows fall in need their user-week rows rebuilt.
+            touched = new_cohort.select("current_week").unique()
+            user_weeks = pl.concat(
+                [
+                    base.user_weeks.join(touched, on="current_week", how="anti"),
+                    compute_user_weeks(cohort.join(touched, on="current_week", how="semi")),
+                ]
+            )
+
+        frames = EventFrames(
+            events=events,
+            starts=pl.concat([base.starts, new_starts]),
+            cohort=cohort,
+            user_weeks=user_weeks,
+        )
+        return Snapshot(current.generation + 1, files, attrs, activations, frames)
+
+
+class SharedFrames:
+    """Attaches to the snapshots a loader process publishes instead of building frames.
+
+    With ``FRAMES_SOURCE = "shared"`` the dashboard workers use this in place of
+    :class:`LiveFrames`, and one ``python live_data.py`` process per host loads the day
+    files and publishes each :class:`Snapshot` as memory-mapped Arrow IPC files. Every
+    worker maps the same files, so the base data is held once per host (in the page
+    cache, or in shared memory with ``SNAPSHOTS_DIR`` on a tmpfs); dictionary columns
+    are mapped as ``Enum`` codes, so nothing is copied. Once started, the worker checks
+    for a newly published snapshot every ``SHARED_FRAMES_POLL_SECONDS``, busy or idle,
+    and maps it in place of the old one, whose files are released once no reader
+    holds its frames any more.
+
+    Args:
+        data_glob: Glob pattern matching the daily parquet files.
+        materialize: Whether the event-level frames are needed; the loader must have
+            been started in the same mode.
+
+    Raises:
+        TimeoutError: If no usable snapshot is published within
+            ``SHARED_FRAMES_WAIT_SECONDS``.
+    """
+
+    def __init__(self, data_glob: str = DATA_PATH, materialize: bool = True) -> None:
+        self._data_glob = data_glob
+        self._materialize = materialize
+        self._lock = threading.Lock()
+        self._stamp = (0, 0)
+        self._snapshot: Snapshot | None = None
+        self._stopped = threading.Event()
+        self._poller: threading.Thread | None = None
+        deadline = time.monotonic() + SHARED_FRAMES_WAIT_SECONDS
+        while self.refresh() is None:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"no frame snapshot was published for {data_glob}")
+            time.sleep(SHARED_FRAMES_POLL_SECONDS)
+
+    @property
+    def snapshot(self) -> Snapshot:
+        """The most recently published snapshot."""
+        return cast(Snapshot, self.refresh())  # __init__ waited for the first one
+
+    def start(self) -> None:
+        """Start checking for newly published snapshots in the background."""
+        if self._poller is not None:
+            return
+        self._stopped.clear()
+        self._poller = threading.Thread(target=self._poll, name="shared-frames", daemon=True)
+        self._poller.start()
+
+    def stop(self) -> None:
+        """Stop checking for new snapshots."""
+        self._stopped.set()
+        if self._poller is not None:
+            self._poller.join()
+            self._poller = None
+
+    def _poll(self) -> None:
+        while not self._stopped.wait(SHARED_FRAMES_POLL_SECONDS):
+            self.refresh()
+
+    def refresh(self) -> Snapshot | None:
+        """Map the published snapshot if it changed since it was last mapped.
+
+        Returns:
+            Snapshot | None: The current snapshot; ``None`` until one has been published.
+        """
+        with self._lock:
+            stamp = snapshot_stamp(self._data_glob)
+            if stamp == self._stamp:
+                return self._snapshot
+            stored = read_frames(self._data_glob)
+            if stored is not None:
+                generation = self._snapshot.generation + 1 if self._snapshot else 0
+                mapped = _mapped_snapshot(generation, *stored, self._materialize)
+                if mapped is not None:
+                    self._snapshot, self._stamp = mapped, stamp
+            return self._snapshot
+
+
+class _DayFileHandler(FileSystemEventHandler):
+    """Forwards changes to files matching the day-file pattern to a callback."""
+
+    def __init__(self, pattern: str, on_change) -> None:
+        self._pattern = pattern
+        self._on_change = on_change
+
+    def on_any_event(self, event: FileSystemEvent) -> None:
+        if event.is_directory:
+            return
+        paths = [event.src_path, getattr(event, "dest_path", "")]
+        if any(path and Path(str(path)).match(self._pattern) for path in paths):
+            self._on_change()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Publish the live frames for shared workers.")
+    parser.add_argument("--data", default=DATA_PATH, help="Glob of the day files")
+    args = parser.parse_args()
+    live = LiveFrames(args.data, materialize=collect_engine(args.data) != "streaming")
+    live.flush()  # workers are waiting for the first snapshot
+    live.start()
+    print(f"publishing generation {live.snapshot.generation} of {args.data}", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        live.stop()
+
+
+if __name__ == "__main__":
+    main()
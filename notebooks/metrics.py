@@ -0,0 +1,154 @@
+"""The dashboard's metric graph: which ``calculate_*`` runs on which input frame.
+
+Keeping the list in one place lets the dashboard compute every metric either eagerly
+(concurrently on a thread pool) or as a single lazy graph (see :mod:`frames`),
+without repeating the wiring. The thread pool is shared by every session of the
+process, so however many reruns are in flight at most ``METRIC_WORKERS`` metrics are
+computed at once.
+"""
+
+import contextvars
+from collections.abc import Callable, Collection, Iterator, Mapping
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any
+
+from attribute_analysis import (
+    calculate_auth_mix,
+    calculate_browser_mix,
+    calculate_concurrent_clients,
+    calculate_deployment_scale,
+    calculate_feature_adoption,
+    calculate_new_installs,
+    calculate_version_adoption,
+)
+from cohort_analysis import calculate_cohort_retention
+from config import METRIC_WORKERS
+from data_loader import calculate_identity_quality
+from engagement_analysis import (
+    calculate_active_installs,
+    calculate_cohort_engagement_metrics,
+    calculate_engagement_depth,
+    calculate_stickiness_metrics,
+    calculate_user_lifecycle_metrics,
+)
+from frames import Engine, collect_all, is_lazy
+from instrumentation import stage
+from usage_analysis import calculate_usage_frequency
+
+
+@dataclass(frozen=True)
+class Metric:
+    """One dashboard metric: its result name, input frame and function."""
+
+    name: str
+    source: str  # "events" (cohort data), "weekly" (user-week table), "starts" or "attrs"
+    func: Callable[[Any], Any]
+
+
+METRICS = [
+    Metric("quality", "events", calculate_identity_quality),
+    Metric("new_installs", "starts", calculate_new_installs),
+    Metric("stickiness", "weekly", calculate_stickiness_metrics),
+    Metric("active_installs", "events", calculate_active_installs),
+    Metric("cohort_counts", "weekly", calculate_cohort_retention),
+    Metric("cohort_engagement", "weekly", calculate_cohort_engagement_metrics),
+    Metric("usage_frequency", "weekly", calculate_usage_frequency),
+    Metric("concurrent_clients", "weekly", calculate_concurrent_clients),
+    Metric("engagement_depth", "weekly", calculate_engagement_depth),
+    Metric("lifecycle", "weekly", calculate_user_lifecycle_metrics),
+    Metric("deployment_scale", "attrs", calculate_deployment_scale),
+    Metric("auth_mix", "weekly", calculate_auth_mix),
+    Metric("browser_mix", "attrs", calculate_browser_mix),
+    Metric("version_adoption", "weekly", calculate_version_adoption),
+    Metric("feature_adoption", "weekly", calculate_feature_adoption),
+]
+
+# One pool for the whole process; its threads are started on first use.
+_POOL = ThreadPoolExecutor(max_workers=METRIC_WORKERS, thread_name_prefix="metrics")
+
+
+class MetricResults(Mapping[str, Any]):
+    """Metric name -> result for metrics still being computed; reading one waits for it.
+
+    Lets the dashboard render each tab as soon as the metrics it shows are done.
+    """
+
+    def __init__(self, futures: dict[str, Future]) -> None:
+        self._futures = futures
+
+    def __getitem__(self, name: str) -> Any:
+        return self._futures[name].result()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._futures)
+
+    def __len__(self) -> int:
+        return len(self._futures)
+
+    def wait(self) -> dict[str, Any]:
+        """Wait for every metric and return the results.
+
+        If waiting is interrupted (Streamlit stopping the script raises in this thread)
+        or a metric fails, the metrics not yet started are cancelled so they do not
+        hold the shared pool for a rerun nobody will see.
+        """
+        try:
+            return {name: future.result() for name, future in self._futures.items()}
+        except BaseException:
+            self.cancel()
+            raise
+
+    def cancel(self) -> None:
+        """Cancel the metrics still queued; those already running finish."""
+        for future in self._futures.values():
+            future.cancel()
+
+
+def _compute(metric: Metric, source: Any) -> Any:
+    with stage(metric.name, source) as s:
+        s.output = metric.func(source)
+        return s.output
+
+
+def compute_metrics(
+    sources: dict[str, Any],
+    engine: Engine = "auto",
+    threaded: bool = METRIC_WORKERS > 1,
+    names: Collection[str] | None = None,
+) -> Mapping[str, Any]:
+    """Compute every metric (or those in ``names``) from its source frame.
+
+    If any source is lazy, all sources are made lazy and the whole graph is run with
+    one ``pl.collect_all``. Otherwise the metrics, which are independent of each other,
+    are queued in ``METRICS`` order on the process-wide pool of ``METRIC_WORKERS``
+    threads, or run in turn in the calling thread.
+
+    Args:
+        sources: Mapping of source name (see :class:`Metric`) -> frame.
+        engine: Polars engine for the lazy graph; ``"streaming"`` keeps memory bounded
+            when the sources are scans rather than materialized frames.
+        threaded: Use the shared thread pool rather than the calling thread.
+        names: Metrics to compute (e.g. those one dashboard tab shows); all by default.
+
+    Returns:
+        Mapping: Metric name -> eager result; with a thread pool, a
+        :class:`MetricResults` whose lookups wait for that metric.
+    """
+    metrics = [m for m in METRICS if names is None or m.name in names]
+    if is_lazy(*sources.values()):
+        lazy_sources = {name: frame.lazy() for name, frame in sources.items()}
+        with stage("collect_all") as s:
+            s.output = collect_all(
+                {m.name: m.func(lazy_sources[m.source]) for m in metrics}, engine
+            )
+        return s.output
+    if not threaded:
+        return {m.name: _compute(m, sources[m.source]) for m in metrics}
+
+    # Each task runs in its own copy of this context so its stages are recorded.
+    futures = {
+        m.name: _POOL.submit(contextvars.copy_context().run, _compute, m, sources[m.source])
+        for m in metrics
+    }
+    return MetricResults(futures)
@@ -0,0 +1,180 @@
+"""Headless job that computes every dashboard metric and writes the results to disk.
+
+The dashboard otherwise computes the whole metric graph inside the Streamlit process
+on the first request after each deploy or cache expiry. This job runs the same
+:data:`metrics.METRICS` over the same base frames (see :class:`live_data.LiveFrames`)
+and writes every result to a ``results/`` directory next to the day files: frames as
+parquet, one-row summaries as JSON, plus a manifest recording the day files (name,
+size, mtime) the results were computed from. The dashboard serves the unsegmented,
+whole-history view from these results while they match the day files on disk, and
+computes live for segments, time windows or newer data.
+
+Run it after the day files change (e.g. from the same cron as the cleanup job), from
+``notebooks/``::
+
+    python precompute.py
+"""
+
+import argparse
+import json
+import shutil
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+import polars as pl
+from cohort_analysis import compute_cohort_data, compute_user_weeks
+from config import DATA_PATH, RESULTS_DIRNAME, RESULTS_MANIFEST
+from data_loader import collect_engine, scan_events, scan_start_beacons
+from live_data import LiveFrames, Snapshot
+from metrics import MetricResults, compute_metrics
+
+# Bump whenever the stored layout or a metric's output changes so results are recomputed.
+RESULTS_VERSION = 3
+
+
+def _results_dir(data_glob: str) -> Path:
+    return Path(data_glob).parent / RESULTS_DIRNAME
+
+
+def _encode(value: Any, directory: Path, name: str) -> dict:
+    """Write ``value`` (a frame, summary dict or tuple of them) under ``directory``."""
+    if isinstance(value, pl.DataFrame):
+        value.write_parquet(directory / f"{name}.parquet")
+        return {"frame": f"{name}.parquet"}
+    if isinstance(value, dict):
+        return {"summary": value}
+    if isinstance(value, tuple):
+        return {"tuple": [_encode(item, directory, f"{name}-{i}") for i, item in enumerate(value)]}
+    raise TypeError(f"cannot store a {type(value).__name__} result ({name})")
+
+
+def _decode(entry: dict, directory: Path) -> Any:
+    if "frame" in entry:
+        return pl.read_parquet(directory / entry["frame"])
+    if "summary" in entry:
+        return entry["summary"]
+    return tuple(_decode(item, directory) for item in entry["tuple"])
+
+
+def _files_key(files: dict[str, tuple[int, int]]) -> dict[str, list[int]]:
+    return {name: list(key) for name, key in sorted(files.items())}
+
+
+def compute_results(data_glob: str = DATA_PATH) -> tuple[dict[str, Any], Snapshot]:
+    """Compute every metric for the whole history, as the unsegmented dashboard does.
+
+    Args:
+        data_glob: Glob pattern matching the daily parquet files.
+
+    Returns:
+        tuple: Metric name -> result, and the snapshot the results were computed from.
+    """
+    engine = collect_engine(data_glob)
+    live = LiveFrames(data_glob, materialize=engine != "streaming")
+    live.flush()  # this process exits soon; leave the frames for the next start
+    snapshot = live.snapshot
+    frames = snapshot.frames
+    if frames is None:
+        cohort = compute_cohort_data(scan_events(data_glob), snapshot.activations)
+        sources = {
+            "events": cohort,
+            "weekly": compute_user_weeks(cohort),
+            "starts": scan_start_beacons(data_glob),
+            "attrs": snapshot.attrs,
+        }
+    else:
+        sources = {
+            "events": frames.cohort,
+            "weekly": frames.user_weeks,
+            "starts": frames.starts,
+            "attrs": snapshot.attrs,
+        }
+    results = compute_metrics(sources, engine)
+    return results.wait() if isinstance(results, MetricResults) else dict(results), snapshot
+
+
+def write_results(data_glob: str, results: dict[str, Any], snapshot: Snapshot) -> Path:
+    """Store ``results`` as a new generation and switch the manifest over to it.
+
+    Args:
+        data_glob: Glob pattern matching the daily parquet files.
+        results: Output of :func:`compute_results`.
+        snapshot: The snapshot ``results`` were computed from.
+
+    Returns:
+        Path: Directory of the new generation.
+    """
+    root = _results_dir(data_glob)
+    generation = datetime.now(UTC).strftime("%Y%m%dT%H%M%S%f")
+    directory = root / generation
+    directory.mkdir(parents=True)
+    manifest = {
+        "version": RESULTS_VERSION,
+        "generation": generation,
+        "files": _files_key(snapshot.files),
+        "results": {name: _encode(value, directory, name) for name, value in results.items()},
+    }
+    tmp = root / f"{RESULTS_MANIFEST}.tmp"
+    tmp.write_text(json.dumps(manifest, indent=1))
+    tmp.replace(root / RESULTS_MANIFEST)
+    for old in root.iterdir():
+        if old.is_dir() and old.name != generation:
+            shutil.rmtree(old, ignore_errors=True)
+    return directory
+
+
+def results_stamp(data_glob: str = DATA_PATH) -> int:
+    """Changes whenever a new generation of results is written (0 if there is none)."""
+    try:
+        return (_results_dir(data_glob) / RESULTS_MANIFEST).stat().st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+
+def read_results(
+    data_glob: str = DATA_PATH, files: dict[str, tuple[int, int]] | None = None
+) -> dict[str, Any] | None:
+    """The precomputed results, if any were written for exactly these day files.
+
+    Args:
+        data_glob: Glob pattern matching the daily parquet files.
+        files: Day file name -> ``(size, mtime_ns)`` of the data being shown (e.g.
+            :attr:`live_data.Snapshot.files`); results for any other set are stale.
+
+    Returns:
+        dict | None: Metric name -> result as :func:`metrics.compute_metrics` returns
+        it, or ``None`` if there are no current results.
+    """
+    root = _results_dir(data_glob)
+    path = root / RESULTS_MANIFEST
+    if not path.exists():
+        return None
+    try:
+        manifest = json.loads(path.read_text())
+    except json.JSONDecodeError:
+        return None
+    if manifest.get("version") != RESULTS_VERSION:
+        return None
+    if files is not None and manifest["files"] != _files_key(files):
+        return None
+    directory = root / manifest["generation"]
+    try:
+        return {name: _decode(entry, directory) for name, entry in manifest["results"].items()}
+    except OSError:
+        return None  # replaced by a newer generation while reading
+    except pl.exceptions.PolarsError:
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=(__doc__ or "").partition("\n")[0])
+    parser.add_argument("--data", default=DATA_PATH, help="Glob of the day files")
+    args = parser.parse_args()
+    results, snapshot = compute_results(args.data)
+    directory = write_results(args.data, results, snapshot)
+    print(f"wrote {len(results)} results for {len(snapshot.files)} day files to {directory}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""Persistent per-day rollups so a refresh only processes new or changed day files.
+
+Each ``day-*.parquet`` file is collapsed once to one row per (UserID, current_week)
+holding the event count, first/last seen timestamps and the latest reported
+attributes. Rollups live in a ``rollups/`` directory next to the day files and are
+keyed by the source file's name, size and mtime in a small JSON manifest, so a
+restart or cache expiry only re-reads the day files that appeared or changed since
+the last refresh. The manifest also records the install-id dictionary the rollups'
+``UserID`` values come from; when the dictionary is rebuilt every rollup is too.
+Refreshes take the store's lock, so concurrent loaders update it one at a time.
+Merging the per-day rollups is cheap: the result is orders of magnitude smaller than
+the raw events.
+"""
+
+import json
+from collections.abc import Collection
+from pathlib import Path
+from typing import overload
+
+import polars as pl
+from cohort_analysis import week_index
+from config import COMPACT_FRAMES, DATA_PATH, FEATURE_FLAGS, ROLLUP_DIRNAME
+from data_loader import load_and_process_data, scan_events
+from file_lock import exclusive_lock
+from frames import Frame
+from install_ids import dictionary_id, refresh_install_ids
+
+# Bump whenever the rollup columns change so stale rollups are rebuilt.
+ROLLUP_VERSION = 3
+
+_MANIFEST_NAME = "manifest.json"
+_LOCK_NAME = "rollups.lock"
+
+# Descriptive columns carried as "latest value in the user-week".
+_ATTRIBUTE_COLUMNS = [
+    "id_from_ip",
+    "Version",
+    "RunningContainers",
+    "AuthProvider",
+    "Clients",
+    "Browser",
+    *FEATURE_FLAGS,
+]
+
+_KEY_COLUMNS = ["UserID", "current_week"]
+
+
+def _store_dir(data_glob: str, store_dir: str | None) -> Path:
+    return Path(store_dir) if store_dir else Path(data_glob).parent / ROLLUP_DIRNAME
+
+
+def _file_key(path: Path) -> dict:
+    stat = path.stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _read_manifest(store: Path, install_ids: str | None) -> dict:
+    path = store / _MANIFEST_NAME
+    if not path.exists():
+        return {}
+    try:
+        manifest = json.loads(path.read_text())
+    except json.JSONDecodeError:
+        return {}
+    # Rollups hold the loader's column types, which depend on COMPACT_FRAMES, and the
+    # ids of the dictionary they were built with.
+    stored = (manifest.get("version"), manifest.get("compact"), manifest.get("install_ids"))
+    if stored != (ROLLUP_VERSION, COMPACT_FRAMES, install_ids):
+        return {}
+    return manifest.get("files", {})
+
+
+def _write_manifest(store: Path, files: dict, install_ids: str | None) -> None:
+    tmp = store / f"{_MANIFEST_NAME}.tmp"
+    manifest = {
+        "version": ROLLUP_VERSION,
+        "compact": COMPACT_FRAMES,
+        "install_ids": install_ids,
+        "files": files,
+    }
+    tmp.write_text(json.dumps(manifest, indent=1))
+    tmp.replace(store / _MANIFEST_NAME)
+
+
+def rollup_day(path: str) -> pl.DataFrame:
+    """Collapse one day file's events to one row per (UserID, current_week).
+
+    Args:
+        path: Path of a single day parquet file.
+
+    Returns:
+        pl.DataFrame: ``UserID``, ``current_week``, ``event_count``, ``first_seen``,
+        ``last_seen`` and the latest value of each descriptive column.
+    """
+    return rollup_events(load_and_process_data(path))
+
+
+@overload
+def rollup_events(events: pl.DataFrame) -> pl.DataFrame: ...
+@overload
+def rollup_events(events: pl.LazyFrame) -> pl.LazyFrame: ...
+def rollup_events(events: Frame) -> Frame:
+    """Collapse loaded (or scanned) events to rollup rows, as :func:`rollup_day` does."""
+    return (
+        events.with_columns(week_index(pl.col("CreatedAt")).alias("current_week"))
+        .sort("CreatedAt")
+        .group_by(_KEY_COLUMNS)
+        .agg(
+            pl.len().alias("event_count"),
+            pl.col("CreatedAt").min().alias("first_seen"),
+            pl.col("CreatedAt").max().alias("last_seen"),
+            *[pl.col(c).last() for c in _ATTRIBUTE_COLUMNS],
+        )
+    )
+
+
+def refresh_rollups(
+    data_glob: str = DATA_PATH, store_dir: str | None = None, files: Collection[str] | None = None
+) -> list[str]:
+    """Bring the rollup store in line with the day files on disk.
+
+    Only day files whose size or mtime differ from the manifest (or that have no rollup
+    yet) are read; rollups of day files that disappeared are removed. Every rollup is
+    rebuilt when the install-id dictionary has been rebuilt since. Runs under the
+    store's lock.
+
+    Args:
+        data_glob: Glob pattern matching the daily parquet files.
+        store_dir: Rollup directory; defaults to ``rollups/`` next to the day files.
+        files: Names of the day files to bring up to date (e.g. the completely written
+            ones); every day file by default. The rollups of the others are kept.
+
+    Returns:
+        list[str]: Names of the day files that were (re)processed.
+    """
+    store = _store_dir(data_glob, store_dir)
+    store.mkdir(parents=True, exist_ok=True)
+    pattern = Path(data_glob)
+    current = {p.name: p for p in sorted(pattern.parent.glob(pattern.name))}
+    # Creates the dictionary on a first run, so the rollups built below are recorded
+    # under the dictionary they use.
+    refresh_install_ids(
+        data_glob, [str(p) for name, p in current.items() if files is None or name in files]
+    )
+    with exclusive_lock(store / _LOCK_NAME):
+        return _refresh(store, current, files, dictionary_id(data_glob))
+
+
+def _refresh(
+    store: Path, current: dict[str, Path], files: Collection[str] | None, install_ids: str | None
+) -> list[str]:
+    known = _read_manifest(store, install_ids)
+    processed = []
+    entries = {}
+    for name, path in current.items():
+        if files is not None and name not in files:
+            if name in known:
+                entries[name] = known[name]
+            continue
+        key = _file_key(path)
+        entry = known.get(name)
+        if entry and entry["size"] == key["size"] and entry["mtime_ns"] == key["mtime_ns"]:
+            entries[name] = entry
+            continue
+        rollup_name = f"{path.stem}.rollup.parquet"
+        tmp = store / f"{rollup_name}.tmp"
+        rollup_day(str(path)).write_parquet(tmp)
+        tmp.replace(store / rollup_name)
+        entries[name] = {**key, "rollup": rollup_name}
+        processed.append(name)
+
+    for name in known.keys() - current.keys():
+        (store / known[name]["rollup"]).unlink(missing_ok=True)
+
+    _write_manifest(store, entries, install_ids)
+    return processed
+
+
+@overload
+def merge_rollups(rollups: pl.DataFrame) -> pl.DataFrame: ...
+@overload
+def merge_rollups(rollups: pl.LazyFrame) -> pl.LazyFrame: ...
+def merge_rollups(rollups: Frame) -> Frame:
+    """Merge rollup rows of the same (UserID, current_week) into one.
+
+    Event counts are summed and first/last seen combined; descriptive columns keep the
+    value of the most recent row. Merged rows can be merged again with newer ones.
+    """
+    return (
+        rollups.sort("last_seen")
+        .group_by(_KEY_COLUMNS)
+        .agg(
+            pl.col("event_count").sum(),
+            pl.col("first_seen").min(),
+            pl.col("last_seen").max(),
+            *[pl.col(c).last() for c in _ATTRIBUTE_COLUMNS],
+        )
+    )
+
+
+def load_user_week_rollups(
+    data_glob: str = DATA_PATH,
+    store_dir: str | None = None,
+    files: Collection[str] | None = None,
+) -> pl.DataFrame:
+    """Refresh the store and merge the per-day rollups into one user-week frame.
+
+    Args:
+        data_glob: Glob pattern matching the daily parquet files.
+        store_dir: Rollup directory; defaults to ``rollups/`` next to the day files.
+        files: Names of the day files whose rollups to merge; every day file by default.
+
+    Returns:
+        pl.DataFrame: One row per (UserID, current_week) with the rollup columns (see
+        :func:`merge_rollups`); empty, with those columns, if there are no day files.
+    """
+    refresh_rollups(data_glob, store_dir, files)
+    store = _store_dir(data_glob, store_dir)
+    paths = [
+        str(store / entry["rollup"])
+        for name, entry in _read_manifest(store, dictionary_id(data_glob)).items()
+        if files is None or name in files
+    ]
+    if not paths:
+        # No rollup to take the column types from: take them from the (unread) scan.
+        return pl.DataFrame(schema=rollup_events(scan_events(data_glob)).collect_schema())
+    return merge_rollups(pl.scan_parquet(paths)).collect()
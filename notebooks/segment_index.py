@@ -0,0 +1,154 @@
+"""Bitmap index over install attributes for instant sidebar segmentation.
+
+Built once per data snapshot, the index stores, for each segmentable (attribute,
+value), the set of installs that have it, addressed by their dense ``UserID`` (see
+:mod:`install_ids`). A set is kept as sorted ``uint32`` ids when it is sparse and as
+a packed bitmap when it is dense, whichever is smaller. A selection (AND across
+attributes, OR within one, like :func:`attribute_analysis.filter_installs`) is then
+a few array operations, and event-level frames are filtered by gathering the
+resulting mask at each row's ``UserID`` instead of a hash-based ``is_in`` over
+millions of rows.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Self, overload
+
+import numpy as np
+import polars as pl
+from config import FEATURE_FLAGS
+from frames import Frame
+from instrumentation import instrumented
+
+SEGMENT_COLUMNS = [
+    "Version",
+    "AuthProvider",
+    "container_bucket",
+    "browser_family",
+    "os_family",
+    *FEATURE_FLAGS,
+]
+
+# A set stored as positions costs 32 bits per member, as a bitmap 1 bit per install.
+_POSITION_BITS = 32
+
+
+@dataclass(frozen=True)
+class _InstallSet:
+    """The installs having one attribute value, as positions or a packed bitmap."""
+
+    count: int
+    positions: np.ndarray | None = None
+    packed: np.ndarray | None = None
+
+    @classmethod
+    def from_positions(cls, positions: np.ndarray, n: int) -> Self:
+        if positions.size * _POSITION_BITS < n:
+            return cls(positions.size, positions=positions.astype(np.uint32))
+        mask = np.zeros(n, dtype=bool)
+        mask[positions] = True
+        return cls(positions.size, packed=np.packbits(mask))
+
+    def add_to(self, mask: np.ndarray) -> None:
+        """Set this set's members in the boolean ``mask`` (in place)."""
+        if self.positions is not None:
+            mask[self.positions] = True
+        elif self.packed is not None:
+            mask |= np.unpackbits(self.packed, count=mask.size).view(bool)
+
+
+@dataclass(frozen=True)
+class SegmentIndex:
+    """Attribute-value -> install sets for one snapshot of the install attributes.
+
+    Attributes:
+        size: Length of the install masks: one past the largest ``UserID``.
+        sets: Column -> value -> installs having that value.
+    """
+
+    size: int
+    sets: dict[str, dict[Any, _InstallSet]]
+
+    def options(self, column: str) -> list:
+        """Values of ``column``, most common first, ties in value order (sidebar choices)."""
+        by_count = sorted(self.sets.get(column, {}).items(), key=lambda item: -item[1].count)
+        return [value for value, _ in by_count]
+
+    def select(self, selections: dict) -> np.ndarray:
+        """Boolean mask over installs matching ``selections``.
+
+        Selections AND across attributes and OR within each attribute's value list; an
+        empty value list places no constraint on that attribute.
+
+        Args:
+            selections: Mapping of attribute column -> list of allowed values.
+
+        Returns:
+            np.ndarray: One ``bool`` per ``UserID``.
+        """
+        matched = np.ones(self.size, dtype=bool)
+        for column, allowed in selections.items():
+            if not allowed:
+                continue
+            any_of = np.zeros(self.size, dtype=bool)
+            values = self.sets.get(column, {})
+            for value in allowed:
+                if value in values:
+                    values[value].add_to(any_of)
+            matched &= any_of
+        return matched
+
+
+@overload
+def filter_rows(frame: pl.DataFrame, mask: np.ndarray) -> pl.DataFrame: ...
+@overload
+def filter_rows(frame: pl.LazyFrame, mask: np.ndarray) -> pl.LazyFrame: ...
+def filter_rows(frame: Frame, mask: np.ndarray) -> Frame:
+    """Rows of ``frame`` whose install is in ``mask``, in their original order.
+
+    Installs newer than the index (ids past the end of ``mask``) never match.
+
+    Args:
+        frame: Any frame with a dense ``UserID`` column, eager or lazy.
+        mask: Output of :meth:`SegmentIndex.select`.
+
+    Returns:
+        The matching rows.
+    """
+    if mask.size == 0:
+        return frame.clear()
+    user_id = pl.col("UserID")
+    in_mask = pl.lit(pl.Series(mask)).gather(user_id.clip(upper_bound=mask.size - 1))
+    return frame.filter((user_id < mask.size) & in_mask)
+
+
+@instrumented
+def build_segment_index(install_attrs: pl.DataFrame) -> SegmentIndex:
+    """Index the install attributes by dense ``UserID``.
+
+    Args:
+        install_attrs: Output of :func:`attribute_analysis.calculate_install_attributes`.
+
+    Returns:
+        SegmentIndex: The index.
+    """
+    n = (
+        (install_attrs.select(pl.col("UserID").max()).item() or 0) + 1
+        if install_attrs.height
+        else 0
+    )
+    sets = {}
+    for column in SEGMENT_COLUMNS:
+        if column not in install_attrs.columns:
+            continue
+        ordered = install_attrs.select(column, "UserID").drop_nulls(column).sort(column, "UserID")
+        runs = ordered.group_by(column, maintain_order=True).len()
+        if runs.is_empty():
+            sets[column] = {}
+            continue
+        members = np.split(ordered["UserID"].to_numpy(), np.cumsum(runs["len"].to_numpy())[:-1])
+        sets[column] = {
+            value: _InstallSet.from_positions(positions, n)
+            for value, positions in zip(runs[column], members, strict=True)
+        }
+
+    return SegmentIndex(n, sets)
@@ -0,0 +1,185 @@
+"""Deterministic synthetic beacon generator for benchmarks and load testing.
+
+Writes ``day-YYYY-MM-DD.parquet`` files shaped like the Go writer's output (the
+columns of ``data_loader._SCAN_SCHEMA``) from a simple install-population model:
+installs activate over the period, are active on a share of the days until they
+churn, send a Poisson number of beacons per active day, occasionally upgrade, and
+keep a fixed browser, auth provider and deployment size. Generation is vectorized
+per day with NumPy and Polars, so tens of millions of rows take seconds, and the
+same config always produces byte-identical data.
+
+Usage (from ``notebooks/``)::
+
+    python synthetic.py ./bench_data --installs 100000 --days 180
+"""
+
+import argparse
+from dataclasses import dataclass, field
+from datetime import UTC, date, datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+from data_loader import _SCAN_SCHEMA
+
+VERSIONS = [f"v8.{minor}.{patch}" for minor in range(8, 15) for patch in range(3)]
+
+AUTH_PROVIDERS = {"none": 0.8, "simple": 0.15, "forward-proxy": 0.05}
+
+USER_AGENTS = {
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/148.0.0.0 Safari/537.36": 0.45,
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 "
+    "(KHTML, like Gecko) Version/17.0 Safari/605.1.15": 0.15,
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:130.0) Gecko/20100101 Firefox/130.0": 0.15,
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/148.0.0.0 Safari/537.36": 0.1,
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/148.0.0.0 Safari/537.36 Edg/148.0.0.0": 0.1,
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 "
+    "(KHTML, like Gecko) Version/17.0 Mobile/15E148 Safari/604.1": 0.05,
+}
+
+_FLAG_RATES = {
+    "HasActions": 0.3,
+    "HasHostname": 0.2,
+    "HasCustomAddress": 0.1,
+    "HasCustomBase": 0.05,
+    "HasShell": 0.15,
+}
+
+
+@dataclass(frozen=True)
+class SyntheticConfig:
+    """Knobs of the synthetic install population."""
+
+    installs: int = 10_000
+    days: int = 90
+    first_day: date = date(2024, 1, 1)
+    beacons_per_active_day: float = 20.0
+    active_day_probability: float = 0.6
+    mean_lifetime_days: float = 60.0
+    start_beacon_share: float = 0.45
+    ip_identity_fraction: float = 0.1
+    daily_upgrade_probability: float = 0.02
+    user_agents: dict[str, float] = field(default_factory=lambda: dict(USER_AGENTS))
+    seed: int = 0
+
+
+def _choice(rng: np.random.Generator, weights: dict[str, float], size: int) -> np.ndarray:
+    p = np.array(list(weights.values()))
+    return rng.choice(len(weights), size=size, p=p / p.sum())
+
+
+class _Population:
+    """Per-install state; mutated day by day as installs upgrade."""
+
+    def __init__(self, config: SyntheticConfig, rng: np.random.Generator) -> None:
+        n = config.installs
+        self.activation_day = rng.integers(0, config.days, size=n)
+        lifetime = rng.exponential(config.mean_lifetime_days, size=n).astype(np.int64) + 1
+        self.churn_day = self.activation_day + lifetime
+        self.version = rng.integers(0, len(VERSIONS) // 2, size=n)
+        self.ua = _choice(rng, config.user_agents, n)
+        self.auth = _choice(rng, AUTH_PROVIDERS, n)
+        self.containers = rng.lognormal(2.0, 1.2, size=n).astype(np.int64)
+        self.flags = {flag: rng.random(n) < rate for flag, rate in _FLAG_RATES.items()}
+
+        ids = pl.int_range(n, eager=True)
+        from_ip = rng.random(n) < config.ip_identity_fraction
+        self.server_id = pl.Series(np.where(from_ip, "", ("srv-" + ids.cast(pl.String)).to_numpy()))
+        # IP-identified installs share a smaller pool of addresses (NAT).
+        ip_pool = rng.integers(0, max(n // 4, 1), size=n)
+        self.remote_ip = pl.Series(
+            [f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" for i in ip_pool]
+        )
+
+    def upgrade(self, config: SyntheticConfig, rng: np.random.Generator) -> None:
+        upgrading = rng.random(self.version.size) < config.daily_upgrade_probability
+        self.version = np.minimum(self.version + upgrading, len(VERSIONS) - 1)
+
+
+def _day_frame(
+    config: SyntheticConfig, pop: _Population, day: int, rng: np.random.Generator
+) -> pl.DataFrame:
+    active = (
+        (pop.activation_day <= day)
+        & (day < pop.churn_day)
+        & (rng.random(config.installs) < config.active_day_probability)
+    )
+    installs = np.flatnonzero(active)
+    counts = rng.poisson(config.beacons_per_active_day, size=installs.size)
+    rows = np.repeat(installs, counts)
+    order = np.argsort(rng.integers(0, 86_400_000_000, size=rows.size), kind="stable")
+    offsets = np.sort(rng.integers(0, 86_400_000_000, size=rows.size))
+    rows = rows[order]
+    idx = pl.Series(rows)
+
+    midnight = datetime.combine(config.first_day + timedelta(days=day), datetime.min.time(), UTC)
+    data = {
+        "Name": np.where(rng.random(rows.size) < config.start_beacon_share, "start", "events"),
+        "CreatedAt": pl.Series(offsets, dtype=pl.Int64).cast(pl.Duration("us")) + midnight,
+        "ServerID": pop.server_id.gather(idx),
+        "RemoteIP": pop.remote_ip.gather(idx),
+        "Version": pl.Series(VERSIONS).gather(pl.Series(pop.version[rows])),
+        "RunningContainers": pop.containers[rows],
+        "AuthProvider": pl.Series(list(AUTH_PROVIDERS)).gather(pl.Series(pop.auth[rows])),
+        "Clients": rng.poisson(1.0, size=rows.size),
+        "Browser": pl.Series(list(config.user_agents)).gather(pl.Series(pop.ua[rows])),
+        **{flag: values[rows] for flag, values in pop.flags.items()},
+    }
+    return pl.DataFrame(data).cast(pl.Schema(_SCAN_SCHEMA))
+
+
+def write_dataset(directory: str | Path, config: SyntheticConfig | None = None) -> list[Path]:
+    """Write ``config.days`` synthetic day files into ``directory``.
+
+    Args:
+        directory: Output directory (created if missing).
+        config: Population settings; defaults to :class:`SyntheticConfig`.
+
+    Returns:
+        list[Path]: The day files written, in day order.
+    """
+    config = config or SyntheticConfig()
+    out = Path(directory)
+    out.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(config.seed)
+    pop = _Population(config, rng)
+
+    paths = []
+    for day in range(config.days):
+        path = out / f"day-{config.first_day + timedelta(days=day)}.parquet"
+        _day_frame(config, pop, day, rng).write_parquet(path, compression="zstd")
+        pop.upgrade(config, rng)
+        paths.append(path)
+    return paths
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=(__doc__ or "").partition("\n")[0])
+    parser.add_argument("directory")
+    parser.add_argument("--installs", type=int, default=SyntheticConfig.installs)
+    parser.add_argument("--days", type=int, default=SyntheticConfig.days)
+    parser.add_argument("--rate", type=float, default=SyntheticConfig.beacons_per_active_day)
+    parser.add_argument("--ip-fraction", type=float, default=SyntheticConfig.ip_identity_fraction)
+    parser.add_argument(
+        "--upgrade-probability", type=float, default=SyntheticConfig.daily_upgrade_probability
+    )
+    parser.add_argument("--seed", type=int, default=SyntheticConfig.seed)
+    args = parser.parse_args()
+
+    config = SyntheticConfig(
+        installs=args.installs,
+        days=args.days,
+        beacons_per_active_day=args.rate,
+        ip_identity_fraction=args.ip_fraction,
+        daily_upgrade_probability=args.upgrade_probability,
+        seed=args.seed,
+    )
+    paths = write_dataset(args.directory, config)
+    print(f"wrote {len(paths)} day files to {args.directory}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Tests for the persisted first-seen table."""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, datetime
+
+import activations
+import polars as pl
+from activations import refresh_activations
+from cohort_analysis import compute_cohort_data
+from data_loader import load_and_process_data
+from install_ids import refresh_install_ids
+
+
+def _write_day(path, names, days, server_ids):
+    pl.DataFrame(
+        {
+            "Name": names,
+            "CreatedAt": pl.Series(
+                [datetime(2024, 1, d, tzinfo=UTC) for d in days], dtype=pl.Datetime("ns", "UTC")
+            ),
+            "ServerID": server_ids,
+        }
+    ).write_parquet(path)
+
+
+def _first_seen(table: pl.DataFrame) -> dict:
+    return {
+        row["UserID"]: (row["activated"] and row["activated"].day, row["first_start"].day)
+        for row in table.iter_rows(named=True)
+    }
+
+
+def test_new_files_are_folded_in_and_changed_files_rebuild(tmp_path, monkeypatch):
+    glob = str(tmp_path / "day-*.parquet")
+    _write_day(
+        tmp_path / "day-2024-01-10.parquet",
+        ["start", "events", "start", "events"],
+        [10, 11, 12, 13],
+        ["srv-A", "srv-A", "srv-B", "srv-A"],
+    )
+    table = refresh_activations(glob)
+    assert _first_seen(table) == {0: (11, 10), 1: (None, 12)}
+    assert table.schema["activated_week"] == pl.Int32
+
+    scanned = []
+    scan_day_files = activations.scan_day_files
+    monkeypatch.setattr(
+        activations,
+        "scan_day_files",
+        lambda paths, g: scanned.append(paths) or scan_day_files(paths, g),
+    )
+
+    # A late file for an earlier day: only it is read, and it lowers srv-A's minima.
+    _write_day(tmp_path / "day-2024-01-02.parquet", ["events", "start"], [2, 3], ["srv-A", "srv-A"])
+    assert _first_seen(refresh_activations(glob)) == {0: (2, 3), 1: (None, 12)}
+    assert [[p.rsplit("/", 1)[-1] for p in paths] for paths in scanned] == [
+        ["day-2024-01-02.parquet"]
+    ]
+    assert _first_seen(refresh_activations(glob)) == {0: (2, 3), 1: (None, 12)}
+    assert len(scanned) == 1  # nothing new
+
+    # Rewriting a folded-in file can raise a minimum: the table is rebuilt.
+    _write_day(tmp_path / "day-2024-01-02.parquet", ["start"], [4], ["srv-A"])
+    assert _first_seen(refresh_activations(glob)) == {0: (11, 4), 1: (None, 12)}
+
+
+def test_cohorts_from_the_table_match_recomputed_activations(tmp_path):
+    glob = str(tmp_path / "day-*.parquet")
+    _write_day(
+        tmp_path / "day-2024-01-01.parquet",
+        ["events", "events", "start", "events"],
+        [1, 9, 2, 20],
+        ["srv-A", "srv-B", "srv-C", "srv-A"],
+    )
+    events = load_and_process_data(glob)
+
+    joined = compute_cohort_data(events, refresh_activations(glob))
+
+    assert joined.select(sorted(joined.columns)).equals(
+        compute_cohort_data(events).select(sorted(joined.columns))
+    )
+
+
+def test_rebuilt_install_id_dictionary_rebuilds_the_table(tmp_path):
+    glob = str(tmp_path / "day-*.parquet")
+    _write_day(tmp_path / "day-2024-01-05.parquet", ["events", "events"], [5, 6], ["a", "b"])
+    assert _first_seen_events(refresh_activations(glob)) == {0: 5, 1: 6}
+
+    # A dictionary built anew from a late file first: b is now 0 and a is 1.
+    (tmp_path / "install_ids.parquet").unlink()
+    _write_day(tmp_path / "day-2024-01-01.parquet", ["events"], [1], ["b"])
+    refresh_install_ids(glob, [str(tmp_path / "day-2024-01-01.parquet")])
+
+    assert _first_seen_events(refresh_activations(glob)) == {0: 1, 1: 5}
+
+
+def test_concurrent_refreshes_fold_in_every_file(tmp_path):
+    glob = str(tmp_path / "day-*.parquet")
+    paths = []
+    for day in range(1, 9):
+        path = tmp_path / f"day-2024-01-0{day}.parquet"
+        _write_day(path, ["events"], [day], [f"srv-{day}"])
+        paths.append(str(path))
+
+    with ThreadPoolExecutor(len(paths)) as pool:
+        list(pool.map(lambda path: refresh_activations(glob, [path]), paths))
+
+    assert len(_first_seen_events(refresh_activations(glob, []))) == len(paths)
+
+
+def _first_seen_events(table: pl.DataFrame) -> dict:
+    return {row["UserID"]: row["activated"].day for row in table.iter_rows(named=True)}
@@ -16,6 +16,7 @@ from attribute_analysis import (
     filter_installs,
     os_family_expr,
 )
+from cohort_analysis import compute_cohort_data, compute_user_weeks
 
 
 def _dt(day: int) -> datetime:
@@ -149,7 +150,7 @@ def test_version_adoption_keeps_top_n_and_buckets_rest_as_other():
         }
     )
 
-    out = calculate_version_adoption(df, top_n=2)
+    out = calculate_version_adoption(compute_user_weeks(df), top_n=2)
     by_version = {r["version"]: r for r in out.iter_rows(named=True)}
 
     assert set(by_version) == {"v1", "v2", "Other"}
@@ -160,6 +161,42 @@ def test_version_adoption_keeps_top_n_and_buckets_rest_as_other():
     assert "week_date" in out.columns
 
 
+def _baseline_share(df: pl.DataFrame, column: str) -> pl.DataFrame:
+    """The original per-event implementation: distinct installs per week and value."""
+    weekly = df.group_by(["current_week", column]).agg(
+        pl.col("UserID").n_unique().alias("installs")
+    )
+    totals = df.group_by("current_week").agg(pl.col("UserID").n_unique().alias("active"))
+    return weekly.join(totals, on="current_week").with_columns(
+        (pl.col("installs") / pl.col("active")).alias("share")
+    )
+
+
+def test_weekly_shares_count_every_value_an_install_reported_that_week():
+    """An install upgrading mid-week counts under both versions, as per-event counts did."""
+    events = compute_cohort_data(
+        pl.DataFrame(
+            {
+                "UserID": [1, 1, 1, 2, 2, 3],
+                "CreatedAt": [_dt(d) for d in (8, 9, 15, 8, 9, 10)],
+                "Version": ["v1", "v2", "v2", "v1", "v1", "v3"],
+                "AuthProvider": ["none", "simple", "simple", "none", "none", "none"],
+            }
+        )
+    )
+    columns = ["current_week", "value", "installs", "share"]
+
+    for metric, column, name in (
+        (calculate_version_adoption, "Version", "version"),
+        (calculate_auth_mix, "AuthProvider", "AuthProvider"),
+    ):
+        out = metric(compute_user_weeks(events)).rename({name: "value"})
+        expected = _baseline_share(events, column).rename({column: "value"})
+        assert out.select(columns).sort(columns).equals(expected.select(columns).sort(columns)), (
+            metric.__name__
+        )
+
+
 def test_new_installs_counts_first_ever_launch_week():
     """New installs = installs whose first-ever launch falls in that week; launches count all."""
     starts = pl.DataFrame(
@@ -208,7 +245,7 @@ def test_auth_mix_weekly_share_by_provider():
         }
     )
 
-    out = calculate_auth_mix(df)
+    out = calculate_auth_mix(compute_user_weeks(df))
     by_auth = {r["AuthProvider"]: r for r in out.iter_rows(named=True)}
     assert by_auth["none"]["installs"] == 2
     assert abs(by_auth["none"]["share"] - 2 / 3) < 1e-9
@@ -226,7 +263,7 @@ def test_concurrent_clients_averages_per_install_peaks():
         }
     )
 
-    out = calculate_concurrent_clients(df)
+    out = calculate_concurrent_clients(compute_user_weeks(df))
     wk0 = out.filter(pl.col("current_week") == 0).row(0, named=True)
     assert abs(wk0["avg_clients"] - 2.5) < 1e-9  # peaks 3 and 2
     assert wk0["max_clients"] == 3
@@ -246,7 +283,7 @@ def test_feature_adoption_weekly_share_per_flag_treats_null_as_off():
         }
     )
 
-    out = calculate_feature_adoption(df)
+    out = calculate_feature_adoption(compute_user_weeks(df))
     by_feature = {r["feature"]: r for r in out.iter_rows(named=True)}
     assert abs(by_feature["HasActions"]["adoption"] - 0.5) < 1e-9
     assert abs(by_feature["HasShell"]["adoption"] - 0.5) < 1e-9  # only user 2
@@ -0,0 +1,107 @@
+"""Tests for cohort computation and the shared user-week table."""
+
+from datetime import UTC, datetime
+
+import polars as pl
+from attribute_analysis import (
+    calculate_auth_mix,
+    calculate_concurrent_clients,
+    calculate_feature_adoption,
+    calculate_version_adoption,
+)
+from cohort_analysis import (
+    calculate_cohort_retention,
+    compute_cohort_data,
+    compute_user_weeks,
+)
+from engagement_analysis import (
+    calculate_cohort_engagement_metrics,
+    calculate_engagement_depth,
+    calculate_stickiness_metrics,
+    calculate_user_lifecycle_metrics,
+)
+from frames import collect_all
+from usage_analysis import calculate_usage_frequency
+
+
+def _events() -> pl.DataFrame:
+    """Three installs over three weeks (2024-01-03 is a week boundary from BASELINE)."""
+    days = [3, 5, 4, 10, 3, 17, 17, 10]
+    return compute_cohort_data(
+        pl.DataFrame(
+            {
+                "UserID": [1, 1, 1, 1, 2, 2, 2, 3],
+                "CreatedAt": [datetime(2024, 1, d, tzinfo=UTC) for d in days],
+                "Version": ["v1", "v2", "v1", "v2", "v1", "v1", "v1", "v3"],
+                "AuthProvider": ["none"] * 7 + ["simple"],
+                "Clients": [1, 4, 2, 0, 3, 1, 2, 5],
+                "HasActions": [False, True, False, None, None, False, False, True],
+                "HasShell": [None] * 8,
+                "HasHostname": [False] * 8,
+                "HasCustomAddress": [False] * 8,
+                "HasCustomBase": [False] * 8,
+            }
+        )
+    )
+
+
+def test_user_weeks_collapses_events_to_one_row_per_install_week():
+    weekly = compute_user_weeks(_events())
+    first = weekly.filter((pl.col("UserID") == 1) & (pl.col("cohort_index") == 0)).row(
+        0, named=True
+    )
+
+    assert weekly.height == 5
+    assert first["event_count"] == 3
+    assert first["peak_clients"] == 4
+    assert first["HasActions"] is True  # OR'd across the week
+    assert first["HasShell"] is False  # null counts as off
+    assert sorted(first["versions"]) == ["v1", "v2"]  # every version reported that week
+
+
+def _same(a: pl.DataFrame, b: pl.DataFrame) -> bool:
+    return a.sort(a.columns).equals(b.sort(b.columns))
+
+
+def test_weekly_metrics_give_same_results_from_a_lazy_user_week_table():
+    """Every weekly metric gives identical output from the eager or lazy user-week table."""
+    weekly = compute_user_weeks(_events())
+    metrics = {
+        metric.__name__: metric
+        for metric in (
+            calculate_cohort_retention,
+            calculate_cohort_engagement_metrics,
+            calculate_engagement_depth,
+            calculate_user_lifecycle_metrics,
+            calculate_concurrent_clients,
+            calculate_feature_adoption,
+            calculate_auth_mix,
+            calculate_version_adoption,
+        )
+    }
+    eager = {name: metric(weekly) for name, metric in metrics.items()}
+    lazy = collect_all({name: metric(weekly.lazy()) for name, metric in metrics.items()})
+
+    for name in metrics:
+        assert _same(eager[name], lazy[name]), name
+
+    usage = collect_all({"usage": calculate_usage_frequency(weekly.lazy())})["usage"]
+    for a, b in zip(calculate_usage_frequency(weekly), usage, strict=True):
+        assert _same(a, b)
+    stickiness = collect_all({"s": calculate_stickiness_metrics(weekly.lazy())})["s"]
+    assert calculate_stickiness_metrics(weekly)[1] == stickiness[1]
+
+
+def test_window_keeps_only_cohorts_activated_inside_it():
+    """Installs activated before a window are active in it, but no cohort of it."""
+    history = _events()
+    activations = history.group_by("UserID").agg(pl.col("activated").first())
+    window = history.filter(pl.col("CreatedAt") >= datetime(2024, 1, 10, tzinfo=UTC))
+    inside = activations.filter(pl.col("activated") >= datetime(2024, 1, 10, tzinfo=UTC))
+
+    weekly = compute_user_weeks(compute_cohort_data(window.select("UserID", "CreatedAt"), inside))
+    cohorts = calculate_cohort_retention(weekly)
+
+    assert cohorts.filter(pl.col("cohort_index") == 0)["users"].to_list() == [1]  # install 3
+    assert calculate_cohort_engagement_metrics(weekly)["active_users"].sum() == 1
+    assert calculate_user_lifecycle_metrics(weekly)["total_active_users"].sum() == 3  # all of them
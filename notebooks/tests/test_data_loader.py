@@ -1,13 +1,21 @@
 """Tests for data loading, identity construction, and identity quality."""
 
-from datetime import UTC, datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, date, datetime
 
+import data_loader
 import polars as pl
+import pytest
+from cohort_analysis import compute_cohort_data
 from data_loader import (
     calculate_identity_quality,
+    collect_engine,
+    list_day_files,
     load_and_process_data,
+    load_events_and_starts,
     load_start_beacons,
 )
+from install_ids import dictionary_id, refresh_install_ids
 
 
 def _ts(*days: int) -> pl.Series:
@@ -85,6 +93,137 @@ def test_load_start_beacons_returns_launch_events_with_identity(tmp_path):
     assert starts["UserID"].n_unique() == 1  # both starts are srv-A
 
 
+def test_single_scan_matches_the_separate_loaders(tmp_path):
+    _write_day(
+        tmp_path / "day-2024-01-01.parquet",
+        names=["start", "events", "start", "other"],
+        created=_ts(1, 2, 3, 4),
+        server_ids=["srv-A", "", "srv-B", "srv-A"],
+        RemoteIP=["10.0.0.1", "10.0.0.2", "10.0.0.1", "10.0.0.1"],
+        Version=["v1", "v1", "v2", "v2"],
+    )
+    _write_day(
+        tmp_path / "day-2024-01-05.parquet",
+        names=["events", "start"],
+        created=_ts(5, 6),
+        server_ids=["srv-B", "srv-C"],
+    )
+    glob = str(tmp_path / "day-*.parquet")
+
+    for start, end in ((None, None), (date(2024, 1, 2), date(2024, 1, 5))):
+        events, starts = load_events_and_starts(glob, start=start, end=end)
+        assert events.equals(load_and_process_data(glob, start=start, end=end))
+        assert starts.equals(load_start_beacons(glob, start=start, end=end))
+
+
+def test_compact_frames_encode_strings_and_precompute_the_week(tmp_path, monkeypatch):
+    _write_day(
+        tmp_path / "day-2024-01-01.parquet",
+        names=["events", "events"],
+        created=_ts(1, 9),
+        server_ids=["srv-A", "srv-B"],
+        Version=["v1", "v2"],
+        RunningContainers=[3, 400],
+    )
+    glob = str(tmp_path / "day-*.parquet")
+
+    monkeypatch.setattr(data_loader, "COMPACT_FRAMES", True)
+    compact = load_and_process_data(glob)
+    monkeypatch.setattr(data_loader, "COMPACT_FRAMES", False)
+    raw = load_and_process_data(glob)
+
+    assert compact.schema["Version"] == pl.Categorical
+    assert compact.schema["RunningContainers"] == pl.Int32
+    assert compact.schema["current_week"] == pl.Int32
+    assert "current_week" not in raw.columns
+    assert compact.drop("current_week").cast(raw.schema).equals(raw)
+    assert compute_cohort_data(raw)["current_week"].equals(compact["current_week"])
+
+
+def test_time_range_prunes_day_files_by_name_and_rows_by_time(tmp_path):
+    """Files outside the window are never opened; rows outside it are filtered out."""
+    for day in (1, 2, 3):
+        _write_day(
+            tmp_path / f"day-2024-01-0{day}.parquet",
+            names=["events", "events"],
+            created=_ts(day, day + 1),  # the second row spills into the next day
+            server_ids=["srv-A", "srv-B"],
+        )
+    (tmp_path / "day-2024-01-04.parquet").write_bytes(b"not parquet: must not be opened")
+    glob = str(tmp_path / "day-*.parquet")
+
+    files = list_day_files(glob, start=date(2024, 1, 2), end=date(2024, 1, 3))
+    assert [f.rsplit("/", 1)[-1] for f in files] == [
+        "day-2024-01-02.parquet",
+        "day-2024-01-03.parquet",
+    ]
+
+    df = load_and_process_data(glob, start=date(2024, 1, 2), end=date(2024, 1, 3))
+    assert sorted(df["CreatedAt"].dt.day().to_list()) == [2, 3, 3]
+
+    empty = load_and_process_data(glob, start=date(2025, 1, 1), end=date(2025, 1, 2))
+    assert empty.height == 0
+    assert "UserID" in empty.columns
+
+
+def test_streaming_engine_loads_the_same_rows(tmp_path):
+    _write_day(
+        tmp_path / "day-2024-01-01.parquet",
+        names=["events", "start", "events"],
+        created=_ts(1, 2, 3),
+        server_ids=["srv-A", "srv-A", ""],
+        RemoteIP=["10.0.0.1", "10.0.0.1", "10.0.0.2"],
+    )
+    glob = str(tmp_path / "day-*.parquet")
+
+    in_memory = load_and_process_data(glob, engine="in-memory")
+    streaming = load_and_process_data(glob, engine="streaming")
+
+    assert streaming.sort("CreatedAt").equals(in_memory.sort("CreatedAt"))
+
+
+def test_day_files_still_being_written_are_skipped(tmp_path):
+    """Every scan path leaves out a day file without its footer instead of failing."""
+    for day in (1, 2):
+        _write_day(
+            tmp_path / f"day-2024-01-0{day}.parquet",
+            names=["events", "start"],
+            created=_ts(day, day),
+            server_ids=[f"srv-{day}"] * 2,
+        )
+    partial = tmp_path / "day-2024-01-02.parquet"
+    partial.write_bytes(partial.read_bytes()[:-8])  # no footer yet
+    glob = str(tmp_path / "day-*.parquet")
+
+    assert refresh_install_ids(glob).height == 1
+    windowed = load_and_process_data(glob, start=date(2024, 1, 1), end=date(2024, 1, 2))
+    assert windowed["CreatedAt"].dt.day().to_list() == [1]
+    for engine in ("in-memory", "streaming"):
+        events, starts = load_events_and_starts(glob, engine=engine)
+        assert (events.height, starts.height) == (1, 1)
+
+    _write_day(partial, names=["events"], created=_ts(2), server_ids=["srv-2"])
+    assert refresh_install_ids(glob).height == 2
+    assert load_and_process_data(glob).height == 2
+
+
+def test_auto_engine_streams_when_data_would_not_fit(tmp_path, monkeypatch):
+    _write_day(
+        tmp_path / "day-2024-01-01.parquet",
+        names=["events"],
+        created=_ts(1),
+        server_ids=["srv-A"],
+    )
+    glob = str(tmp_path / "day-*.parquet")
+    monkeypatch.setattr(data_loader, "COLLECT_ENGINE", "auto")
+
+    monkeypatch.setattr(data_loader, "_available_memory", lambda: 1 << 40)
+    assert collect_engine(glob) == "in-memory"
+
+    monkeypatch.setattr(data_loader, "_available_memory", lambda: 1024)
+    assert collect_engine(glob) == "streaming"
+
+
 def test_identity_quality_reports_ip_derived_share():
     """Report what fraction of rows and distinct users were identified by IP fallback.
 
@@ -105,3 +244,75 @@ def test_identity_quality_reports_ip_derived_share():
     assert q["ip_users"] == 2
     assert q["total_users"] == 3
     assert abs(q["ip_user_pct"] - 2 / 3) < 1e-9
+
+
+def test_install_ids_are_dense_and_stable_across_new_files(tmp_path):
+    _write_day(
+        tmp_path / "day-2024-01-03.parquet",
+        names=["events", "events", "events"],
+        created=_ts(3, 4, 5),
+        server_ids=["srv-B", "srv-A", ""],
+        RemoteIP=["10.0.0.1", "10.0.0.1", "10.0.0.9"],
+    )
+    glob = str(tmp_path / "day-*.parquet")
+    first = load_and_process_data(glob).sort("CreatedAt")
+    assert first.schema["UserID"] == pl.UInt32
+    assert first["UserID"].to_list() == [0, 1, 2]
+
+    # A new file for an earlier day with a new install: known ids never change.
+    _write_day(
+        tmp_path / "day-2024-01-01.parquet",
+        names=["events", "events"],
+        created=_ts(1, 2),
+        server_ids=["srv-C", "srv-A"],
+        RemoteIP=["10.0.0.1", "10.0.0.1"],
+    )
+    second = load_and_process_data(glob).sort("CreatedAt")
+    assert second["UserID"].to_list() == [3, 1, 0, 1, 2]
+
+
+def test_concurrent_install_id_refreshes_never_share_an_id(tmp_path):
+    """Loaders racing on different new day files all extend the same dictionary."""
+    days = range(1, 9)
+    for day in days:
+        _write_day(
+            tmp_path / f"day-2024-01-0{day}.parquet",
+            names=["events"] * 3,
+            created=_ts(day, day, day),
+            server_ids=[f"srv-{day}-{i}" for i in range(3)],
+        )
+    glob = str(tmp_path / "day-*.parquet")
+    paths = list_day_files(glob)
+
+    with ThreadPoolExecutor(len(paths)) as pool:
+        list(pool.map(lambda path: refresh_install_ids(glob, [path]), paths))
+
+    ids = refresh_install_ids(glob)
+    assert ids.height == 3 * len(days)
+    assert sorted(ids["UserID"].to_list()) == list(range(ids.height))
+
+
+def test_dictionary_id_survives_growth_but_not_a_rebuild(tmp_path):
+    glob = str(tmp_path / "day-*.parquet")
+    assert dictionary_id(glob) is None
+    _write_day(
+        tmp_path / "day-2024-01-01.parquet", names=["events"], created=_ts(1), server_ids=["a"]
+    )
+    refresh_install_ids(glob)
+    first = dictionary_id(glob)
+
+    _write_day(
+        tmp_path / "day-2024-01-02.parquet", names=["events"], created=_ts(2), server_ids=["b"]
+    )
+    refresh_install_ids(glob)
+    assert dictionary_id(glob) == first
+
+    (tmp_path / "install_ids.parquet").unlink()
+    refresh_install_ids(glob)
+    assert dictionary_id(glob) not in (None, first)
+
+
+def test_unknown_collect_engine_is_rejected(monkeypatch):
+    monkeypatch.setattr(data_loader, "COLLECT_ENGINE", "streamin")
+    with pytest.raises(ValueError, match="streamin"):
+        collect_engine()
@@ -0,0 +1,64 @@
+"""Tests for the cached day-file manifest."""
+
+from datetime import UTC, date, datetime
+
+import day_manifest
+import polars as pl
+from data_loader import _overlaps
+from day_manifest import refresh_day_manifest
+
+
+def _write(path, names, hours):
+    pl.DataFrame(
+        {
+            "Name": names,
+            "CreatedAt": [datetime(2024, 1, 1, h, tzinfo=UTC) for h in hours],
+            "ServerID": ["srv-A"] * len(names),
+        }
+    ).write_parquet(path)
+
+
+def test_manifest_describes_files_and_reopens_only_changed_ones(tmp_path, monkeypatch):
+    first, second = tmp_path / "day-2024-01-01.parquet", tmp_path / "day-2024-01-02.parquet"
+    _write(first, ["events", "start", "events"], [3, 1, 2])
+    _write(second, ["start"], [5])
+    glob = str(tmp_path / "day-*.parquet")
+
+    entries = refresh_day_manifest(glob, [str(first), str(second)])
+    entry = entries[first.name]
+    assert entry.name_rows == {"events": 2, "start": 1}
+    assert entry.min_created == datetime(2024, 1, 1, 1, tzinfo=UTC)
+    assert entry.max_created == datetime(2024, 1, 1, 3, tzinfo=UTC)
+
+    def reopened(path):
+        raise AssertionError(f"{path} should come from the manifest")
+
+    monkeypatch.setattr(day_manifest, "describe_day_file", reopened)
+    assert refresh_day_manifest(glob, [str(first), str(second)]) == entries
+
+    monkeypatch.undo()
+    _write(second, ["events", "events"], [6, 7])
+    assert refresh_day_manifest(glob, [str(second)])[second.name].name_rows == {"events": 2}
+    assert refresh_day_manifest(glob, [str(first)])[first.name] == entry
+
+
+def test_files_deleted_after_listing_get_no_entry(tmp_path):
+    kept, deleted = tmp_path / "day-2024-01-01.parquet", tmp_path / "day-2024-01-02.parquet"
+    _write(kept, ["events"], [1])
+    glob = str(tmp_path / "day-*.parquet")
+
+    entries = refresh_day_manifest(glob, [str(kept), str(deleted)])
+
+    assert list(entries) == [kept.name]
+
+
+def test_files_are_pruned_by_beacon_name_and_time_bounds(tmp_path):
+    path = tmp_path / "day-2024-01-01.parquet"
+    _write(path, ["start", "start"], [1, 23])
+    entry = refresh_day_manifest(str(tmp_path / "day-*.parquet"), [str(path)])[path.name]
+
+    assert _overlaps(entry, None, None, "start")
+    assert not _overlaps(entry, None, None, "events")
+    assert _overlaps(entry, date(2024, 1, 1), date(2024, 1, 1), None)
+    assert not _overlaps(entry, date(2024, 1, 2), None, None)
+    assert not _overlaps(entry, None, date(2023, 12, 31), None)
@@ -0,0 +1,72 @@
+"""Tests for LTTB downsampling of chart series."""
+
+from datetime import date, timedelta
+
+import numpy as np
+import polars as pl
+import pytest
+from downsample import downsample, lttb_indices
+
+
+def test_lttb_keeps_endpoints_and_extremes():
+    x = np.arange(1000)
+    y = np.sin(x / 50.0)
+    y[437] = 10.0
+    y[811] = -10.0
+
+    kept = lttb_indices(x, y, 50)
+
+    assert len(kept) == 50
+    assert kept[0] == 0 and kept[-1] == 999
+    assert np.all(np.diff(kept) > 0)
+    assert {437, 811} <= set(kept.tolist())
+
+
+def test_lttb_returns_short_series_whole():
+    assert lttb_indices(np.arange(10), np.ones(10), 50).tolist() == list(range(10))
+
+
+def test_downsample_keeps_series_aligned():
+    weeks = [date(2020, 1, 6) + timedelta(weeks=i) for i in range(300)]
+    long = pl.DataFrame(
+        {
+            "week_date": weeks * 2,
+            "version": ["v1"] * 300 + ["v2"] * 300,
+            "share": np.linspace(0, 1, 600),
+        }
+    )
+
+    small = downsample(long, "week_date", ["share"], 40, series="version")
+
+    assert small["week_date"].n_unique() == 40
+    per_version = small.partition_by("version", as_dict=True)
+    assert per_version[("v1",)]["week_date"].equals(per_version[("v2",)]["week_date"])
+    assert downsample(long, "week_date", ["share"], 300, series="version") is long
+
+
+def test_downsample_keeps_a_spike_in_shares_that_sum_to_one():
+    """A total of shares is flat; the spike of one series must still be kept."""
+    weeks = [date(2000, 1, 3) + timedelta(weeks=i) for i in range(2000)]
+    share_a = np.full(2000, 0.05)
+    share_a[1234] = 0.9
+    long = pl.DataFrame(
+        {
+            "week_date": weeks * 2,
+            "version": ["a"] * 2000 + ["b"] * 2000,
+            "share": np.concatenate([share_a, 1 - share_a]),
+        }
+    )
+
+    small = downsample(long, "week_date", ["share"], 100, series="version")
+
+    assert small["week_date"].n_unique() == 100
+    assert small.filter(pl.col("version") == "a")["share"].max() == 0.9
+    assert small.filter(pl.col("version") == "b")["share"].min() == pytest.approx(0.1)
+
+
+def test_lttb_keeps_the_extremes_of_every_series():
+    x = np.arange(1000)
+    y = np.column_stack([np.zeros(1000), 1000 * np.sin(x / 50.0)])
+    y[300, 0] = 1.0  # tiny next to the other series, but its only feature
+
+    assert 300 in lttb_indices(x, y, 50).tolist()
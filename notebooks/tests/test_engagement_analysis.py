@@ -1,7 +1,16 @@
 """Tests for engagement analysis metrics."""
 
+import random
+from datetime import UTC, datetime, timedelta
+
 import polars as pl
-from engagement_analysis import calculate_stickiness_metrics
+from cohort_analysis import compute_user_weeks
+from engagement_analysis import (
+    calculate_active_installs,
+    calculate_stickiness_metrics,
+    calculate_user_lifecycle_metrics,
+    trailing_distinct,
+)
 
 
 def test_mau_counts_distinct_users_over_trailing_four_weeks():
@@ -17,7 +26,7 @@ def test_mau_counts_distinct_users_over_trailing_four_weeks():
         }
     )
 
-    stickiness, stats = calculate_stickiness_metrics(df)
+    stickiness, stats = calculate_stickiness_metrics(compute_user_weeks(df))
 
     by_week = {row["current_week"]: row["mau"] for row in stickiness.iter_rows(named=True)}
     assert by_week == {0: 2, 1: 3, 2: 4, 3: 4}
@@ -26,3 +35,132 @@ def test_mau_counts_distinct_users_over_trailing_four_weeks():
     wk3 = stickiness.filter(pl.col("current_week") == 3)
     assert wk3["wau"][0] == 1
     assert abs(wk3["stickiness_ratio"][0] - 0.25) < 1e-9
+
+
+def _reference_lifecycle(df: pl.DataFrame) -> list[dict]:
+    """The original set-based loop, kept as the parity oracle for the columnar version."""
+    weekly = df.group_by("current_week").agg(pl.col("UserID").unique()).sort("current_week")
+    rows, prev, seen = [], set(), set()
+    for i, (week, users) in enumerate(weekly.iter_rows()):
+        cur = set(users)
+        if i == 0:
+            counts = (len(cur), 0, 0, 0)
+        else:
+            counts = (
+                len(cur - prev - seen),
+                len(cur & prev),
+                len(prev - cur),
+                len(cur & seen - prev),
+            )
+            seen |= prev
+        prev = cur
+        rows.append(
+            dict(
+                zip(
+                    ["new_users", "retained_users", "churned_users", "resurrected_users"],
+                    counts,
+                    strict=True,
+                ),
+                current_week=week,
+                total_active_users=len(cur),
+            )
+        )
+    return rows
+
+
+def test_lifecycle_classifies_against_previous_active_week():
+    """Week 2 has no activity, so week 3's 'previous week' is week 1.
+
+    wk0: A, B. wk1: A, C. wk3: A, B, D. wk4: D.
+    wk1: A retained, C new, B churned. wk3: A retained (prev active week), B resurrected,
+    D new, C churned. wk4: D retained, A and B churned.
+    """
+    df = pl.DataFrame(
+        {
+            "UserID": [1, 2, 1, 3, 1, 2, 4, 4],
+            "current_week": [0, 0, 1, 1, 3, 3, 3, 4],
+        }
+    )
+
+    out = calculate_user_lifecycle_metrics(compute_user_weeks(df))
+
+    assert out["current_week"].to_list() == [0, 1, 3, 4]
+    assert out["new_users"].to_list() == [2, 1, 1, 0]
+    assert out["retained_users"].to_list() == [0, 1, 1, 1]
+    assert out["resurrected_users"].to_list() == [0, 0, 1, 0]
+    assert out["churned_users"].to_list() == [0, 1, 1, 2]
+    assert out["total_active_users"].to_list() == [2, 2, 3, 1]
+    assert "week_date" in out.columns
+
+
+def test_lifecycle_matches_set_based_reference():
+    rng = random.Random(7)
+    df = pl.DataFrame(
+        {
+            "UserID": [rng.randrange(40) for _ in range(600)],
+            "current_week": [rng.choice([0, 1, 2, 4, 5, 6, 9]) for _ in range(600)],
+        }
+    )
+
+    out = calculate_user_lifecycle_metrics(compute_user_weeks(df)).drop("week_date")
+
+    assert out.to_dicts() == [{c: row[c] for c in out.columns} for row in _reference_lifecycle(df)]
+
+
+def _reference_stickiness(df: pl.DataFrame) -> pl.DataFrame:
+    """The original int_ranges/explode MAU, kept as the parity oracle."""
+    wau = df.group_by("current_week").agg(pl.len().alias("wau")).sort("current_week")
+    mau = (
+        df.select("UserID", "current_week")
+        .with_columns(
+            pl.int_ranges(pl.col("current_week"), pl.col("current_week") + 4).alias("window_week")
+        )
+        .explode("window_week")
+        .group_by("window_week")
+        .agg(pl.col("UserID").n_unique().alias("mau"))
+    )
+    return wau.join(mau, left_on="current_week", right_on="window_week", how="left").with_columns(
+        (pl.col("wau") / pl.col("mau")).alias("stickiness_ratio")
+    )
+
+
+def test_trailing_window_matches_explode_reference():
+    rng = random.Random(11)
+    rows = {
+        (rng.randrange(60), rng.choice([0, 1, 2, 5, 9, 10, 30, 31, 33, 70])) for _ in range(400)
+    }
+    df = pl.DataFrame(
+        list(rows), schema={"UserID": pl.UInt32, "current_week": pl.Int32}, orient="row"
+    )
+
+    stickiness, _ = calculate_stickiness_metrics(compute_user_weeks(df))
+    reference = _reference_stickiness(df)
+    assert stickiness.select(reference.columns).equals(reference)
+
+    lazy, _ = calculate_stickiness_metrics(compute_user_weeks(df.lazy()))
+    assert lazy.collect().equals(stickiness)
+
+    for window in (1, 2, 7, 30):
+        changes = trailing_distinct(df, "current_week", window)
+        weeks = pl.DataFrame({"current_week": pl.int_range(0, 110, dtype=pl.Int32, eager=True)})
+        got = weeks.join_asof(changes, on="current_week", strategy="backward").fill_null(0)
+        expected = [len({u for u, w in rows if week - window < w <= week}) for week in range(110)]
+        assert got["distinct"].to_list() == expected, window
+
+
+def test_active_installs_counts_trailing_days():
+    start = datetime(2024, 3, 1, tzinfo=UTC)
+    df = pl.DataFrame(
+        {
+            "UserID": [1, 1, 2, 3, 1],
+            "CreatedAt": [start + timedelta(days=d) for d in (0, 0, 3, 10, 40)],
+        }
+    )
+
+    active = calculate_active_installs(df)
+
+    assert active["date"].to_list() == [start + timedelta(days=d) for d in (0, 3, 10, 40)]
+    assert active["active_1d"].to_list() == [1, 1, 1, 1]
+    assert active["active_7d"].to_list() == [1, 2, 1, 1]
+    assert active["active_30d"].to_list() == [1, 2, 3, 1]  # day 10 is out of days 11-40
+    assert active["active_90d"].to_list() == [1, 2, 3, 3]
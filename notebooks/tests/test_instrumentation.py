@@ -0,0 +1,33 @@
+"""Tests for per-stage instrumentation."""
+
+import polars as pl
+from instrumentation import instrumented, recording, stage
+
+
+@instrumented
+def _double(df: pl.DataFrame) -> pl.DataFrame:
+    with stage("inner", df) as s:
+        s.output = pl.concat([df, df])
+    return s.output
+
+
+def test_stages_are_not_recorded_without_a_recording():
+    df = pl.DataFrame({"a": [1, 2]})
+    assert _double(df).height == 4
+    with recording() as log:
+        pass
+    assert log.records == []
+
+
+def test_recording_captures_nested_stages():
+    df = pl.DataFrame({"a": [1, 2, 3]})
+    with recording() as log:
+        result = _double(df)
+
+    assert result.height == 6
+    outer, inner = log.records
+    assert (outer.stage, outer.depth, outer.rows_in, outer.rows_out) == ("_double", 0, 3, 6)
+    assert (inner.stage, inner.depth) == ("inner", 1)
+    assert outer.seconds >= inner.seconds >= 0
+    assert outer.bytes_out == result.estimated_size()
+    assert log.to_frame()["stage"].to_list() == ["_double", "  inner"]
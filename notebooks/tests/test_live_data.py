@@ -0,0 +1,268 @@
+"""Tests for the incrementally refreshed live frames."""
+
+import os
+import time
+from datetime import UTC, datetime
+
+import activations
+import live_data
+import polars as pl
+import pytest
+from activations import refresh_activations
+from cohort_analysis import compute_cohort_data, compute_user_weeks
+from data_loader import load_and_process_data
+from frame_snapshots import read_frames
+from install_ids import refresh_install_ids
+from live_data import LiveFrames, SharedFrames
+from rollups import load_user_week_rollups
+
+
+def _write_day(path, day: int, server_ids: list[str], names: list[str] | None = None) -> None:
+    pl.DataFrame(
+        {
+            "Name": names or ["events"] * len(server_ids),
+            "CreatedAt": pl.Series(
+                [datetime(2024, 1, day, h, tzinfo=UTC) for h in range(len(server_ids))],
+                dtype=pl.Datetime("ns", "UTC"),
+            ),
+            "ServerID": server_ids,
+            "Version": [f"v{day}"] * len(server_ids),
+        }
+    ).write_parquet(path)
+
+
+def _same(a: pl.DataFrame, b: pl.DataFrame) -> bool:
+    return a.sort(a.columns).equals(b.sort(b.columns))
+
+
+def test_new_day_file_is_appended_without_a_full_reload(tmp_path, monkeypatch):
+    glob = str(tmp_path / "day-*.parquet")
+    _write_day(
+        tmp_path / "day-2024-01-03.parquet", 3, ["a", "b", "a"], ["events", "events", "start"]
+    )
+    live = LiveFrames(glob)
+    first = live.snapshot
+
+    _write_day(
+        tmp_path / "day-2024-01-10.parquet", 10, ["a", "c", "c"], ["events", "events", "start"]
+    )
+    monkeypatch.setattr(live, "_load_all", lambda generation: pytest.fail("unexpected full reload"))
+    snapshot = live.refresh()
+
+    assert snapshot is not first
+    assert snapshot.generation == first.generation + 1
+    assert first.frames is not None and first.frames.events.height == 2  # old snapshot untouched
+    frames = snapshot.frames
+    assert frames is not None
+    full = compute_cohort_data(load_and_process_data(glob))
+    assert _same(frames.cohort, full)
+    assert _same(frames.user_weeks, compute_user_weeks(full))
+    assert frames.starts.height == 2
+    assert snapshot.attrs.filter(pl.col("Version") == "v10").height == 2
+    assert live.refresh() is snapshot  # nothing new on disk
+
+
+def test_appended_day_file_is_read_once_and_matches_a_full_load(tmp_path, monkeypatch):
+    glob = str(tmp_path / "day-*.parquet")
+    _write_day(tmp_path / "day-2024-01-03.parquet", 3, ["a", "b"])
+    live = LiveFrames(glob)
+
+    _write_day(tmp_path / "day-2024-01-05.parquet", 5, ["a", "c"], ["events", "start"])
+    monkeypatch.setattr(live_data, "load_user_week_rollups", lambda *a, **k: pytest.fail("read"))
+    monkeypatch.setattr(activations, "scan_day_files", lambda *a, **k: pytest.fail("read"))
+    snapshot = live.refresh()
+    monkeypatch.undo()
+
+    assert snapshot.generation == 1
+    # "a" is in the same week on both days: its merged week, as a full load has it.
+    full = live_data._install_attributes(glob, load_user_week_rollups(glob))
+    assert _same(snapshot.attrs, full)
+    assert snapshot.attrs.filter(pl.col("UserID") == 0)["event_count"].to_list() == [2]
+    assert _same(snapshot.activations, refresh_activations(glob))
+
+
+def test_empty_data_directory_starts_empty_and_grows(tmp_path, monkeypatch):
+    glob = str(tmp_path / "day-*.parquet")
+    live = LiveFrames(glob)
+    assert live.snapshot.attrs.is_empty() and live.snapshot.files == {}
+
+    _write_day(tmp_path / "day-2024-01-03.parquet", 3, ["a", "b"])
+    monkeypatch.setattr(live, "_load_all", lambda generation: pytest.fail("unexpected full reload"))
+    snapshot = live.refresh()
+
+    assert snapshot.attrs.height == 2
+    assert snapshot.frames is not None and snapshot.frames.events.height == 2
+
+
+def test_files_still_being_written_are_not_loaded(tmp_path):
+    glob = str(tmp_path / "day-*.parquet")
+    _write_day(tmp_path / "day-2024-01-03.parquet", 3, ["a"])
+    partial = tmp_path / "day-2024-01-04.parquet"
+    _write_day(partial, 4, ["b", "c"])
+    partial.write_bytes(partial.read_bytes()[:-8])  # no footer yet
+
+    snapshot = LiveFrames(glob).snapshot
+
+    assert list(snapshot.files) == ["day-2024-01-03.parquet"]
+    assert snapshot.frames is not None and snapshot.frames.events.height == 1
+    assert snapshot.attrs.height == 1
+
+
+def test_changed_day_file_triggers_full_reload(tmp_path):
+    glob = str(tmp_path / "day-*.parquet")
+    path = tmp_path / "day-2024-01-03.parquet"
+    _write_day(path, 3, ["a"])
+    live = LiveFrames(glob)
+
+    _write_day(path, 3, ["a", "b"])
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    frames = live.refresh().frames
+
+    assert frames is not None
+    assert frames.events.height == 2
+
+
+def test_watcher_picks_up_new_day_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(live_data, "REFRESH_DEBOUNCE_SECONDS", 0.05)
+    glob = str(tmp_path / "day-*.parquet")
+    _write_day(tmp_path / "day-2024-01-03.parquet", 3, ["a"])
+    live = LiveFrames(glob)
+    live.start()
+    try:
+        _write_day(tmp_path / "day-2024-01-04.parquet", 4, ["b"])
+        deadline = time.monotonic() + 5
+        while live.snapshot.generation == 0 and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        live.stop()
+
+    frames = live.snapshot.frames
+    assert frames is not None
+    assert frames.events.height == 2
+
+
+def test_restart_maps_the_persisted_frames_and_appends_new_files(tmp_path, monkeypatch):
+    glob = str(tmp_path / "day-*.parquet")
+    _write_day(
+        tmp_path / "day-2024-01-03.parquet", 3, ["a", "b", "a"], ["events", "events", "start"]
+    )
+    live = LiveFrames(glob)
+    live.flush()
+    first = live.snapshot
+    _write_day(tmp_path / "day-2024-01-10.parquet", 10, ["a", "c"])
+
+    monkeypatch.setattr(LiveFrames, "_load_all", lambda *args: pytest.fail("unexpected reload"))
+    restarted = LiveFrames(glob).snapshot
+
+    assert first.frames is not None and restarted.frames is not None
+    assert restarted.generation == 1  # the mapped snapshot plus the appended file
+    full = compute_cohort_data(load_and_process_data(glob))
+    assert _same(restarted.frames.cohort, full)
+    assert _same(restarted.frames.events, load_and_process_data(glob))
+    assert _same(restarted.frames.user_weeks, compute_user_weeks(full))
+    assert restarted.frames.starts.equals(first.frames.starts)
+    assert restarted.attrs.height == 3
+
+
+def test_stale_frame_snapshot_is_not_used(tmp_path):
+    glob = str(tmp_path / "day-*.parquet")
+    path = tmp_path / "day-2024-01-03.parquet"
+    _write_day(path, 3, ["a"])
+    LiveFrames(glob).flush()
+
+    _write_day(path, 3, ["a", "b"])
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    frames = LiveFrames(glob).snapshot.frames
+
+    assert frames is not None
+    assert frames.events.height == 2
+
+
+def test_frame_snapshot_of_a_rebuilt_install_id_dictionary_is_not_used(tmp_path):
+    glob = str(tmp_path / "day-*.parquet")
+    _write_day(tmp_path / "day-2024-01-03.parquet", 3, ["a", "b"])
+    LiveFrames(glob).flush()
+    assert read_frames(glob) is not None
+
+    (tmp_path / "install_ids.parquet").unlink()
+    refresh_install_ids(glob)  # the same ids, but no longer known to be
+
+    assert read_frames(glob) is None
+
+
+def test_shared_workers_map_what_the_loader_publishes(tmp_path, monkeypatch):
+    glob = str(tmp_path / "day-*.parquet")
+    _write_day(tmp_path / "day-2024-01-03.parquet", 3, ["a", "b"], ["events", "start"])
+    loader = LiveFrames(glob)
+    loader.flush()
+    monkeypatch.setattr(live_data, "load_events_and_starts", lambda *a, **k: pytest.fail("load"))
+    monkeypatch.setattr(live_data, "refresh_activations", lambda *a, **k: pytest.fail("load"))
+
+    worker = SharedFrames(glob)
+    first = worker.snapshot
+    assert first.files == loader.snapshot.files
+    assert first.frames is not None
+    assert loader.snapshot.frames is not None
+    loaded = loader.snapshot.frames.cohort
+    assert isinstance(loaded.schema["Version"], pl.Categorical)
+    assert isinstance(first.frames.cohort.schema["Version"], pl.Enum)  # mapped codes
+    assert _same(first.frames.cohort.cast(loaded.schema), loaded)
+    assert worker.snapshot is first  # nothing new published
+
+    monkeypatch.undo()
+    _write_day(tmp_path / "day-2024-01-04.parquet", 4, ["c"])
+    published = loader.refresh()
+    loader.flush()
+    current = worker.snapshot
+
+    assert current.generation == first.generation + 1
+    assert current.files == published.files
+    assert current.frames is not None and current.frames.events.height == 2
+    assert _same(current.activations, published.activations)
+
+
+def test_started_shared_workers_map_new_snapshots_without_being_read(tmp_path, monkeypatch):
+    monkeypatch.setattr(live_data, "SHARED_FRAMES_POLL_SECONDS", 0.05)
+    glob = str(tmp_path / "day-*.parquet")
+    _write_day(tmp_path / "day-2024-01-03.parquet", 3, ["a"])
+    loader = LiveFrames(glob)
+    loader.flush()
+    worker = SharedFrames(glob)
+    worker.start()
+    first = worker._snapshot
+
+    _write_day(tmp_path / "day-2024-01-04.parquet", 4, ["b"])
+    loader.refresh()
+    loader.flush()
+    deadline = time.monotonic() + 5
+    while worker._snapshot is first and time.monotonic() < deadline:
+        time.sleep(0.05)
+    worker.stop()
+
+    assert worker._snapshot is not first  # the old mapping is no longer held
+    assert worker._snapshot is not None
+    assert worker._snapshot.files == loader.snapshot.files
+
+
+def test_refresh_persists_in_the_background_once_frames_settle(tmp_path, monkeypatch):
+    monkeypatch.setattr(live_data, "SNAPSHOT_PERSIST_DELAY_SECONDS", 0.2)
+    written = []
+    monkeypatch.setattr(
+        live_data, "write_frames", lambda glob, files, frames: written.append(files)
+    )
+    glob = str(tmp_path / "day-*.parquet")
+    _write_day(tmp_path / "day-2024-01-03.parquet", 3, ["a"])
+    live = LiveFrames(glob)
+    for day in (4, 5):
+        _write_day(tmp_path / f"day-2024-01-0{day}.parquet", day, ["b"])
+        live.refresh()
+    assert written == []  # nothing written on the refresh path
+
+    deadline = time.monotonic() + 5
+    while not written and time.monotonic() < deadline:
+        time.sleep(0.05)
+    live.flush()
+
+    assert written == [live.snapshot.files]  # the burst is written once, as of its end
@@ -0,0 +1,120 @@
+"""Eager/lazy parity for the dashboard metric graph."""
+
+import random
+import threading
+from datetime import UTC, datetime, timedelta
+
+import metrics
+import polars as pl
+import pytest
+from attribute_analysis import calculate_install_attributes
+from cohort_analysis import compute_cohort_data, compute_user_weeks
+from instrumentation import recording
+from metrics import METRICS, MetricResults, compute_metrics
+
+
+def _sources(lazy: bool) -> dict:
+    rng = random.Random(3)
+    n = 400
+    start = datetime(2024, 1, 1, tzinfo=UTC)
+    events = pl.DataFrame(
+        {
+            "UserID": [rng.randrange(30) for _ in range(n)],
+            "id_from_ip": [rng.random() < 0.2 for _ in range(n)],
+            "CreatedAt": [start + timedelta(hours=rng.randrange(24 * 70)) for _ in range(n)],
+            "Version": [rng.choice(["v1", "v2", "v3", None]) for _ in range(n)],
+            "AuthProvider": [rng.choice(["none", "simple"]) for _ in range(n)],
+            "RunningContainers": [rng.randrange(100) for _ in range(n)],
+            "Clients": [rng.randrange(5) for _ in range(n)],
+            "Browser": [
+                rng.choice(["Firefox/1 Windows", "Chrome/1 Linux", None]) for _ in range(n)
+            ],
+            "HasActions": [rng.random() < 0.5 for _ in range(n)],
+            "HasHostname": [rng.random() < 0.5 for _ in range(n)],
+            "HasCustomAddress": [False] * n,
+            "HasCustomBase": [False] * n,
+            "HasShell": [rng.choice([True, False, None]) for _ in range(n)],
+        }
+    )
+    starts = events.select("UserID", "CreatedAt")
+    attrs = calculate_install_attributes(events)
+    source = events.lazy() if lazy else events
+    df = compute_cohort_data(source)
+    return {"events": df, "weekly": compute_user_weeks(df), "starts": starts, "attrs": attrs}
+
+
+def _same(a, b) -> bool:
+    if isinstance(a, tuple):
+        return all(_same(x, y) for x, y in zip(a, b, strict=True))
+    if isinstance(a, pl.DataFrame):
+        return a.sort(a.columns).equals(b.sort(b.columns))
+    return a == b
+
+
+def test_lazy_metric_graph_matches_eager_results():
+    """The single collect_all graph must produce exactly the eager results."""
+    eager = compute_metrics(_sources(lazy=False))
+    lazy = compute_metrics(_sources(lazy=True))
+
+    assert set(eager) == set(lazy) == {m.name for m in METRICS}
+    for name in eager:
+        assert _same(eager[name], lazy[name]), name
+    assert isinstance(lazy["quality"], dict)
+    assert isinstance(lazy["stickiness"][1], dict)
+
+
+def test_streaming_metric_graph_matches_eager_results():
+    eager = compute_metrics(_sources(lazy=False))
+    streaming = compute_metrics(_sources(lazy=True), engine="streaming")
+
+    for name in eager:
+        assert _same(eager[name], streaming[name]), name
+
+
+def test_thread_pool_matches_sequential_results_and_records_every_stage():
+    sources = _sources(lazy=False)
+    sequential = compute_metrics(sources, threaded=False)
+    with recording() as log:
+        pooled = compute_metrics(sources, threaded=True)
+        results = dict(pooled)  # waits for every metric
+
+    assert isinstance(pooled, MetricResults)
+    for name in sequential:
+        assert _same(sequential[name], results[name]), name
+    metric_stages = [r for r in log.records if r.depth == 0]
+    assert sorted(r.stage for r in metric_stages) == sorted(m.name for m in METRICS)
+
+
+def test_sessions_share_one_pool_and_stopping_cancels_queued_metrics(monkeypatch):
+    """Concurrent reruns never exceed the pool; a stopped rerun frees its queued slots."""
+    running, peak, lock = 0, 0, threading.Lock()
+    release = threading.Event()
+
+    def slow(source):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        release.wait(5)
+        with lock:
+            running -= 1
+        return source
+
+    slow_metrics = [metrics.Metric(f"m{i}", "events", slow) for i in range(12)]
+    monkeypatch.setattr(metrics, "METRICS", slow_metrics)
+    first = compute_metrics({"events": pl.DataFrame()}, threaded=True)
+    second = compute_metrics({"events": pl.DataFrame()}, threaded=True)
+    assert isinstance(first, MetricResults)
+    assert isinstance(second, MetricResults)
+
+    def stop(timeout=None):
+        raise KeyboardInterrupt  # what Streamlit stopping the script looks like here
+
+    monkeypatch.setattr(first._futures["m0"], "result", stop)
+    with pytest.raises(KeyboardInterrupt):
+        first.wait()
+    release.set()
+    assert len(second.wait()) == len(slow_metrics)
+
+    assert peak <= metrics.METRIC_WORKERS
+    assert first._futures["m11"].cancelled()
@@ -0,0 +1,40 @@
+"""Tests for the headless metric precompute job."""
+
+import polars as pl
+from metrics import METRICS
+from precompute import compute_results, read_results, results_stamp, write_results
+from synthetic import SyntheticConfig, write_dataset
+
+
+def _same(stored, computed) -> bool:
+    if isinstance(computed, pl.DataFrame):
+        return stored.equals(computed)
+    if isinstance(computed, tuple):
+        return all(_same(s, c) for s, c in zip(stored, computed, strict=True))
+    return stored == computed
+
+
+def test_results_round_trip_for_the_day_files_they_were_computed_from(tmp_path):
+    write_dataset(tmp_path, SyntheticConfig(installs=60, days=14))
+    glob = str(tmp_path / "day-*.parquet")
+    assert read_results(glob) is None
+    assert results_stamp(glob) == 0
+
+    results, snapshot = compute_results(glob)
+    write_results(glob, results, snapshot)
+    first = results_stamp(glob)
+    stored = read_results(glob, snapshot.files)
+
+    assert stored is not None
+    assert set(stored) == {m.name for m in METRICS}
+    for name, value in results.items():
+        assert _same(stored[name], value), name
+
+    # Results for another set of day files are stale.
+    newer = {**snapshot.files, "day-2099-01-01.parquet": (1, 1)}
+    assert read_results(glob, newer) is None
+
+    # A rerun replaces the previous generation.
+    write_results(glob, results, snapshot)
+    assert results_stamp(glob) != first
+    assert len([p for p in (tmp_path / "results").iterdir() if p.is_dir()]) == 1
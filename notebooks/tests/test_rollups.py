@@ -0,0 +1,97 @@
+"""Tests for the persisted per-day rollup store."""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, datetime
+
+import polars as pl
+from install_ids import refresh_install_ids
+from rollups import load_user_week_rollups, refresh_rollups
+
+
+def _write_day(path, *, day: int, server_ids: list[str], versions: list[str]) -> None:
+    pl.DataFrame(
+        {
+            "Name": ["events"] * len(server_ids),
+            "CreatedAt": pl.Series(
+                [datetime(2024, 1, day, h, tzinfo=UTC) for h in range(len(server_ids))],
+                dtype=pl.Datetime("ns", "UTC"),
+            ),
+            "ServerID": server_ids,
+            "Version": versions,
+        }
+    ).write_parquet(path)
+
+
+def test_refresh_only_processes_new_or_changed_day_files(tmp_path):
+    """A second refresh is a no-op; touching one file reprocesses only that file."""
+    glob = str(tmp_path / "day-*.parquet")
+    _write_day(tmp_path / "day-2024-01-01.parquet", day=1, server_ids=["a"], versions=["v1"])
+    _write_day(tmp_path / "day-2024-01-02.parquet", day=2, server_ids=["b"], versions=["v1"])
+
+    assert refresh_rollups(glob) == ["day-2024-01-01.parquet", "day-2024-01-02.parquet"]
+    assert refresh_rollups(glob) == []
+
+    changed = tmp_path / "day-2024-01-02.parquet"
+    _write_day(changed, day=2, server_ids=["b", "c"], versions=["v1", "v2"])
+    stat = changed.stat()
+    os.utime(changed, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert refresh_rollups(glob) == ["day-2024-01-02.parquet"]
+
+    (tmp_path / "day-2024-01-01.parquet").unlink()
+    refresh_rollups(glob)
+    assert not (tmp_path / "rollups" / "day-2024-01-01.rollup.parquet").exists()
+
+
+def test_merged_rollups_sum_counts_and_keep_latest_attributes(tmp_path):
+    """Days in the same week merge into one row with summed counts and latest values."""
+    glob = str(tmp_path / "day-*.parquet")
+    _write_day(
+        tmp_path / "day-2024-01-03.parquet", day=3, server_ids=["a", "a"], versions=["v1"] * 2
+    )
+    _write_day(
+        tmp_path / "day-2024-01-04.parquet", day=4, server_ids=["a", "b"], versions=["v2"] * 2
+    )
+
+    merged = load_user_week_rollups(glob)
+
+    assert merged.height == 2
+    a = merged.sort("event_count", descending=True).row(0, named=True)
+    assert a["event_count"] == 3
+    assert a["Version"] == "v2"
+    assert a["first_seen"] == datetime(2024, 1, 3, 0, tzinfo=UTC)
+    assert a["last_seen"] == datetime(2024, 1, 4, 0, tzinfo=UTC)
+
+
+def test_rebuilt_install_id_dictionary_rebuilds_the_rollups(tmp_path):
+    """Rollups built with an earlier dictionary are not merged under its ids."""
+    glob = str(tmp_path / "day-*.parquet")
+    _write_day(
+        tmp_path / "day-2024-01-03.parquet", day=3, server_ids=["a", "b"], versions=["v1"] * 2
+    )
+    assert refresh_rollups(glob) == ["day-2024-01-03.parquet"]
+
+    # A dictionary built anew from a late file first: b is now 0 and a is 1.
+    (tmp_path / "install_ids.parquet").unlink()
+    _write_day(tmp_path / "day-2024-01-01.parquet", day=1, server_ids=["b"], versions=["v1"])
+    refresh_install_ids(glob, [str(tmp_path / "day-2024-01-01.parquet")])
+
+    assert refresh_rollups(glob) == ["day-2024-01-01.parquet", "day-2024-01-03.parquet"]
+    first_seen = load_user_week_rollups(glob).group_by("UserID").agg(pl.col("first_seen").min())
+    assert dict(first_seen.sort("UserID").iter_rows()) == {
+        0: datetime(2024, 1, 1, 0, tzinfo=UTC),
+        1: datetime(2024, 1, 3, 0, tzinfo=UTC),
+    }
+
+
+def test_concurrent_refreshes_keep_every_rollup(tmp_path):
+    glob = str(tmp_path / "day-*.parquet")
+    names = [f"day-2024-01-0{day}.parquet" for day in range(1, 9)]
+    for day, name in enumerate(names, start=1):
+        _write_day(tmp_path / name, day=day, server_ids=[f"srv-{day}"], versions=["v1"])
+
+    with ThreadPoolExecutor(len(names)) as pool:
+        list(pool.map(lambda name: refresh_rollups(glob, files=[name]), names))
+
+    assert refresh_rollups(glob) == []
+    assert load_user_week_rollups(glob).height == len(names)
@@ -0,0 +1,67 @@
+"""Tests for the bitmap segmentation index."""
+
+import random
+from datetime import UTC, datetime, timedelta
+
+import polars as pl
+from attribute_analysis import calculate_install_attributes, filter_installs
+from segment_index import build_segment_index, filter_rows
+
+
+def _events() -> pl.DataFrame:
+    rng = random.Random(11)
+    n = 5000
+    return pl.DataFrame(
+        {
+            "UserID": [rng.randrange(1000) for _ in range(n)],
+            "CreatedAt": [
+                datetime(2024, 1, 1, tzinfo=UTC) + timedelta(minutes=i) for i in range(n)
+            ],
+            # "v0" is common enough to be stored as a bitmap, the rest as positions.
+            "Version": [rng.choice(["v0"] * 40 + ["v1", "v2", None]) for _ in range(n)],
+            "AuthProvider": [rng.choice(["none", "simple"]) for _ in range(n)],
+            "RunningContainers": [rng.randrange(200) for _ in range(n)],
+            "Browser": [
+                rng.choice(["Firefox/1 Windows", "Chrome/1 Linux", None]) for _ in range(n)
+            ],
+            "HasShell": [rng.choice([True, False, None]) for _ in range(n)],
+        }
+    )
+
+
+SELECTIONS = [
+    {},
+    {"Version": ["v0"]},
+    {"Version": ["v1", "v2"], "AuthProvider": ["simple"]},
+    {"container_bucket": ["1-5", "51+"], "HasShell": [True], "AuthProvider": []},
+    {"browser_family": ["Firefox"], "os_family": ["Linux"]},
+    {"Version": ["missing"]},
+]
+
+
+def test_selection_matches_filter_installs():
+    events = _events()
+    attrs = calculate_install_attributes(events)
+    index = build_segment_index(attrs)
+    assert index.sets["Version"]["v0"].packed is not None
+    assert index.sets["Version"]["v1"].positions is not None
+
+    for selections in SELECTIONS:
+        mask = index.select(selections)
+        expected = filter_installs(attrs, selections)
+        assert filter_rows(attrs, mask)["UserID"].sort().equals(expected.sort())
+
+        rows = filter_rows(events.lazy(), mask).collect()
+        assert rows.equals(events.filter(pl.col("UserID").is_in(expected.implode())))
+
+    newer = events.head(1).with_columns(UserID=pl.lit(10_000))
+    assert filter_rows(newer, index.select({})).is_empty()
+
+
+def test_options_are_ordered_by_install_count():
+    attrs = calculate_install_attributes(_events())
+    index = build_segment_index(attrs)
+    counts = attrs["Version"].drop_nulls().value_counts()
+    expected = counts.sort(["count", "Version"], descending=[True, False])["Version"].to_list()
+    assert index.options("Version") == expected
+    assert index.options("HasActions") == []
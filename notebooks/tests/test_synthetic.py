@@ -0,0 +1,38 @@
+"""Tests for the synthetic beacon generator and the benchmark comparison."""
+
+import polars as pl
+from benchmark import compare
+from data_loader import _SCAN_SCHEMA, load_and_process_data, load_start_beacons
+from synthetic import SyntheticConfig, write_dataset
+
+_CONFIG = SyntheticConfig(installs=200, days=10, seed=7)
+
+
+def test_dataset_is_deterministic(tmp_path):
+    first = write_dataset(tmp_path / "a", _CONFIG)
+    second = write_dataset(tmp_path / "b", _CONFIG)
+    assert [p.name for p in first] == [p.name for p in second]
+    for a, b in zip(first, second, strict=True):
+        assert pl.read_parquet(a).equals(pl.read_parquet(b))
+
+
+def test_dataset_matches_loader_schema(tmp_path):
+    paths = write_dataset(tmp_path, _CONFIG)
+    assert paths[0].name == "day-2024-01-01.parquet"
+    assert dict(pl.read_parquet_schema(paths[0])) == _SCAN_SCHEMA
+
+    data_glob = str(tmp_path / "day-*.parquet")
+    events = load_and_process_data(data_glob)
+    starts = load_start_beacons(data_glob)
+    assert events.height > 0
+    assert starts.height > 0
+    assert 0 < events.select(pl.col("id_from_ip").mean()).item() < 0.5
+    assert events["UserID"].n_unique() <= _CONFIG.installs
+
+
+def test_compare_flags_slower_stages():
+    def report(seconds):
+        return {"results": [{"installs": 10, "stage": "load", "seconds": seconds}]}
+
+    assert compare(report(1.0), report(1.1)) == []
+    assert compare(report(1.0), report(2.0)) == ["load @ 10 installs: 1.000s -> 2.000s"]
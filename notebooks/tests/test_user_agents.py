@@ -0,0 +1,62 @@
+"""Tests for the persisted user-agent classification."""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import attribute_analysis
+import polars as pl
+import user_agents
+from attribute_analysis import calculate_install_attributes
+from user_agents import refresh_user_agents
+
+CHROME = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/120.0 Safari/537.36"
+SAFARI = "Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 Safari/604.1"
+FIREFOX = "Mozilla/5.0 (X11; Linux x86_64; rv:121.0) Gecko/20100101 Firefox/121.0"
+
+
+def test_only_unseen_user_agents_are_classified(tmp_path, monkeypatch):
+    glob = str(tmp_path / "day-*.parquet")
+    classified = []
+
+    def counting(df):
+        classified.extend(df["Browser"].to_list())
+        return attribute_analysis.classify_user_agents(df)
+
+    monkeypatch.setattr(user_agents, "classify_user_agents", counting)
+
+    refresh_user_agents(glob, pl.Series([CHROME, CHROME, None], dtype=pl.Categorical))
+    table = refresh_user_agents(glob, pl.Series([CHROME, SAFARI, None]))
+
+    assert sorted(classified, key=str) == sorted([CHROME, None, SAFARI], key=str)
+    assert table.height == 3
+    assert refresh_user_agents(glob).equals(table)  # persisted
+
+    monkeypatch.setattr(user_agents, "USER_AGENTS_VERSION", 2)
+    assert refresh_user_agents(glob).is_empty()  # rules changed: classify again
+
+
+def test_concurrent_refreshes_keep_every_user_agent(tmp_path):
+    glob = str(tmp_path / "day-*.parquet")
+    agents = [f"agent-{i}" for i in range(8)]
+
+    with ThreadPoolExecutor(len(agents)) as pool:
+        list(pool.map(lambda agent: refresh_user_agents(glob, pl.Series([agent])), agents))
+
+    assert sorted(refresh_user_agents(glob)["Browser"]) == agents
+
+
+def test_install_attributes_join_the_cached_families(tmp_path):
+    events = pl.DataFrame(
+        {
+            "UserID": [1, 1, 2, 3],
+            "CreatedAt": [1, 2, 1, 1],
+            "RunningContainers": [1, 2, 3, 4],
+            "Browser": pl.Series([CHROME, FIREFOX, SAFARI, None], dtype=pl.Categorical),
+        }
+    )
+    table = refresh_user_agents(str(tmp_path / "day-*.parquet"), events["Browser"])
+
+    cached = calculate_install_attributes(events, table).sort("UserID")
+
+    assert cached.equals(calculate_install_attributes(events).sort("UserID"))
+    assert cached["browser_family"].to_list() == ["Firefox", "Safari", "Unknown"]
+    assert cached["os_family"].to_list() == ["Linux", "iOS", "Unknown"]
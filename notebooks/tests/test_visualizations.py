@@ -0,0 +1,61 @@
+"""Tests for the chart rendering layer."""
+
+import plotly.graph_objects as go
+import polars as pl
+import pytest
+import streamlit as st
+from dashboard import _TAB_RENDERERS
+from precompute import compute_results
+from synthetic import SyntheticConfig, write_dataset
+from visualizations import _cached_figure, _frame_key, _plotly_chart
+
+
+def test_every_tab_renders_without_converting_to_pandas(tmp_path, monkeypatch):
+    write_dataset(tmp_path, SyntheticConfig(installs=60, days=21))
+    results, _ = compute_results(str(tmp_path / "day-*.parquet"))
+
+    def to_pandas(*args, **kwargs):
+        raise AssertionError("chart data was converted to pandas")
+
+    monkeypatch.setattr(pl.DataFrame, "to_pandas", to_pandas)
+    monkeypatch.setattr(pl.Series, "to_pandas", to_pandas)
+    # Tables are Streamlit's own Arrow path (which may go through pandas); only charts here.
+    monkeypatch.setattr(st, "dataframe", lambda *args, **kwargs: None)
+    for tab, render in _TAB_RENDERERS.items():
+        try:
+            render(results)
+        except AssertionError:
+            pytest.fail(f"{tab} converted chart data to pandas")
+
+
+def test_figures_are_reused_for_equal_data():
+    builds = []
+
+    def build(df):
+        builds.append(df)
+        return go.Figure()
+
+    df = pl.DataFrame({"week_date": [1, 2, 3], "value": [0.1, 0.2, 0.3]})
+    first = _cached_figure("reuse", _frame_key(df), df, build)
+    again = _cached_figure("reuse", _frame_key(df.clone()), df.clone(), build)
+    changed = df.with_columns(pl.col("value") * 2)
+    _cached_figure("reuse", _frame_key(changed), changed, build)
+
+    assert again is first
+    assert len(builds) == 2
+
+
+def test_frame_key_depends_on_row_order():
+    df = pl.DataFrame({"week_date": [1, 2, 3], "value": [0.1, 0.2, 0.3]})
+
+    assert _frame_key(df) == _frame_key(df.clone())
+    assert _frame_key(df) != _frame_key(df.reverse())
+
+
+def test_rendering_leaves_the_cached_figure_unchanged():
+    fig = go.Figure(go.Scatter(x=[1, 2, 3], y=[3, 1, 2]))
+    before = fig.to_json()
+
+    _plotly_chart(fig)
+
+    assert fig.to_json() == before
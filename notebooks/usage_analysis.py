@@ -1,28 +1,30 @@
 """Usage frequency analysis calculations."""
 
+from typing import overload
+
 import polars as pl
 from config import BASELINE
+from frames import Frame
 
 
-def calculate_usage_frequency(df: pl.DataFrame) -> tuple[pl.DataFrame, pl.DataFrame]:
+@overload
+def calculate_usage_frequency(weekly: pl.DataFrame) -> tuple[pl.DataFrame, pl.DataFrame]: ...
+@overload
+def calculate_usage_frequency(weekly: pl.LazyFrame) -> tuple[pl.LazyFrame, pl.LazyFrame]: ...
+def calculate_usage_frequency(weekly: Frame) -> tuple[Frame, Frame]:
     """Calculate usage frequency metrics.
 
     Args:
-        df: Dataframe with UserID and current_week columns.
+        weekly: The user-week table (:func:`cohort_analysis.compute_user_weeks`).
 
     Returns:
         Tuple containing:
             - usage_frequency: Weekly usage metrics
             - overall_avg: Overall average events per user per week
     """
-    usage_frequency = (
-        df.group_by(["UserID", "current_week"])
-        .agg(pl.len().alias("events_count"))
-        .group_by("current_week")
-        .agg(
-            pl.col("events_count").mean().alias("avg_events_per_user_per_week"),
-            pl.col("UserID").n_unique().alias("active_users"),
-        )
+    usage_frequency = weekly.group_by("current_week").agg(
+        pl.col("event_count").mean().alias("avg_events_per_user_per_week"),
+        pl.len().alias("active_users"),
     )
 
     usage_frequency = usage_frequency.with_columns(
@@ -31,10 +33,8 @@ def calculate_usage_frequency(df: pl.DataFrame) -> tuple[pl.DataFrame, pl.DataFr
         )
     ).sort("current_week")
 
-    overall_avg = (
-        df.group_by(["UserID", "current_week"])
-        .agg(pl.len().alias("events_count"))
-        .select(pl.col("events_count").mean().alias("overall_avg_events_per_user_per_week"))
+    overall_avg = weekly.select(
+        pl.col("event_count").mean().alias("overall_avg_events_per_user_per_week")
     )
 
     return usage_frequency, overall_avg
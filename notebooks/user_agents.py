@@ -0,0 +1,84 @@
+"""Persisted browser/OS classification of the distinct user-agent strings.
+
+Classifying a user-agent is a chain of substring scans over a long string, yet the
+installs report only a small vocabulary of them. Each distinct ``Browser`` string is
+classified once and the result kept next to the day files (``user_agents.parquet``),
+so a reload with new history only classifies the user-agents never seen before.
+:func:`attribute_analysis.calculate_install_attributes` joins the table back on the
+(dictionary-encoded) ``Browser`` column. Updates hold the table's lock (see
+:mod:`file_lock`).
+"""
+
+from pathlib import Path
+
+import polars as pl
+from attribute_analysis import classify_user_agents
+from config import DATA_PATH, USER_AGENTS_FILENAME
+from file_lock import exclusive_lock
+
+# Bump whenever the family rules in attribute_analysis change so every user-agent is
+# classified again.
+USER_AGENTS_VERSION = 1
+
+_VERSION_KEY = "user_agents_version"
+
+_SCHEMA = {"Browser": pl.String, "browser_family": pl.String, "os_family": pl.String}
+
+
+def _path(data_glob: str) -> Path:
+    return Path(data_glob).parent / USER_AGENTS_FILENAME
+
+
+def _lock_path(data_glob: str) -> Path:
+    return _path(data_glob).with_suffix(".lock")
+
+
+def _read(data_glob: str) -> pl.DataFrame:
+    path = _path(data_glob)
+    if not path.exists():
+        return pl.DataFrame(schema=_SCHEMA)
+    try:
+        version = pl.read_parquet_metadata(path).get(_VERSION_KEY)
+        table = pl.read_parquet(path)
+    except pl.exceptions.PolarsError:
+        return pl.DataFrame(schema=_SCHEMA)
+    if version != str(USER_AGENTS_VERSION):
+        return pl.DataFrame(schema=_SCHEMA)
+    return table
+
+
+def refresh_user_agents(
+    data_glob: str = DATA_PATH, user_agents: pl.Series | None = None
+) -> pl.DataFrame:
+    """Classify the user-agents in ``user_agents`` that are not in the table yet.
+
+    Args:
+        data_glob: Glob pattern of the day files; locates the table.
+        user_agents: User-agents to cover (``String`` or ``Categorical``, repeats and
+            nulls allowed); ``None`` just reads the table.
+
+    Returns:
+        pl.DataFrame: The whole table, ``Browser`` -> ``browser_family``/``os_family``.
+    """
+    table = _read(data_glob)
+    if user_agents is None:
+        return table
+    seen = user_agents.cast(pl.String).unique().to_frame("Browser")
+    if seen.join(table, on="Browser", how="anti", nulls_equal=True).is_empty():
+        return table
+    with exclusive_lock(_lock_path(data_glob)):
+        # Add to the table as another loader may have left it meanwhile.
+        table = _read(data_glob)
+        unseen = seen.join(table, on="Browser", how="anti", nulls_equal=True)
+        if unseen.is_empty():
+            return table
+        table = pl.concat([table, classify_user_agents(unseen)])
+        _write(data_glob, table)
+    return table
+
+
+def _write(data_glob: str, table: pl.DataFrame) -> None:
+    path = _path(data_glob)
+    tmp = path.with_name(f"{path.name}.tmp")
+    table.write_parquet(tmp, metadata={_VERSION_KEY: str(USER_AGENTS_VERSION)})
+    tmp.replace(path)
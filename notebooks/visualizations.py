@@ -1,11 +1,17 @@
 """Visualization components for the retention analysis dashboard."""
 
+import hashlib
+from collections.abc import Callable
+
+import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 import polars as pl
 import streamlit as st
 from config import (
+    CHART_POINT_BUDGET,
     ENGAGEMENT_DETAILS_TAIL,
+    FIGURE_CACHE_ENTRIES,
     HEATMAP_COLOR_SCALE,
     HEATMAP_GAP,
     HEATMAP_HEIGHT,
@@ -13,25 +19,112 @@ from config import (
     LIFECYCLE_DETAILS_TAIL,
     RECENT_WEEKS_COUNT,
     USAGE_DETAILS_TAIL,
+    WEBGL_MIN_POINTS,
 )
+from downsample import downsample
+from instrumentation import instrumented, stage
 
 
-def display_retention_heatmap(retention: pl.DataFrame) -> None:
-    """Display cohort retention heatmap.
+def _plot_data(
+    df: pl.DataFrame, x: str | None = None, y: list[str] | None = None, series: str | None = None
+) -> pl.DataFrame:
+    """Prepare ``df`` to be handed to Plotly without a pandas copy.
+
+    Plotly Express reads Polars frames natively (through narwhals), and
+    :func:`_column` gives ``go`` traces NumPy views of the Arrow buffers. Rechunking
+    makes every column a single buffer so those views need no copy. Every chart goes
+    through this helper; ``to_pandas`` is not used for rendering.
+
+    Time series (``x`` and ``y`` given) with more than ``CHART_POINT_BUDGET`` points
+    per series are downsampled first, so the payload does not grow with history. Long
+    frames name their ``series`` column so each series is sampled on its own values.
+    """
+    with stage("plot_data", df) as s:
+        if x is not None and y is not None:
+            df = downsample(df, x, y, CHART_POINT_BUDGET, series)
+        s.output = df.rechunk()
+    return s.output
+
+
+def _column(df: pl.DataFrame, name: str) -> np.ndarray:
+    """Column ``name`` of a :func:`_plot_data` frame as a NumPy array (a view when possible)."""
+    return df[name].to_numpy()
+
+
+def _webgl(df: pl.DataFrame, traces: int = 1) -> bool:
+    """Whether ``traces`` line traces over the rows of ``df`` warrant WebGL rendering."""
+    return df.height * traces >= WEBGL_MIN_POINTS
+
+
+def _render_mode(df: pl.DataFrame) -> str:
+    """``render_mode`` for a ``px.line`` chart of the long-format ``df``."""
+    return "webgl" if _webgl(df) else "svg"
+
+
+def _line_trace(df: pl.DataFrame, traces: int) -> type[go.Scatter] | type[go.Scattergl]:
+    """Trace type for the unstacked lines of a figure with ``traces`` lines over ``df``.
+
+    Stacked areas stay ``go.Scatter``: ``Scattergl`` has no ``stackgroup``.
+    """
+    return go.Scattergl if _webgl(df, traces) else go.Scatter
+
+
+def _frame_key(df: pl.DataFrame) -> tuple:
+    """Content key of ``df``: equal frames get equal keys, whatever object holds them.
+
+    A digest of the row hashes in order, so reordered rows or hashes that would cancel
+    out in a sum still give a different key.
+    """
+    digest = hashlib.blake2b(df.hash_rows().to_numpy().tobytes(), digest_size=16)
+    return df.height, str(df.schema), digest.hexdigest()
+
+
+@st.cache_resource(max_entries=FIGURE_CACHE_ENTRIES, show_spinner=False)
+def _cached_figure(
+    name: str, key: tuple, _df: pl.DataFrame, _build: Callable[[pl.DataFrame], go.Figure]
+) -> go.Figure:
+    with stage("build_figure", _df):
+        return _build(_df)
+
+
+def _plotly_chart(fig: go.Figure) -> None:
+    """Render a figure; the recorded stage includes Plotly's JSON serialization.
+
+    Streamlit serializes a copy (``fig.to_dict()``), so cached figures are not modified.
+    """
+    with stage("plotly_chart"):
+        st.plotly_chart(fig, width="stretch")
+
+
+def _chart(name: str, df: pl.DataFrame, build: Callable[[pl.DataFrame], go.Figure]) -> None:
+    """Render ``build(df)``, reusing the built figure while ``df`` has the same contents.
+
+    Figures are shared across reruns and sessions: ``build`` may depend on nothing but
+    ``df``, and the figure must not be modified once built. It is only ever handed to
+    :func:`_plotly_chart`, which leaves it as it is.
 
     Args:
-        retention: Retention matrix dataframe.
+        name: Unique name of the chart; part of the cache key.
+        df: The chart's input data.
+        build: Builds the figure from ``df``.
     """
-    retention_pd = retention.to_pandas()
+    _plotly_chart(_cached_figure(name, _frame_key(df), df, build))
 
-    if "activated_date" in retention_pd.columns:
-        retention_pd = retention_pd.set_index("activated_date")
+
+def _retention_heatmap(retention: pl.DataFrame) -> go.Figure:
+    retention = _plot_data(retention)
+    weeks = [c for c in retention.columns if c != "activated_date"]
+    cohorts = (
+        _column(retention, "activated_date")
+        if "activated_date" in retention.columns
+        else np.arange(retention.height)
+    )
 
     fig = px.imshow(
-        retention_pd,
+        retention.select(weeks).to_numpy(),
         labels=dict(x="Week", y="Cohort", color="Retention Rate"),
-        x=retention_pd.columns,
-        y=retention_pd.index,
+        x=weeks,
+        y=cohorts,
         color_continuous_scale=HEATMAP_COLOR_SCALE,
         zmin=0,
         zmax=1,
@@ -51,10 +144,37 @@ def display_retention_heatmap(retention: pl.DataFrame) -> None:
         height=HEATMAP_HEIGHT,
         width=HEATMAP_WIDTH,
     )
+    return fig_go
+
+
+@instrumented
+def display_retention_heatmap(retention: pl.DataFrame) -> None:
+    """Display cohort retention heatmap.
 
-    st.plotly_chart(fig_go, width="stretch")
+    Args:
+        retention: Retention matrix dataframe.
+    """
+    _chart("retention_heatmap", retention, _retention_heatmap)
+
+
+def _usage_frequency(usage_frequency: pl.DataFrame) -> go.Figure:
+    usage = _plot_data(usage_frequency, "week_date", ["avg_events_per_user_per_week"])
+    fig_usage = px.line(
+        usage,
+        x="week_date",
+        y="avg_events_per_user_per_week",
+        title="Average Events per User per Week Over Time",
+        labels={
+            "week_date": "Week",
+            "avg_events_per_user_per_week": "Avg Events per User",
+        },
+        render_mode=_render_mode(usage),
+    )
+    fig_usage.update_traces(mode="lines+markers")
+    return fig_usage
 
 
+@instrumented
 def display_usage_frequency_analysis(
     usage_frequency: pl.DataFrame, overall_avg: pl.DataFrame
 ) -> None:
@@ -83,18 +203,7 @@ def display_usage_frequency_analysis(
 
     # Usage frequency chart
     with st.spinner("Generating usage frequency chart..."):
-        fig_usage = px.line(
-            usage_frequency.to_pandas(),
-            x="week_date",
-            y="avg_events_per_user_per_week",
-            title="Average Events per User per Week Over Time",
-            labels={
-                "week_date": "Week",
-                "avg_events_per_user_per_week": "Avg Events per User",
-            },
-        )
-        fig_usage.update_traces(mode="lines+markers")
-        st.plotly_chart(fig_usage, width="stretch")
+        _chart("usage_frequency", usage_frequency, _usage_frequency)
 
     # Detailed table
     with st.expander("Show Usage Frequency Details"):
@@ -105,6 +214,54 @@ def display_usage_frequency_analysis(
         )
 
 
+# Stacked lifecycle series: column -> (trace name, fill color)
+_LIFECYCLE_STACK = {
+    "new_users": ("New Users", "rgba(99, 110, 250, 0.5)"),
+    "retained_users": ("Retained Users", "rgba(0, 204, 150, 0.5)"),
+    "resurrected_users": ("Resurrected Users", "rgba(255, 161, 90, 0.5)"),
+}
+
+
+def _lifecycle(lifecycle_df: pl.DataFrame) -> go.Figure:
+    lifecycle = _plot_data(lifecycle_df, "week_date", list(_LIFECYCLE_STACK))
+
+    fig_lifecycle = go.Figure()
+    for column, (name, color) in _LIFECYCLE_STACK.items():
+        fig_lifecycle.add_trace(
+            go.Scatter(
+                x=_column(lifecycle, "week_date"),
+                y=_column(lifecycle, column),
+                mode="lines",
+                name=name,
+                stackgroup="one",
+                fillcolor=color,
+            )
+        )
+
+    fig_lifecycle.update_layout(
+        title="User Lifecycle Over Time",
+        xaxis_title="Week",
+        yaxis_title="Number of Users",
+        hovermode="x unified",
+    )
+    return fig_lifecycle
+
+
+def _churn(lifecycle_df: pl.DataFrame) -> go.Figure:
+    lifecycle = _plot_data(lifecycle_df, "week_date", ["churned_users"])
+    fig_churn = px.line(
+        lifecycle,
+        x="week_date",
+        y="churned_users",
+        title="Churned Users Over Time",
+        labels={"week_date": "Week", "churned_users": "Churned Users"},
+        render_mode=_render_mode(lifecycle),
+    )
+    fig_churn.update_traces(mode="lines+markers", line_color="red")
+    return fig_churn
+
+
+@instrumented
 def display_user_lifecycle_analysis(lifecycle_df: pl.DataFrame) -> None:
     """Display user lifecycle analysis section.
 
@@ -131,63 +288,11 @@ def display_user_lifecycle_analysis(lifecycle_df: pl.DataFrame) -> None:
 
     # Lifecycle stacked area chart
     with st.spinner("Generating lifecycle chart..."):
-        lifecycle_pd = lifecycle_df.to_pandas()
-
-        fig_lifecycle = go.Figure()
-
-        fig_lifecycle.add_trace(
-            go.Scatter(
-                x=lifecycle_pd["week_date"],
-                y=lifecycle_pd["new_users"],
-                mode="lines",
-                name="New Users",
-                stackgroup="one",
-                fillcolor="rgba(99, 110, 250, 0.5)",
-            )
-        )
-
-        fig_lifecycle.add_trace(
-            go.Scatter(
-                x=lifecycle_pd["week_date"],
-                y=lifecycle_pd["retained_users"],
-                mode="lines",
-                name="Retained Users",
-                stackgroup="one",
-                fillcolor="rgba(0, 204, 150, 0.5)",
-            )
-        )
-
-        fig_lifecycle.add_trace(
-            go.Scatter(
-                x=lifecycle_pd["week_date"],
-                y=lifecycle_pd["resurrected_users"],
-                mode="lines",
-                name="Resurrected Users",
-                stackgroup="one",
-                fillcolor="rgba(255, 161, 90, 0.5)",
-            )
-        )
-
-        fig_lifecycle.update_layout(
-            title="User Lifecycle Over Time",
-            xaxis_title="Week",
-            yaxis_title="Number of Users",
-            hovermode="x unified",
-        )
-
-        st.plotly_chart(fig_lifecycle, width="stretch")
+        _chart("lifecycle", lifecycle_df, _lifecycle)
 
     # Churned users chart
     with st.spinner("Generating churn chart..."):
-        fig_churn = px.line(
-            lifecycle_pd,
-            x="week_date",
-            y="churned_users",
-            title="Churned Users Over Time",
-            labels={"week_date": "Week", "churned_users": "Churned Users"},
-        )
-        fig_churn.update_traces(mode="lines+markers", line_color="red")
-        st.plotly_chart(fig_churn, width="stretch")
+        _chart("churn", lifecycle_df, _churn)
 
     # Detailed table
     with st.expander("Show Lifecycle Details"):
@@ -205,6 +310,60 @@ def display_user_lifecycle_analysis(lifecycle_df: pl.DataFrame) -> None:
         )
 
 
+def _stickiness(stickiness_df: pl.DataFrame) -> go.Figure:
+    stickiness = _plot_data(stickiness_df, "week_date", ["stickiness_ratio"])
+    fig_stickiness = px.line(
+        stickiness,
+        x="week_date",
+        y="stickiness_ratio",
+        title="User Stickiness Over Time (WAU / MAU)",
+        labels={
+            "week_date": "Week",
+            "stickiness_ratio": "Stickiness Ratio (WAU/MAU)",
+        },
+        render_mode=_render_mode(stickiness),
+    )
+    fig_stickiness.update_traces(mode="lines+markers")
+    fig_stickiness.update_yaxes(tickformat=".0%")
+    return fig_stickiness
+
+
+def _wau_mau(stickiness_df: pl.DataFrame) -> go.Figure:
+    stickiness = _plot_data(stickiness_df, "week_date", ["wau", "mau"])
+    scatter = _line_trace(stickiness, traces=2)
+
+    fig_wau_mau = go.Figure()
+
+    fig_wau_mau.add_trace(
+        scatter(
+            x=_column(stickiness, "week_date"),
+            y=_column(stickiness, "wau"),
+            mode="lines+markers",
+            name="WAU",
+            line=dict(color="blue"),
+        )
+    )
+
+    fig_wau_mau.add_trace(
+        scatter(
+            x=_column(stickiness, "week_date"),
+            y=_column(stickiness, "mau"),
+            mode="lines+markers",
+            name="MAU (4-week distinct)",
+            line=dict(color="green"),
+        )
+    )
+
+    fig_wau_mau.update_layout(
+        title="Weekly Active Users (WAU) vs Monthly Active Users (MAU)",
+        xaxis_title="Week",
+        yaxis_title="Number of Users",
+        hovermode="x unified",
+    )
+    return fig_wau_mau
+
+
+@instrumented
 def display_stickiness_analysis(stickiness_df: pl.DataFrame, summary_stats: dict) -> None:
     """Display stickiness analysis section.
 
@@ -228,54 +387,95 @@ def display_stickiness_analysis(stickiness_df: pl.DataFrame, summary_stats: dict
 
     # Stickiness chart
     with st.spinner("Generating stickiness chart..."):
-        fig_stickiness = px.line(
-            stickiness_df.to_pandas(),
-            x="week_date",
-            y="stickiness_ratio",
-            title="User Stickiness Over Time (WAU / MAU)",
-            labels={
-                "week_date": "Week",
-                "stickiness_ratio": "Stickiness Ratio (WAU/MAU)",
-            },
-        )
-        fig_stickiness.update_traces(mode="lines+markers")
-        fig_stickiness.update_yaxes(tickformat=".0%")
-        st.plotly_chart(fig_stickiness, width="stretch")
+        _chart("stickiness", stickiness_df, _stickiness)
 
     # WAU vs MAU chart
     with st.spinner("Generating WAU/MAU chart..."):
-        fig_wau_mau = go.Figure()
+        _chart("wau_mau", stickiness_df, _wau_mau)
+
+
+def _active_installs(active: pl.DataFrame) -> go.Figure:
+    windows = [c for c in active.columns if c.startswith("active_")]
+    long = active.unpivot(on=windows, index="date", variable_name="window", value_name="installs")
+    long = long.with_columns(pl.col("window").str.strip_prefix("active_"))
+    long = _plot_data(long, "date", ["installs"], "window")
+    return px.line(
+        long,
+        x="date",
+        y="installs",
+        color="window",
+        title="Active Installs over Trailing Windows",
+        labels={"date": "Day", "installs": "Active Installs", "window": "Window"},
+        render_mode=_render_mode(long),
+    )
+
+
+@instrumented
+def display_active_installs_analysis(active: pl.DataFrame) -> None:
+    """Display daily distinct active installs over trailing day windows.
+
+    Args:
+        active: Output of :func:`engagement_analysis.calculate_active_installs`.
+    """
+    st.header("Daily Active Installs")
+    st.caption("Distinct installs active in each window of days ending on the given day.")
+
+    latest = active.tail(1)
+    windows = [c for c in active.columns if c.startswith("active_")]
+    for col, window in zip(st.columns(len(windows)), windows, strict=True):
+        with col:
+            st.metric(f"Last {window.removeprefix('active_')}", f"{latest[window][0]:,}")
+
+    with st.spinner("Generating active installs chart..."):
+        _chart("active_installs", active, _active_installs)
+
+
+# Engagement levels in stacking order, with their fill colors
+_ENGAGEMENT_LEVELS = {
+    "1_event": "rgba(239, 85, 59, 0.6)",
+    "2-5_events": "rgba(255, 161, 90, 0.6)",
+    "6-20_events": "rgba(255, 217, 102, 0.6)",
+    "21-50_events": "rgba(99, 190, 123, 0.6)",
+    "50+_events": "rgba(0, 204, 150, 0.6)",
+}
 
-        fig_wau_mau.add_trace(
-            go.Scatter(
-                x=stickiness_df["week_date"],
-                y=stickiness_df["wau"],
-                mode="lines+markers",
-                name="WAU",
-                line=dict(color="blue"),
-            )
-        )
 
-        fig_wau_mau.add_trace(
+def _engagement_depth(engagement_df: pl.DataFrame) -> go.Figure:
+    # Pivot data for stacking
+    engagement_pivot = engagement_df.pivot(
+        on="engagement_level",
+        index="week_date",
+        values="user_count",
+        aggregate_function="first",
+    ).fill_null(0)
+
+    levels = [col for col in _ENGAGEMENT_LEVELS if col in engagement_pivot.columns]
+    engagement = _plot_data(engagement_pivot.select(["week_date", *levels]), "week_date", levels)
+
+    fig_engagement = go.Figure()
+
+    for level in levels:
+        fig_engagement.add_trace(
             go.Scatter(
-                x=stickiness_df["week_date"],
-                y=stickiness_df["mau"],
-                mode="lines+markers",
-                name="MAU (4-week distinct)",
-                line=dict(color="green"),
+                x=_column(engagement, "week_date"),
+                y=_column(engagement, level),
+                mode="lines",
+                name=level.replace("_", " ").title(),
+                stackgroup="one",
+                fillcolor=_ENGAGEMENT_LEVELS[level],
             )
         )
 
-        fig_wau_mau.update_layout(
-            title="Weekly Active Users (WAU) vs Monthly Active Users (MAU)",
-            xaxis_title="Week",
-            yaxis_title="Number of Users",
-            hovermode="x unified",
-        )
-
-        st.plotly_chart(fig_wau_mau, width="stretch")
+    fig_engagement.update_layout(
+        title="User Engagement Depth Over Time",
+        xaxis_title="Week",
+        yaxis_title="Number of Users",
+        hovermode="x unified",
+    )
+    return fig_engagement
 
 
+@instrumented
 def display_engagement_depth_analysis(engagement_df: pl.DataFrame) -> None:
     """Display engagement depth analysis section.
 
@@ -286,56 +486,7 @@ def display_engagement_depth_analysis(engagement_df: pl.DataFrame) -> None:
 
     # Create stacked area chart
     with st.spinner("Generating engagement depth chart..."):
-        # Pivot data for stacking
-        engagement_pivot = engagement_df.pivot(
-            on="engagement_level",
-            index="week_date",
-            values="user_count",
-            aggregate_function="first",
-        ).fill_null(0)
-
-        engagement_pd = engagement_pivot.to_pandas().set_index("week_date")
-
-        # Define order for engagement levels
-        level_order = [
-            "1_event",
-            "2-5_events",
-            "6-20_events",
-            "21-50_events",
-            "50+_events",
-        ]
-        engagement_pd = engagement_pd[[col for col in level_order if col in engagement_pd.columns]]
-
-        fig_engagement = go.Figure()
-
-        colors = {
-            "1_event": "rgba(239, 85, 59, 0.6)",
-            "2-5_events": "rgba(255, 161, 90, 0.6)",
-            "6-20_events": "rgba(255, 217, 102, 0.6)",
-            "21-50_events": "rgba(99, 190, 123, 0.6)",
-            "50+_events": "rgba(0, 204, 150, 0.6)",
-        }
-
-        for level in engagement_pd.columns:
-            fig_engagement.add_trace(
-                go.Scatter(
-                    x=engagement_pd.index,
-                    y=engagement_pd[level],
-                    mode="lines",
-                    name=level.replace("_", " ").title(),
-                    stackgroup="one",
-                    fillcolor=colors.get(level, "rgba(99, 110, 250, 0.5)"),
-                )
-            )
-
-        fig_engagement.update_layout(
-            title="User Engagement Depth Over Time",
-            xaxis_title="Week",
-            yaxis_title="Number of Users",
-            hovermode="x unified",
-        )
-
-        st.plotly_chart(fig_engagement, width="stretch")
+        _chart("engagement_depth", engagement_df, _engagement_depth)
 
     # Detailed table
     with st.expander("Show Engagement Depth Details"):
@@ -346,6 +497,23 @@ def display_engagement_depth_analysis(engagement_df: pl.DataFrame) -> None:
         )
 
 
+def _cohort_engagement(cohort_engagement_df: pl.DataFrame) -> go.Figure:
+    # Limit to first 20 weeks for readability
+    cohort_engagement_limited = cohort_engagement_df.filter(pl.col("cohort_index") <= 20)
+
+    return px.bar(
+        _plot_data(cohort_engagement_limited),
+        x="cohort_index",
+        y="avg_events_per_user",
+        title="Average Events per User by Cohort Age",
+        labels={
+            "cohort_index": "Weeks Since Activation",
+            "avg_events_per_user": "Avg Events per User",
+        },
+    )
+
+
+@instrumented
 def display_cohort_engagement_analysis(cohort_engagement_df: pl.DataFrame) -> None:
     """Display cohort engagement analysis section.
 
@@ -356,20 +524,7 @@ def display_cohort_engagement_analysis(cohort_engagement_df: pl.DataFrame) -> No
 
     # Engagement by cohort age chart
     with st.spinner("Generating cohort engagement chart..."):
-        # Limit to first 20 weeks for readability
-        cohort_engagement_limited = cohort_engagement_df.filter(pl.col("cohort_index") <= 20)
-
-        fig_cohort_engagement = px.bar(
-            cohort_engagement_limited.to_pandas(),
-            x="cohort_index",
-            y="avg_events_per_user",
-            title="Average Events per User by Cohort Age",
-            labels={
-                "cohort_index": "Weeks Since Activation",
-                "avg_events_per_user": "Avg Events per User",
-            },
-        )
-        st.plotly_chart(fig_cohort_engagement, width="stretch")
+        _chart("cohort_engagement", cohort_engagement_df, _cohort_engagement)
 
     # Show summary statistics
     col1, col2 = st.columns(2)
@@ -391,32 +546,21 @@ def display_cohort_engagement_analysis(cohort_engagement_df: pl.DataFrame) -> No
             )
 
 
-def display_new_installs_analysis(new_installs: pl.DataFrame) -> None:
-    """Display new installs and launch volume derived from start beacons."""
-    st.header("New Installs & Launches")
-    st.caption("Derived from `start` (app-launch) beacons — a cleaner signal than events.")
-
-    recent = new_installs.tail(1)
-    col1, col2 = st.columns(2)
-    with col1:
-        st.metric("New Installs (Last Week)", f"{recent['new_installs'][0]:,}")
-    with col2:
-        st.metric("Launches (Last Week)", f"{recent['launches'][0]:,}")
-
-    pdf = new_installs.to_pandas()
+def _new_installs(new_installs: pl.DataFrame) -> go.Figure:
+    installs = _plot_data(new_installs, "week_date", ["new_installs", "active_installs"])
     fig = go.Figure()
     fig.add_trace(
         go.Bar(
-            x=pdf["week_date"],
-            y=pdf["new_installs"],
+            x=_column(installs, "week_date"),
+            y=_column(installs, "new_installs"),
             name="New Installs",
             marker_color="rgba(99, 110, 250, 0.7)",
         )
     )
     fig.add_trace(
-        go.Scatter(
-            x=pdf["week_date"],
-            y=pdf["active_installs"],
+        _line_trace(installs, traces=1)(
+            x=_column(installs, "week_date"),
+            y=_column(installs, "active_installs"),
             name="Active Installs",
             mode="lines",
             line=dict(color="rgba(0, 204, 150, 0.9)"),
@@ -428,15 +572,28 @@ def display_new_installs_analysis(new_installs: pl.DataFrame) -> None:
         yaxis_title="Installs",
         hovermode="x unified",
     )
-    st.plotly_chart(fig, width="stretch")
+    return fig
 
 
-def display_version_adoption_analysis(version_adoption: pl.DataFrame) -> None:
-    """Display version adoption share over time as a stacked area chart."""
-    st.header("Version Adoption")
+@instrumented
+def display_new_installs_analysis(new_installs: pl.DataFrame) -> None:
+    """Display new installs and launch volume derived from start beacons."""
+    st.header("New Installs & Launches")
+    st.caption("Derived from `start` (app-launch) beacons — a cleaner signal than events.")
 
+    recent = new_installs.tail(1)
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("New Installs (Last Week)", f"{recent['new_installs'][0]:,}")
+    with col2:
+        st.metric("Launches (Last Week)", f"{recent['launches'][0]:,}")
+
+    _chart("new_installs", new_installs, _new_installs)
+
+
+def _version_adoption(version_adoption: pl.DataFrame) -> go.Figure:
     fig = px.area(
-        version_adoption.to_pandas(),
+        _plot_data(version_adoption, "week_date", ["share"], "version"),
         x="week_date",
         y="share",
         color="version",
@@ -444,30 +601,39 @@ def display_version_adoption_analysis(version_adoption: pl.DataFrame) -> None:
         labels={"week_date": "Week", "share": "Share of Installs", "version": "Version"},
     )
     fig.update_yaxes(tickformat=".0%")
-    st.plotly_chart(fig, width="stretch")
+    return fig
 
 
-def display_deployment_scale_analysis(scale: pl.DataFrame) -> None:
-    """Display the distribution of installs by deployment size (running containers)."""
-    st.header("Deployment Scale")
-    st.caption("Installs grouped by number of running containers (latest report per install).")
+@instrumented
+def display_version_adoption_analysis(version_adoption: pl.DataFrame) -> None:
+    """Display version adoption share over time as a stacked area chart."""
+    st.header("Version Adoption")
+
+    _chart("version_adoption", version_adoption, _version_adoption)
+
 
-    fig = px.bar(
-        scale.to_pandas(),
+def _deployment_scale(scale: pl.DataFrame) -> go.Figure:
+    return px.bar(
+        _plot_data(scale),
         x="container_bucket",
         y="installs",
         title="Installs by Deployment Size",
         labels={"container_bucket": "Running Containers", "installs": "Installs"},
     )
-    st.plotly_chart(fig, width="stretch")
 
 
-def display_auth_mix_analysis(auth_mix: pl.DataFrame) -> None:
-    """Display auth-provider share over time as a stacked area chart."""
-    st.header("Authentication Mix")
+@instrumented
+def display_deployment_scale_analysis(scale: pl.DataFrame) -> None:
+    """Display the distribution of installs by deployment size (running containers)."""
+    st.header("Deployment Scale")
+    st.caption("Installs grouped by number of running containers (latest report per install).")
 
+    _chart("deployment_scale", scale, _deployment_scale)
+
+
+def _auth_mix(auth_mix: pl.DataFrame) -> go.Figure:
     fig = px.area(
-        auth_mix.to_pandas(),
+        _plot_data(auth_mix, "week_date", ["share"], "AuthProvider"),
         x="week_date",
         y="share",
         color="AuthProvider",
@@ -475,28 +641,34 @@ def display_auth_mix_analysis(auth_mix: pl.DataFrame) -> None:
         labels={"week_date": "Week", "share": "Share of Installs", "AuthProvider": "Auth Provider"},
     )
     fig.update_yaxes(tickformat=".0%")
-    st.plotly_chart(fig, width="stretch")
+    return fig
 
 
-def display_concurrent_clients_analysis(clients: pl.DataFrame) -> None:
-    """Display average and peak concurrent browser clients per install over time."""
-    st.header("Concurrent Clients")
+@instrumented
+def display_auth_mix_analysis(auth_mix: pl.DataFrame) -> None:
+    """Display auth-provider share over time as a stacked area chart."""
+    st.header("Authentication Mix")
+
+    _chart("auth_mix", auth_mix, _auth_mix)
 
-    pdf = clients.to_pandas()
+
+def _concurrent_clients(clients: pl.DataFrame) -> go.Figure:
+    clients = _plot_data(clients, "week_date", ["avg_clients", "max_clients"])
+    scatter = _line_trace(clients, traces=2)
     fig = go.Figure()
     fig.add_trace(
-        go.Scatter(
-            x=pdf["week_date"],
-            y=pdf["avg_clients"],
+        scatter(
+            x=_column(clients, "week_date"),
+            y=_column(clients, "avg_clients"),
             name="Avg peak clients / install",
             mode="lines+markers",
             line=dict(color="blue"),
         )
     )
     fig.add_trace(
-        go.Scatter(
-            x=pdf["week_date"],
-            y=pdf["max_clients"],
+        scatter(
+            x=_column(clients, "week_date"),
+            y=_column(clients, "max_clients"),
             name="Max clients (any install)",
             mode="lines",
             line=dict(color="orange", dash="dot"),
@@ -508,26 +680,62 @@ def display_concurrent_clients_analysis(clients: pl.DataFrame) -> None:
         yaxis_title="Clients",
         hovermode="x unified",
     )
-    st.plotly_chart(fig, width="stretch")
+    return fig
 
 
-def display_feature_adoption_analysis(feature_adoption: pl.DataFrame) -> None:
-    """Display feature-flag adoption over time as a multi-line chart."""
-    st.header("Feature Adoption")
+@instrumented
+def display_concurrent_clients_analysis(clients: pl.DataFrame) -> None:
+    """Display average and peak concurrent browser clients per install over time."""
+    st.header("Concurrent Clients")
+
+    _chart("concurrent_clients", clients, _concurrent_clients)
+
 
+def _feature_adoption(feature_adoption: pl.DataFrame) -> go.Figure:
+    adoption = _plot_data(feature_adoption, "week_date", ["adoption"], "feature")
     fig = px.line(
-        feature_adoption.to_pandas(),
+        adoption,
         x="week_date",
         y="adoption",
         color="feature",
         title="Share of Active Installs with Each Feature Enabled",
         labels={"week_date": "Week", "adoption": "Adoption", "feature": "Feature"},
+        render_mode=_render_mode(adoption),
     )
     fig.update_traces(mode="lines+markers")
     fig.update_yaxes(tickformat=".0%")
-    st.plotly_chart(fig, width="stretch")
+    return fig
 
 
+@instrumented
+def display_feature_adoption_analysis(feature_adoption: pl.DataFrame) -> None:
+    """Display feature-flag adoption over time as a multi-line chart."""
+    st.header("Feature Adoption")
+
+    _chart("feature_adoption", feature_adoption, _feature_adoption)
+
+
+def _browser_mix(browser_df: pl.DataFrame) -> go.Figure:
+    return px.bar(
+        _plot_data(browser_df),
+        x="browser_family",
+        y="installs",
+        title="By Browser",
+        labels={"browser_family": "Browser", "installs": "Installs"},
+    )
+
+
+def _os_mix(os_df: pl.DataFrame) -> go.Figure:
+    return px.bar(
+        _plot_data(os_df),
+        x="os_family",
+        y="installs",
+        title="By OS",
+        labels={"os_family": "OS", "installs": "Installs"},
+    )
+
+
+@instrumented
 def display_browser_mix_analysis(browser_df: pl.DataFrame, os_df: pl.DataFrame) -> None:
     """Display browser-family and OS-family distributions side by side."""
     st.header("Browser & OS Mix")
@@ -535,20 +743,6 @@ def display_browser_mix_analysis(browser_df: pl.DataFrame, os_df: pl.DataFrame)
 
     col1, col2 = st.columns(2)
     with col1:
-        fig_b = px.bar(
-            browser_df.to_pandas(),
-            x="browser_family",
-            y="installs",
-            title="By Browser",
-            labels={"browser_family": "Browser", "installs": "Installs"},
-        )
-        st.plotly_chart(fig_b, width="stretch")
+        _chart("browser_mix", browser_df, _browser_mix)
     with col2:
-        fig_o = px.bar(
-            os_df.to_pandas(),
-            x="os_family",
-            y="installs",
-            title="By OS",
-            labels={"os_family": "OS", "installs": "Installs"},
-        )
-        st.plotly_chart(fig_o, width="stretch")
+        _chart("os_mix", os_df, _os_mix)